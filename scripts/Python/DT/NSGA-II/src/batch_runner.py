@@ -0,0 +1,184 @@
+# src/batch_runner.py
+# Run turbo -> pick_best -> render for many scenarios (floor plans / configs) from one manifest.
+#   python src/batch_runner.py data/scenarios.json                 # -> outputs/batch/<name>/...
+#   python src/batch_runner.py data/scenarios.json --workers 2 --only SB J --force
+# Manifest: {"defaults": {config keys}, "workers": n, "scenarios": [{"name": ..., config keys}]}
+# Each scenario's config is data/config.json <- defaults <- scenario, written to
+# <out>/<name>/data/config.json; the three scripts run there as subprocesses, so they
+# keep reading their usual relative paths. A scenario whose inputs and results are
+# unchanged since its last successful run is skipped.
+import argparse, csv, hashlib, json, os, subprocess, sys, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent
+PIPELINE = ("layout_nsga_turbo.py", "pick_best_from_nsga_turbo.py", "render_layout_on_image.py")
+RESULTS = ("outputs/layouts.json", "outputs/best_layout.json")   # + the rendered floor_with_best*.jpg
+PATH_KEYS = ("walkable_png", "placeable_png")   # resolved against the manifest's working dir (also in "floors")
+STAMP = "outputs/batch_stamp.json"
+
+def _sha(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()[:20]
+
+# -------------------- SCENARIOS --------------------
+def load_scenarios(manifest_path, base_config="data/config.json"):
+    """Manifest -> (list of (name, config dict), workers or None)."""
+    man = json.loads(Path(manifest_path).read_text())
+    base = json.loads(Path(base_config).read_text()) if Path(base_config).exists() else {}
+    base.update(man.get("defaults", {}))
+    out, seen = [], set()
+    for sc in man["scenarios"]:
+        sc = dict(sc)
+        name = sc.pop("name", None) or Path(sc["walkable_png"]).stem
+        if name in seen:
+            raise SystemExit(f"❌ scenario name used twice in {manifest_path}: {name}")
+        seen.add(name)
+        cfg = json.loads(json.dumps({**base, **sc}))   # deep copy: "floors" entries get edited
+        for d in [cfg] + (cfg.get("floors") or []):
+            for k in PATH_KEYS:
+                if d.get(k):
+                    d[k] = str(Path(d[k]).resolve())
+        out.append((name, cfg))
+    return out, man.get("workers")
+
+def inputs_hash(cfg):
+    """Config + plan/placeable images + pipeline sources: any change means a re-run."""
+    h = hashlib.sha256(json.dumps(cfg, sort_keys=True).encode())
+    for d in [cfg] + (cfg.get("floors") or []):
+        for k in PATH_KEYS:
+            h.update(_sha(d[k]).encode() if d.get(k) else b"<none>")
+    for f in sorted(SRC.glob("*.py")):
+        h.update(f.name.encode() + _sha(f).encode())
+    return h.hexdigest()[:20]
+
+def results_hash(case_dir):
+    """{result file: sha} or None if one is missing."""
+    files = [Path(case_dir) / r for r in RESULTS]
+    renders = sorted((Path(case_dir) / "outputs").glob("floor_with_best*.jpg"))
+    if not all(f.exists() for f in files) or not renders:
+        return None
+    return {str(f.relative_to(case_dir)): _sha(f) for f in files + renders}
+
+def up_to_date(case_dir, key):
+    stamp = Path(case_dir) / STAMP
+    if not stamp.exists():
+        return None
+    st = json.loads(stamp.read_text())
+    if st.get("inputs") != key or st.get("results") != results_hash(case_dir):
+        return None
+    return st
+
+# -------------------- ONE SCENARIO --------------------
+def run_scenario(name, cfg, case_dir, force=False):
+    """Write the scenario's config, run the pipeline (unless up to date) -> summary row."""
+    case_dir = Path(case_dir)
+    key = inputs_hash(cfg)
+    st = None if force else up_to_date(case_dir, key)
+    if st is not None:
+        return {**summary_row(name, case_dir, st["runtime_s"], st.get("steps_s", {})), "status": "skipped"}
+
+    (case_dir / "data").mkdir(parents=True, exist_ok=True)
+    (case_dir / "outputs").mkdir(exist_ok=True)
+    (case_dir / "data" / "config.json").write_text(json.dumps(cfg, indent=2))
+    (case_dir / STAMP).unlink(missing_ok=True)
+    env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+    steps, t0 = {}, time.perf_counter()
+    with open(case_dir / "outputs" / "run.log", "w") as log:
+        for script in PIPELINE:
+            ts = time.perf_counter()
+            log.write(f"==== {script} ====\n")
+            log.flush()
+            r = subprocess.run([sys.executable, str(SRC / script)], cwd=case_dir, env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+            steps[script] = round(time.perf_counter() - ts, 3)
+            if r.returncode != 0:
+                row = summary_row(name, case_dir, time.perf_counter() - t0, steps)
+                return {**row, "status": f"failed ({script})"}
+    runtime = time.perf_counter() - t0
+    (case_dir / STAMP).write_text(json.dumps({
+        "inputs": key, "results": results_hash(case_dir),
+        "runtime_s": round(runtime, 3), "steps_s": steps,
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }, indent=2))
+    return {**summary_row(name, case_dir, runtime, steps), "status": "ran"}
+
+def summary_row(name, case_dir, runtime, steps):
+    row = {"scenario": name, "status": "", "runtime_s": round(runtime, 1),
+           "turbo_s": steps.get(PIPELINE[0]), "solutions": None,
+           "distance": None, "neg_visibility": None, "congestion_proxy": None, "hypervolume": None}
+    best = Path(case_dir) / "outputs" / "best_layout.json"
+    if best.exists():
+        b = json.loads(best.read_text())
+        row["solutions"] = b.get("num_solutions")
+        row.update({k: round(v, 4) for k, v in b["scores"].items() if k in row})
+    metrics = Path(case_dir) / "outputs" / "metrics.csv"
+    if metrics.exists():
+        lines = metrics.read_text().strip().splitlines()
+        if len(lines) > 1:
+            row["hypervolume"] = float(lines[-1].split(",")[1])
+    return row
+
+# -------------------- SUMMARY --------------------
+def write_summary(rows, out_dir):
+    out_dir = Path(out_dir)
+    with open(out_dir / "summary.csv", "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0]))
+        w.writeheader()
+        w.writerows(rows)
+    cols = list(rows[0])
+    fmt = lambda v: "" if v is None else str(v)
+    md = ["| " + " | ".join(cols) + " |", "|" + "---|" * len(cols)]
+    md += ["| " + " | ".join(fmt(r[c]) for c in cols) + " |" for r in rows]
+    (out_dir / "summary.md").write_text("\n".join(md) + "\n")
+    print("\n".join(md))
+    print(f"✅ Saved {out_dir / 'summary.csv'} and {out_dir / 'summary.md'}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the layout pipeline over the scenarios of a manifest")
+    ap.add_argument("manifest", nargs="?", default="data/scenarios.json")
+    ap.add_argument("--out", default="outputs/batch", help="one sub-directory per scenario + summary")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="scenarios run at once (default: manifest 'workers', else cpu count)")
+    ap.add_argument("--only", nargs="+", default=None, metavar="NAME", help="run these scenarios only")
+    ap.add_argument("--force", action="store_true", help="re-run even if inputs and results are unchanged")
+    args = ap.parse_args()
+
+    scenarios, workers = load_scenarios(args.manifest)
+    if args.only:
+        unknown = set(args.only) - {n for n, _ in scenarios}
+        if unknown:
+            raise SystemExit(f"❌ unknown scenario(s): {', '.join(sorted(unknown))}")
+        scenarios = [(n, c) for n, c in scenarios if n in args.only]
+    workers = max(1, min(len(scenarios), args.workers or workers or os.cpu_count() or 1))
+    out = Path(args.out).resolve()
+    for _, cfg in scenarios:   # plans shared between scenarios reuse the same precomputed floor data
+        cfg.setdefault("cache_dir", str(out / "cache"))
+
+    # longest first (last known runtime), so the pool does not end on one long straggler
+    def last_runtime(item):
+        stamp = out / item[0] / STAMP
+        return json.loads(stamp.read_text()).get("runtime_s", 0.0) if stamp.exists() else float("inf")
+    queue = sorted(scenarios, key=last_runtime, reverse=True)
+
+    print(f"📋 {len(queue)} scenario(s), {workers} at a time -> {out}")
+    rows, t0 = {}, time.perf_counter()
+    # threads are enough: each job waits on its own subprocesses
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        jobs = {pool.submit(run_scenario, name, cfg, out / name, args.force): name for name, cfg in queue}
+        for fut in as_completed(jobs):
+            name = jobs[fut]
+            try:
+                row = fut.result()
+            except Exception as e:   # bad inputs (missing plan...) only fail this scenario
+                row = {**summary_row(name, out / name, 0.0, {}), "status": f"failed ({e})"}
+            rows[name] = row
+            icon = {"ran": "✅", "skipped": "⏭"}.get(row["status"], "❌")
+            print(f"{icon} {name}: {row['status']} in {row['runtime_s']}s")
+
+    write_summary([rows[n] for n, _ in scenarios], out)
+    print(f"⏱ batch: {time.perf_counter() - t0:.1f}s")
+    if any(r["status"].startswith("failed") for r in rows.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# src/benchmark.py
+# Stage-by-stage benchmark of the layout pipeline on synthetic floor plans.
+#   python src/benchmark.py                                  # 500..8000 px -> outputs/benchmark.json
+#   python src/benchmark.py --sizes 500 1000 --baseline outputs/benchmark_baseline.json
+# Each size runs in its own process (fresh imports, its own peak RSS) on a
+# generated plan + config.json, with the knobs of layout_nsga_turbo.
+import argparse, json, os, platform, subprocess, sys, tempfile, time, tracemalloc
+import numpy as np
+from pathlib import Path
+from PIL import Image
+
+SRC = Path(__file__).resolve().parent
+SIZES = (500, 1000, 2000, 4000, 8000)
+MPP = 0.0556   # same scale as data/config.json, so larger plans are larger buildings
+EVAL_REPEATS = 3
+DELTA_BATCHES = 50   # population-sized batches through the incremental evaluator
+
+# -------------------- SYNTHETIC FLOOR PLANS --------------------
+def synthetic_floor(size, room_px=250, seed=0):
+    """Walkable mask (1=walkable) with a grid of rooms, one door per wall segment,
+    a corridor cross through the middle and scattered obstacles -> (mask, entrances_px)."""
+    rng = np.random.default_rng(seed)
+    wall = max(2, size // 400)
+    n = max(2, size // room_px)
+    edges = np.linspace(0, size, n + 1).astype(int)
+    door = max(3 * wall, (edges[1] - edges[0]) // 4)
+    mask = np.ones((size, size), np.uint8)
+
+    # room walls, each segment between two rooms gets a door
+    for e in edges[1:-1]:
+        mask[:, e:e+wall] = 0
+        mask[e:e+wall, :] = 0
+    for a, b in zip(edges[:-1], edges[1:]):
+        for e in edges[1:-1]:
+            p = rng.integers(a + wall, max(a + wall + 1, b - door))
+            mask[p:p+door, e:e+wall] = 1
+            p = rng.integers(a + wall, max(a + wall + 1, b - door))
+            mask[e:e+wall, p:p+door] = 1
+
+    # furniture / pillars
+    for _ in range(2 * n * n):
+        h, w = rng.integers(door // 3, door, size=2)
+        y, x = rng.integers(wall, size - wall - door, size=2)
+        mask[y:y+h, x:x+w] = 0
+
+    # corridor cross (kept clear), then the outer wall
+    c, half = size // 2, door // 2
+    mask[c-half:c+half, :] = 1
+    mask[:, c-half:c+half] = 1
+    mask[:wall, :] = mask[-wall:, :] = 0
+    mask[:, :wall] = mask[:, -wall:] = 0
+
+    entrances_px = [(wall + 2, c), (size - wall - 3, c)]   # (x, y) at both ends of the corridor
+    return mask, entrances_px
+
+def write_case(case_dir, size, n_gens, seed=0, low_memory=False):
+    """data/floor.png + data/config.json for one benchmark case."""
+    data = Path(case_dir) / "data"
+    data.mkdir(parents=True, exist_ok=True)
+    (Path(case_dir) / "outputs").mkdir(exist_ok=True)
+    mask, ent_px = synthetic_floor(size, seed=seed)
+    Image.fromarray(mask * 255).save(data / "floor.png")
+    cfg = {
+        "num_objects": 8,
+        "entrances": [[x * MPP, y * MPP] for x, y in ent_px],
+        "walkable_png": "data/floor.png",
+        "meters_per_pixel": MPP,
+        "min_clearance_m": 3.0,
+        "min_obj_to_wall_m": 1.0,
+        "pop_size": 48,
+        "n_generations": n_gens,
+        "cache_dir": None, "checkpoint_path": None, "metrics_path": None,
+        "low_memory": low_memory,
+    }
+    (data / "config.json").write_text(json.dumps(cfg, indent=2))
+
+# -------------------- ONE CASE (child process) --------------------
+def run_case(n_gens, n_evals):
+    """Time every stage in the current directory's case -> result dict."""
+    import layout_nsga_turbo as T
+    from layout_config import load_config
+    from timing import timed, peak_rss_mb
+    from precompute_cache import save_npz, load_npz_mmap
+    from layout_eval import evaluate_layouts, DeltaEvaluator
+    from layout_operators import sample_layouts
+    from pymoo.termination import get_termination
+
+    T.configure(load_config())           # ./data/config.json of the case
+    tracemalloc.start()
+    stages = {}
+    floor = T.build_floor_data(stages)
+    with timed(stages, "cache_store"):
+        save_npz("cache/floor.npz", floor)
+    with timed(stages, "cache_load"):
+        load_npz_mmap("cache/floor.npz")
+
+    sites = floor["sites"]
+    min_clear = float(T.CFG["min_clearance_m"])
+    rng = np.random.default_rng(0)
+    with timed(stages, "feasible_sampling"):
+        sample_layouts(sites, T.N_OBJ, min_clear, T.POP, rng)
+    # evaluation cost does not depend on feasibility: plain random layouts
+    X = rng.integers(0, len(sites), size=(n_evals, T.N_OBJ))
+    with timed(stages, "evaluate"):
+        for _ in range(EVAL_REPEATS):
+            evaluate_layouts(X, floor, min_clear**2)
+    # offspring-like batches (one object moved per layout) through the incremental path
+    de = DeltaEvaluator(floor, min_clear**2, capacity=4 * T.POP)
+    n_delta = min(n_evals, DELTA_BATCHES * T.POP)
+    for parents in np.array_split(X[:n_delta], max(1, n_delta // T.POP)):
+        de(parents)
+        child = parents.copy()
+        child[np.arange(len(child)), rng.integers(0, T.N_OBJ, len(child))] = rng.integers(0, len(sites), len(child))
+        with timed(stages, "evaluate_delta"):
+            F, G = de(child)
+        F_ref, G_ref = evaluate_layouts(child, floor, min_clear**2)
+        assert (F == F_ref).all() and (G == G_ref).all(), "delta evaluation differs from the kernel"
+
+    problem = T.BatchedLayoutProblem(floor, min_clear)
+    algo = T.build_algorithm(floor, min_clear)
+    algo.setup(problem, termination=get_termination("n_gen", n_gens + 1), seed=42)
+    with timed(stages, "initial_population"):
+        algo.next()
+    with timed(stages, "generations"):
+        for _ in range(n_gens):
+            algo.next()
+    tracemalloc.stop()
+
+    return {
+        "sites": int(len(sites)), "nodes": int(len(floor["node_px"])),
+        "stages": stages,
+        "evals_per_s": EVAL_REPEATS * n_evals / stages["evaluate"]["s"],
+        "delta_evals_per_s": n_delta / stages["evaluate_delta"]["s"],
+        "s_per_gen": stages["generations"]["s"] / max(1, n_gens),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def run_scripts(case_dir):
+    """Wall-clock of the end-to-end scripts on the case (opt-in: layout_nsga is slow)."""
+    out = {}
+    for script in ("quick_eval_baseline.py", "layout_nsga_turbo.py", "layout_nsga.py"):
+        t0 = time.perf_counter()
+        r = subprocess.run([sys.executable, str(SRC / script)], cwd=case_dir,
+                           capture_output=True, text=True)
+        out[script] = {"s": time.perf_counter() - t0, "ok": r.returncode == 0}
+    return out
+
+# -------------------- REGRESSION CHECK --------------------
+def compare(baseline, results, tolerance, min_delta):
+    """Slowdowns of results vs baseline (same sizes) -> list of messages."""
+    base = {c["size"]: c for c in baseline["cases"]}
+    flags = []
+    for c in results["cases"]:
+        b = base.get(c["size"])
+        if b is None:
+            continue
+        for name, rec in c["stages"].items():
+            old = b["stages"].get(name, {}).get("s")
+            if old is not None and rec["s"] > old * (1 + tolerance) and rec["s"] - old > min_delta:
+                flags.append(f"{c['size']}px {name}: {old:.3f}s -> {rec['s']:.3f}s (×{rec['s'] / old:.2f})")
+        if c["evals_per_s"] < b["evals_per_s"] / (1 + tolerance):
+            flags.append(f"{c['size']}px evals/s: {b['evals_per_s']:.0f} -> {c['evals_per_s']:.0f}")
+        if c["peak_rss_mb"] is not None and b.get("peak_rss_mb") is not None \
+                and c["peak_rss_mb"] > b["peak_rss_mb"] * (1 + tolerance):
+            flags.append(f"{c['size']}px peak RSS: {b['peak_rss_mb']:.0f} MB -> {c['peak_rss_mb']:.0f} MB")
+    return flags
+
+def print_case(c):
+    st = c["stages"]
+    print(f"📏 {c['size']}² px: {c['sites']} sites, {c['nodes']} nodes, "
+          f"{c['evals_per_s']:.0f} evals/s, {c['s_per_gen']:.3f} s/gen"
+          + (f", peak RSS {c['peak_rss_mb']:.0f} MB" if c["peak_rss_mb"] is not None else ""))
+    for name, rec in st.items():
+        peak = f"  (+{rec['peak_mb']:.0f} MB)" if "peak_mb" in rec else ""
+        print(f"    {name:20s} {rec['s']:8.3f}s{peak}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the layout pipeline on synthetic floor plans")
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="plan sizes in px (square)")
+    ap.add_argument("--gens", type=int, default=5, help="timed NSGA-II generations per size")
+    ap.add_argument("--evals", type=int, default=20000, help="layouts in the batched evaluation stage")
+    ap.add_argument("--scripts", action="store_true",
+                    help="also time the end-to-end scripts (quick_eval_baseline, turbo, layout_nsga)")
+    ap.add_argument("--low-memory", action="store_true", help="run the cases with low_memory: true")
+    ap.add_argument("--out", default="outputs/benchmark.json")
+    ap.add_argument("--baseline", default=None, help="earlier benchmark.json to check for regressions")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    ap.add_argument("--min-delta", type=float, default=0.05, help="ignore stage slowdowns below this (s)")
+    ap.add_argument("--case", action="store_true", help=argparse.SUPPRESS)   # child process mode
+    args = ap.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.gens, args.evals)))
+        return
+
+    results = {
+        "meta": {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+                 "numpy": np.__version__, "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "gens": args.gens, "evals": args.evals, "low_memory": args.low_memory},
+        "cases": [],
+    }
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix=f"bench{size}-") as d:
+            write_case(d, size, args.gens, low_memory=args.low_memory)
+            r = subprocess.run([sys.executable, str(Path(__file__).resolve()), "--case",
+                                "--gens", str(args.gens), "--evals", str(args.evals)],
+                               cwd=d, capture_output=True, text=True)
+            if r.returncode != 0:
+                print(f"❌ {size}² px failed:\n{r.stderr}")
+                continue
+            case = {"size": size, **json.loads(r.stdout.strip().splitlines()[-1])}
+            if args.scripts:
+                case["scripts"] = run_scripts(d)
+        results["cases"].append(case)
+        print_case(case)
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.out).write_text(json.dumps(results, indent=2))
+    print(f"✅ Saved {args.out}")
+
+    if args.baseline:
+        flags = compare(json.loads(Path(args.baseline).read_text()), results, args.tolerance, args.min_delta)
+        for f in flags:
+            print(f"🐢 {f}")
+        if flags:
+            sys.exit(1)
+        print(f"✅ no regression vs {args.baseline} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# src/checkpoint.py
+# Full-state checkpoints of a running pymoo algorithm (pickle, written atomically) + layouts.json seeds / entries.
+import json, os, pickle, random
+import numpy as np
+from pathlib import Path
+
+CHECKPOINT_VERSION = 2   # 2: algorithm.data carries the Pareto archive
+
+def save_checkpoint(path, algorithm, generation, meta=None):
+    """Pickle the whole algorithm (population, RNG, survival/termination state) + the global RNGs.
+
+    Written to a temporary file and moved into place with os.replace, so a crash
+    mid-write leaves the previous checkpoint intact.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pop = algorithm.pop
+    state = {
+        "version": CHECKPOINT_VERSION,
+        "generation": int(generation),
+        "X": pop.get("X"), "F": pop.get("F"), "G": pop.get("G"),
+        "algorithm": algorithm,
+        "np_random": np.random.get_state(),
+        "py_random": random.getstate(),
+        "meta": meta or {},
+    }
+    tmp = path.with_name(path.name + f".tmp{os.getpid()}")
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+def load_checkpoint(path):
+    """Inverse of save_checkpoint; restores the global RNGs and returns the state dict."""
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"{path}: checkpoint version {state.get('version')} != {CHECKPOINT_VERSION}")
+    np.random.set_state(state["np_random"])
+    random.setstate(state["py_random"])
+    return state
+
+def load_seed_layouts(path, sites_xy, n_obj, floor_origin=None):
+    """Layouts from a layouts.json / best_layout.json as [K, n_obj] indices into sites_xy.
+
+    Coordinates are snapped to the nearest site; layouts with another object
+    count are skipped, duplicates are dropped (order kept). On a multi-floor plan,
+    floor_origin [K,2] moves each object from its floor ("floors") to the stacked sites.
+    """
+    from scipy.spatial import cKDTree   # kept local: readers of layouts.json entries don't pay for scipy.spatial
+    data = json.loads(Path(path).read_text())
+    entries = data["solutions"] if "solutions" in data else [data]
+    tree = cKDTree(sites_xy)
+    seeds, seen = [], set()
+    for e in entries:
+        layout = np.asarray(e["layout"], dtype=float)
+        if len(layout) != n_obj:
+            continue
+        if floor_origin is not None:
+            layout = layout + floor_origin[np.asarray(e.get("floors", [0] * n_obj), dtype=int)]
+        _, idx = tree.query(layout, k=1)
+        key = tuple(sorted(idx.tolist()))
+        if key not in seen:
+            seen.add(key)
+            seeds.append(idx)
+    return np.array(seeds, dtype=int).reshape(-1, n_obj)
+
+def solutions_json(floor, X, F):
+    """Feasible layouts -> layouts.json entries, sorted by distance.
+
+    On a multi-floor plan, coordinates are within each object's floor, listed in "floors"
+    (rounded to the µm: removing the floor offset leaves float noise, 9.674400000000006).
+    """
+    sites = floor["sites"]
+    sols = []
+    for i in np.argsort(F[:, 0], kind="stable"):
+        x = np.array(X[i], int)
+        where = {"layout": sites[x].tolist()}
+        if "site_floor" in floor:
+            k = floor["site_floor"][x]
+            where = {"layout": np.round(sites[x] - floor["floor_origin"][k], 6).tolist(), "floors": k.tolist()}
+        sols.append({**where,
+                     "scores": {"distance": float(F[i, 0]),
+                                "neg_visibility": float(F[i, 1]),
+                                "congestion_proxy": float(F[i, 2])}})
+    return sols
@@ -0,0 +1,351 @@
+# src/floorplan.py
+# Shared floor-plan precomputations for the layout scripts (pure functions, no I/O at import).
+import math
+import numpy as np
+from PIL import Image
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.ndimage import distance_transform_edt
+
+# -------------------- PACKED MASK (LOW MEMORY) --------------------
+class PackedMask:
+    """Binary mask kept 8 pixels per byte (np.packbits along rows), read like the uint8 mask.
+
+    Supports what the precomputations use: .shape, mask[row_slice, col_slice]
+    (unpacked uint8 block) and mask[yi, xi] with integer index arrays.
+    """
+    def __init__(self, bits, shape):
+        self.bits = bits
+        self.shape = tuple(int(v) for v in shape)
+
+    @classmethod
+    def pack(cls, mask):
+        return cls(np.packbits(np.asarray(mask) != 0, axis=1), mask.shape)
+
+    def __getitem__(self, key):
+        ys, xs = key
+        if isinstance(ys, slice):
+            return np.unpackbits(self.bits[ys], axis=1, count=self.shape[1])[:, xs]
+        xs = np.asarray(xs)
+        return (self.bits[ys, xs >> 3] >> (7 - (xs & 7))) & 1
+
+# -------------------- LOAD MASKS --------------------
+def load_mask(path):
+    # white=1, black=0
+    return (np.array(Image.open(path).convert("L")) > 127).astype(np.uint8)
+
+def load_mask_packed(path, strip=1024):
+    """load_mask kept bit-packed (floorplan.PackedMask), thresholded strip by strip."""
+    img = Image.open(path)
+    if img.mode != "L":
+        img = img.convert("L")
+    W, H = img.size
+    bits = np.empty((H, (W + 7) // 8), dtype=np.uint8)
+    for y0 in range(0, H, strip):
+        rows = np.asarray(img.crop((0, y0, W, min(H, y0 + strip))))
+        bits[y0:y0 + len(rows)] = np.packbits(rows > 127, axis=1)
+    return PackedMask(bits, (H, W))
+
+# -------------------- CANDIDATE SITES --------------------
+def sample_sites(mask, dist_m, mpp, stride_px=6, min_wall_m=0.0, placeable_mask=None):
+    """[S,2] candidate positions (m): stride grid, walkable, >= min_wall_m from walls, placeable."""
+    ys = np.arange(0, mask.shape[0], stride_px)
+    xs = np.arange(0, mask.shape[1], stride_px)
+    xx, yy = np.meshgrid(xs, ys)
+    walk_ok = (mask[yy, xx] == 1)
+    wall_ok = (dist_m[yy, xx] >= min_wall_m)
+    if placeable_mask is not None:
+        place_ok = (placeable_mask[yy, xx] == 1)
+        keep = walk_ok & wall_ok & place_ok
+    else:
+        keep = walk_ok & wall_ok
+    pts = np.stack([xx[keep]*mpp, yy[keep]*mpp], axis=1)
+    return pts
+
+def sample_sites_strips(mask, mpp, stride_px=6, min_wall_m=0.0, placeable_mask=None, strip_px=128):
+    """sample_sites without a full-plan distance transform (same sites, same order).
+
+    The EDT runs on horizontal strips with a halo wider than min_wall_m: a wall
+    closer than that is always inside the strip, so the wall test is exact.
+    mask / placeable_mask can be PackedMask.
+    """
+    H, W = mask.shape
+    halo = int(np.ceil(min_wall_m / mpp)) + 2
+    ys = np.arange(0, H, stride_px)
+    xs = np.arange(0, W, stride_px)
+    step = max(1, strip_px // stride_px) * stride_px      # strips start on grid rows
+    pts = []
+    for y0 in range(0, H, step):
+        yg = ys[(ys >= y0) & (ys < y0 + step)]
+        a, b = max(0, y0 - halo), min(H, y0 + step + halo)
+        sub = np.asarray(mask[a:b, :], dtype=np.uint8)
+        xx, yy = np.meshgrid(xs, yg)
+        walk_ok = (sub[yy - a, xx] == 1)
+        if sub.all():
+            wall_ok = np.ones_like(walk_ok)               # no wall within the halo
+        else:
+            wall_ok = (distance_transform_edt(sub)[yy - a, xx] * mpp >= min_wall_m)
+        keep = walk_ok & wall_ok
+        if placeable_mask is not None:
+            keep &= (placeable_mask[yy, xx] == 1)
+        pts.append(np.stack([xx[keep]*mpp, yy[keep]*mpp], axis=1))
+    return np.concatenate(pts) if pts else np.empty((0, 2))
+
+# -------------------- VISIBILITY --------------------
+def site_visibility(mask, points_xy, mpp, max_range_m=12.0, rays=8, chunk=2048):
+    """Mean free ray length (m) around each point -> [N].
+
+    This is the per-point term of the scalar visibility_score loops: rays marched
+    by 2 px steps (r += step) until they hit a wall / the border or leave the range.
+    It only depends on the point, so it is computed once per site and gathered.
+    """
+    points_xy = np.asarray(points_xy, dtype=float).reshape(-1, 2)
+    out = np.zeros(len(points_xy))
+    if len(points_xy) == 0: return out
+    H, W = mask.shape
+    step = mpp*2
+    angles = np.linspace(0, 2*math.pi, rays, endpoint=False)
+    # radii exactly as the scalar loop accumulates them, plus the first one past range
+    radii = [0.0]
+    while radii[-1] <= max_range_m:
+        radii.append(radii[-1] + step)
+    radii = np.array(radii)
+
+    for s in range(0, len(points_xy), chunk):
+        px = points_xy[s:s+chunk, 0, None]
+        py = points_xy[s:s+chunk, 1, None]
+        v = np.zeros(len(px))
+        for ang in angles:
+            xi = np.trunc((px + math.cos(ang)*radii[:-1]) / mpp).astype(np.int64)  # [n,K]
+            yi = np.trunc((py + math.sin(ang)*radii[:-1]) / mpp).astype(np.int64)
+            inside = (xi >= 0) & (yi >= 0) & (xi < W) & (yi < H)
+            blocked = ~inside
+            blocked[inside] = mask[yi[inside], xi[inside]] == 0
+            # first blocked step, or the step that leaves the range if nothing blocks the ray
+            hit = np.where(blocked.any(axis=1), blocked.argmax(axis=1), len(radii) - 1)
+            v += radii[hit]
+        out[s:s+chunk] = v / rays
+    return out
+
+# -------------------- NAV GRAPH (SPARSE LATTICE) --------------------
+def build_nav_graph(mask, step_px, mpp, compact=False):
+    """8-neighbour lattice on walkable pixels every step_px, built with index arithmetic.
+
+    Returns (node_px [M,2] int (x, y) in pixels, graph [M,M] symmetric CSR of edge
+    lengths in meters). Nodes are numbered row-major; edges and weights are the
+    same as the former networkx build_graph (math.hypot(dx, dy) * mpp).
+    compact=True builds the same graph straight into CSR with int32 ids and
+    float32 lengths (no COO edge lists), for large plans.
+    """
+    H, W = mask.shape
+    ys = np.arange(0, H, step_px)
+    xs = np.arange(0, W, step_px)
+    walk = mask[::step_px, ::step_px] == 1          # [gh, gw]
+    gy, gx = np.nonzero(walk)                        # row-major order
+    M = len(gy)
+    if compact:
+        return _compact_nav_graph(walk, gy, gx, xs, ys, step_px, mpp)
+    ids = np.full(walk.shape, -1, dtype=np.int64)
+    ids[gy, gx] = np.arange(M)
+    node_px = np.stack([xs[gx], ys[gy]], axis=1)
+
+    rows, cols, wts = [], [], []
+    for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+        ny_, nx_ = gy + dy, gx + dx
+        ok = (nx_ >= 0) & (nx_ < walk.shape[1]) & (ny_ >= 0) & (ny_ < walk.shape[0])
+        u = np.flatnonzero(ok)
+        v = ids[ny_[ok], nx_[ok]]
+        keep = v >= 0
+        u, v = u[keep], v[keep]
+        w = math.hypot(dx*step_px, dy*step_px)*mpp
+        rows += [u, v]; cols += [v, u]
+        wts.append(np.full(2*len(u), w))
+    graph = csr_matrix((np.concatenate(wts), (np.concatenate(rows), np.concatenate(cols))), shape=(M, M))
+    return node_px, graph
+
+def _compact_nav_graph(walk, gy, gx, xs, ys, step_px, mpp):
+    M = len(gy)
+    gy, gx = gy.astype(np.int32), gx.astype(np.int32)
+    ids = np.full(walk.shape, -1, dtype=np.int32)
+    ids[gy, gx] = np.arange(M, dtype=np.int32)
+    node_px = np.stack([xs[gx], ys[gy]], axis=1).astype(np.int32)
+    # neighbours in increasing id order (row-major), so each CSR row is sorted
+    offsets = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+    nbr = np.full((M, 8), -1, dtype=np.int32)
+    for o, (dy, dx) in enumerate(offsets):
+        ny_, nx_ = gy + dy, gx + dx
+        ok = (nx_ >= 0) & (nx_ < walk.shape[1]) & (ny_ >= 0) & (ny_ < walk.shape[0])
+        nbr[ok, o] = ids[ny_[ok], nx_[ok]]
+    valid = nbr >= 0
+    w = np.array([math.hypot(dx*step_px, dy*step_px)*mpp for dy, dx in offsets], dtype=np.float32)
+    indptr = np.zeros(M + 1, dtype=np.int64)
+    np.cumsum(valid.sum(axis=1), out=indptr[1:])
+    graph = csr_matrix((np.broadcast_to(w, nbr.shape)[valid], nbr[valid], indptr), shape=(M, M))
+    return node_px, graph
+
+def stack_nav_graphs(graphs, links=()):
+    """Per-floor nav graphs as one block-diagonal CSR + connector edges (stairs, lifts...).
+
+    Floor k's nodes are numbered after those of floors 0..k-1; links are
+    (node_a, node_b, length_m) in those stacked ids, added in both directions.
+    Returns (graph [M,M] CSR, node offsets [K]).
+    """
+    sizes = [g.shape[0] for g in graphs]
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    M = int(sum(sizes))
+    rows, cols, data = [], [], []
+    for g, off in zip(graphs, offsets):
+        g = g.tocoo()
+        rows.append(g.row.astype(np.int64) + off)
+        cols.append(g.col.astype(np.int64) + off)
+        data.append(g.data)
+    dtype = np.result_type(*[g.dtype for g in graphs])
+    for a, b, length in links:
+        rows.append(np.array([a, b], np.int64))
+        cols.append(np.array([b, a], np.int64))
+        data.append(np.full(2, length, dtype))
+    graph = csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))), shape=(M, M))
+    return graph, offsets
+
+def entrance_distances(graph, sources, unreachable=1e12, return_predecessors=False):
+    """Shortest path lengths from every source node to all nodes -> [E, M] (one Dijkstra call).
+
+    With return_predecessors, also returns the shortest-path trees as [E, M]
+    predecessor arrays (-9999 for the roots and unreachable nodes, as scipy does).
+    """
+    res = dijkstra(graph, directed=True, indices=np.asarray(sources, dtype=np.int64),
+                   return_predecessors=return_predecessors)
+    d, pred = res if return_predecessors else (res, None)
+    d = np.atleast_2d(d)
+    d[np.isinf(d)] = unreachable
+    if return_predecessors:
+        return d, np.atleast_2d(pred)
+    return d
+
+# -------------------- GEODESIC DISTANCES (PIXEL LATTICE) --------------------
+def geodesic_fields(mask, sources_px, mpp, unreachable=1e12, compact=False):
+    """Walking distance (m) from each source over the 8-neighbour pixel lattice -> [E,H,W] float32.
+
+    Sources (x, y in px) are snapped to the nearest walkable pixel; obstacle and
+    unreachable pixels get `unreachable`. compact: see build_nav_graph.
+    """
+    from scipy.spatial import cKDTree
+    node_px, graph = build_nav_graph(mask, 1, mpp, compact=compact)
+    _, src = cKDTree(node_px).query(np.asarray(sources_px, dtype=float).reshape(-1, 2), k=1)
+    d = entrance_distances(graph, src, unreachable)               # [E,M]
+    out = np.full((len(d),) + mask.shape, unreachable, dtype=np.float32)
+    out[:, node_px[:, 1], node_px[:, 0]] = d
+    return out
+
+def site_geodesic_pairs(mask, sites_px, mpp, radius_m, tile=64):
+    """Walking distance between sites less than radius_m apart (pixel lattice), as a sorted pair list.
+
+    Returns (keys int64 [K] = i*S + j with i < j, ascending; dist float32 [K] in m).
+    Pairs not listed are at least radius_m apart. Computed tile by tile: Dijkstra
+    bounded by radius_m from the sites of a tile, on the lattice of the tile plus a
+    halo of radius_m (a shorter path cannot leave that window).
+    """
+    sites_px = np.asarray(sites_px, dtype=np.int64).reshape(-1, 2)
+    S = len(sites_px)
+    H, W = mask.shape
+    r = int(math.ceil(radius_m / mpp)) + 1
+    tile = max(tile, r)                     # a site's partners are in its own or a neighbouring tile
+    tx, ty = sites_px[:, 0] // tile, sites_px[:, 1] // tile
+    cells = {}
+    for i, c in enumerate(zip(ty.tolist(), tx.tolist())):
+        cells.setdefault(c, []).append(i)
+    keys, dist = [], []
+    for (cy, cx), src in cells.items():
+        src = np.array(src)
+        tgt = np.concatenate([cells.get((cy + dy, cx + dx), []) for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+        tgt = tgt.astype(np.int64)
+        x0, y0 = max(0, cx * tile - r), max(0, cy * tile - r)
+        x1, y1 = min(W, (cx + 1) * tile + r), min(H, (cy + 1) * tile + r)
+        tx_, ty_ = sites_px[tgt, 0] - x0, sites_px[tgt, 1] - y0
+        inside = (tx_ >= 0) & (ty_ >= 0) & (tx_ < x1 - x0) & (ty_ < y1 - y0)
+        tgt, tx_, ty_ = tgt[inside], tx_[inside], ty_[inside]
+        if len(tgt) < 2:
+            continue
+        node_px, graph = build_nav_graph(mask[y0:y1, x0:x1], 1, mpp)
+        ids = np.full((y1 - y0, x1 - x0), -1, dtype=np.int64)
+        ids[node_px[:, 1], node_px[:, 0]] = np.arange(len(node_px))
+        tgt_node = ids[ty_, tx_]
+        src_node = ids[sites_px[src, 1] - y0, sites_px[src, 0] - x0]
+        src, src_node = src[src_node >= 0], src_node[src_node >= 0]
+        for s in range(0, len(src), 512):
+            d = dijkstra(graph, directed=True, indices=src_node[s:s+512], limit=radius_m)
+            d = d[:, np.maximum(tgt_node, 0)]
+            d[:, tgt_node < 0] = np.inf
+            # each pair once, from its smaller index
+            i, j = np.nonzero((d < radius_m) & (src[s:s+512, None] < tgt[None, :]))
+            keys.append(src[s:s+512][i] * S + tgt[j])
+            dist.append(d[i, j].astype(np.float32))
+    keys = np.concatenate(keys) if keys else np.empty(0, np.int64)
+    dist = np.concatenate(dist) if dist else np.empty(0, np.float32)
+    order = np.argsort(keys, kind="stable")
+    return keys[order], dist[order]
+
+def degree_centrality(graph):
+    """Same values as nx.degree_centrality, as an array over the CSR nodes."""
+    M = graph.shape[0]
+    deg = np.diff(graph.indptr).astype(float)
+    return deg * (1.0/(M - 1)) if M > 1 else np.ones(M)
+
+# -------------------- CONGESTION FIELDS --------------------
+CONGESTION_MODELS = ("degree", "betweenness", "entrance_flow")
+
+def tree_flow(pred, root):
+    """Subtree sizes of the shortest-path tree rooted at root -> [M].
+
+    flow[v] = number of nodes whose shortest path from the root goes through v
+    (v included); 0 for unreachable nodes. Depths come from pointer jumping and
+    subtrees are summed level by level, so there is no per-node Python loop.
+    """
+    M = len(pred)
+    has_parent = pred >= 0
+    parent = np.where(has_parent, pred, np.arange(M))
+    reached = has_parent.copy()
+    reached[root] = True
+    # depth by pointer jumping: depth[v] = hops from v to anc[v], anc doubles each round
+    depth = has_parent.astype(np.int64)
+    anc = parent
+    while True:
+        nxt = anc[anc]
+        depth = depth + depth[anc]
+        if np.array_equal(nxt, anc): break
+        anc = nxt
+    flow = reached.astype(float)
+    order = np.argsort(-depth, kind="stable")
+    levels = np.split(order, np.flatnonzero(np.diff(depth[order])) + 1)
+    for nodes in levels:
+        nodes = nodes[has_parent[nodes]]
+        np.add.at(flow, parent[nodes], flow[nodes])
+    return flow
+
+def congestion_field(graph, model="degree", preds=None, roots=None, k=400, seed=42):
+    """Per-node crowding value used by f3 (mean over the placed objects' nodes) -> [M].
+
+    degree        : degree centrality (nearly constant on a lattice, cheap).
+    betweenness   : sampled betweenness (k pivots), computed once instead of per evaluation.
+    entrance_flow : share of the entrance-to-everywhere shortest paths crossing each
+                    node, from the entrance Dijkstra trees (preds, rooted at roots),
+                    averaged over entrances.
+    """
+    M = graph.shape[0]
+    if model == "degree":
+        return degree_centrality(graph)
+    if model == "betweenness":
+        import networkx as nx
+        G = nx.from_scipy_sparse_array(graph)
+        bw = nx.betweenness_centrality(G, k=min(k, M), seed=seed)
+        return np.array([bw[i] for i in range(M)], dtype=float)
+    if model == "entrance_flow":
+        if preds is None or roots is None:
+            raise ValueError("entrance_flow needs the entrance shortest-path trees (preds, roots)")
+        preds = np.atleast_2d(preds)
+        field = np.zeros(M)
+        for pred, root in zip(preds, roots):
+            flow = tree_flow(pred, root)
+            field += flow / flow[root]   # root flow = number of reached nodes
+        return field / len(preds)
+    raise ValueError(f"unknown congestion model {model!r}, expected one of {CONGESTION_MODELS}")
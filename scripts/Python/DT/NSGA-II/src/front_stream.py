@@ -0,0 +1,191 @@
+# src/front_stream.py
+# Compact append-only stream of the Pareto archive, with a lazy / memory-mapped reader
+# and the layouts.json export.
+#
+# <dir>/meta.json    n_obj, n_f, meters_per_pixel, dtypes (+ floor names)
+# <dir>/sites.npz    sites [S,2], stored once (+ site_floor / floor_origin on a multi-floor plan)
+# <dir>/X.i32        int32 [rows, n_obj]: each layout that entered the archive, in order
+# <dir>/F.f64        float64 [rows, n_f]: its objectives
+# <dir>/gens.jsonl   one line per generation: {"gen", "start", "count", "hv", "archive"}
+# <dir>/front.npy    rows of the archive when the run ended (archive order)
+#
+# Rows are written before their gens.jsonl line, so a run killed mid-write leaves
+# a readable stream (the reader ignores unindexed rows).
+#
+#   python src/front_stream.py outputs/front                          # summary
+#   python src/front_stream.py outputs/front --export outputs/layouts.json [--gen G] [--limit K]
+import argparse, json, os
+import numpy as np
+from functools import cached_property
+from pathlib import Path
+
+from checkpoint import solutions_json
+
+X_DTYPE, F_DTYPE = np.dtype("<i4"), np.dtype("<f8")
+FLOOR_KEYS = ("sites", "site_floor", "floor_origin")
+
+def _write_atomic(path, write):
+    tmp = path.with_name(path.name + f".tmp{os.getpid()}")
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+class FrontStreamWriter:
+    """Appends each generation's archive additions to a stream directory.
+
+    append(gen, archive) after archive.observe / update writes the archived layouts
+    the stream has not seen yet, so the whole run costs one row per layout that was
+    ever non-dominated (a layout that leaves the archive never comes back).
+    resume_gen: keep an existing stream up to that generation (the checkpoint's)
+    and continue it, instead of starting over.
+    """
+    def __init__(self, path, floor, n_obj, meters_per_pixel, floor_names=None, n_f=3, resume_gen=None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.n_obj, self.n_f = int(n_obj), int(n_f)
+        self.keys = {}   # sorted layout bytes -> row, to locate the final front
+        if resume_gen is not None and (self.path / "gens.jsonl").exists():
+            self.rows = self._truncate(int(resume_gen))
+        else:
+            for name in ("X.i32", "F.f64", "gens.jsonl", "front.npy"):
+                (self.path / name).unlink(missing_ok=True)
+            meta = {"n_obj": self.n_obj, "n_f": self.n_f, "meters_per_pixel": float(meters_per_pixel),
+                    "x_dtype": X_DTYPE.str, "f_dtype": F_DTYPE.str,
+                    **({"floors": list(floor_names)} if floor_names else {})}
+            _write_atomic(self.path / "meta.json", lambda f: f.write(json.dumps(meta, indent=2).encode()))
+            _write_atomic(self.path / "sites.npz",
+                          lambda f: np.savez(f, **{k: np.asarray(floor[k]) for k in FLOOR_KEYS if k in floor}))
+            self.rows = 0
+        self._x = open(self.path / "X.i32", "ab")
+        self._f = open(self.path / "F.f64", "ab")
+        self._idx = open(self.path / "gens.jsonl", "a")
+
+    def _truncate(self, gen):
+        lines = [l for l in (self.path / "gens.jsonl").read_text().splitlines() if l.strip()]
+        keep = [l for l in lines if json.loads(l)["gen"] <= gen]
+        rows = sum(json.loads(l)["count"] for l in keep)
+        with open(self.path / "X.i32", "r+b") as f:
+            f.truncate(rows * self.n_obj * X_DTYPE.itemsize)
+        with open(self.path / "F.f64", "r+b") as f:
+            f.truncate(rows * self.n_f * F_DTYPE.itemsize)
+        (self.path / "gens.jsonl").write_text("".join(l + "\n" for l in keep))
+        (self.path / "front.npy").unlink(missing_ok=True)
+        X = np.fromfile(self.path / "X.i32", dtype=X_DTYPE).reshape(rows, self.n_obj)
+        self.keys = {bytes(k): r for r, k in enumerate(np.sort(X, axis=1))}
+        return rows
+
+    def append(self, gen, archive):
+        """Write the archive's layouts not streamed yet + the generation's index line."""
+        X = np.asarray(archive.X, dtype=X_DTYPE)
+        keys = [bytes(k) for k in np.sort(X, axis=1)]
+        new = [i for i, k in enumerate(keys) if k not in self.keys]
+        self._x.write(X[new].tobytes()); self._x.flush()
+        self._f.write(np.asarray(archive.F[new], dtype=F_DTYPE).tobytes()); self._f.flush()
+        for r, i in enumerate(new):
+            self.keys[keys[i]] = self.rows + r
+        hv = archive.history[-1][1] if archive.history else 0.0
+        self._idx.write(json.dumps({"gen": int(gen), "start": self.rows, "count": len(new),
+                                    "hv": round(float(hv), 6), "archive": len(archive)}) + "\n")
+        self._idx.flush()
+        self.rows += len(new)
+
+    def close(self, archive=None):
+        """Close the files; with the final archive, record which rows it holds (front.npy)."""
+        if archive is not None:
+            rows = np.array([self.keys[bytes(k)] for k in np.sort(archive.X.astype(X_DTYPE), axis=1)], dtype=np.int64)
+            _write_atomic(self.path / "front.npy", lambda f: np.save(f, rows))   # archive order
+        for f in (self._x, self._f, self._idx):
+            f.close()
+
+class FrontStream:
+    """Reader: X / F are memory-mapped over every indexed row, generations are read lazily."""
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        self.n_obj, self.n_f = self.meta["n_obj"], self.meta["n_f"]
+        x_row = self.n_obj * np.dtype(self.meta["x_dtype"]).itemsize
+        f_row = self.n_f * np.dtype(self.meta["f_dtype"]).itemsize
+        on_disk = min(os.path.getsize(self.path / "X.i32") // x_row, os.path.getsize(self.path / "F.f64") // f_row)
+        self.index = []
+        for line in (self.path / "gens.jsonl").read_text().splitlines():
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                break   # partial last line
+            if rec["start"] + rec["count"] > on_disk:
+                break
+            self.index.append(rec)
+        self.rows = self.index[-1]["start"] + self.index[-1]["count"] if self.index else 0
+        self.X = self._map("X.i32", self.meta["x_dtype"], self.n_obj)
+        self.F = self._map("F.f64", self.meta["f_dtype"], self.n_f)
+
+    def _map(self, name, dtype, width):
+        if self.rows == 0:
+            return np.empty((0, width), dtype=dtype)
+        return np.memmap(self.path / name, dtype=dtype, mode="r", shape=(self.rows, width))
+
+    def __len__(self):
+        return len(self.index)
+
+    @cached_property
+    def floor(self):
+        """sites (+ site_floor / floor_origin) as a floor dict for checkpoint.solutions_json."""
+        with np.load(self.path / "sites.npz") as z:
+            return {k: z[k] for k in z.files}
+
+    def generations(self):
+        """Yield (gen, X, F) of the rows each generation added (memmap slices)."""
+        for rec in self.index:
+            a, b = rec["start"], rec["start"] + rec["count"]
+            yield rec["gen"], self.X[a:b], self.F[a:b]
+
+    def fronts(self):
+        """Yield (gen, X, F) of the whole archive after each generation (replayed)."""
+        from pareto_archive import ParetoArchive   # pymoo import, only needed for the replay
+        archive = ParetoArchive(self.n_obj, self.n_f)
+        for gen, X, F in self.generations():
+            archive.update(X, F)
+            yield gen, archive.X, archive.F
+
+    def front(self, gen=None):
+        """Archive at the end of generation gen (default: the end of the run) -> (X, F)."""
+        if gen is None and (self.path / "front.npy").exists():
+            rows = np.load(self.path / "front.npy")
+            if len(rows) == 0 or rows.max() < self.rows:
+                return np.asarray(self.X[rows]), np.asarray(self.F[rows])
+        X, F = np.empty((0, self.n_obj), dtype=int), np.empty((0, self.n_f))
+        for g, Xg, Fg in self.fronts():
+            if gen is not None and g > gen:
+                break
+            X, F = Xg, Fg
+        return X, F
+
+    def layouts_json(self, gen=None, limit=None):
+        """The front as a layouts.json dict (same schema as the turbo export)."""
+        X, F = self.front(gen)
+        return {"meters_per_pixel": self.meta["meters_per_pixel"],
+                **({"floors": self.meta["floors"]} if "floors" in self.meta else {}),
+                **({"generation": int(gen)} if gen is not None else {}),
+                "solutions": solutions_json(self.floor, X, F)[:limit]}
+
+def main():
+    ap = argparse.ArgumentParser(description="Inspect / export a front stream (turbo front_stream output)")
+    ap.add_argument("stream", help="stream directory, e.g. outputs/front")
+    ap.add_argument("--export", default=None, metavar="LAYOUTS_JSON", help="write the front as layouts.json")
+    ap.add_argument("--gen", type=int, default=None, help="front at this generation (default: final)")
+    ap.add_argument("--limit", type=int, default=None, help="keep the first K solutions (by distance)")
+    args = ap.parse_args()
+
+    fs = FrontStream(args.stream)
+    size = sum(p.stat().st_size for p in fs.path.iterdir() if p.is_file())
+    last = fs.index[-1] if fs.index else {"gen": None, "archive": 0, "hv": 0.0}
+    print(f"📦 {fs.path}: {len(fs)} gens, {fs.rows} archived rows, {len(fs.floor['sites'])} sites, "
+          f"{size / 2**10:.0f} KiB | last gen {last['gen']}: archive {last['archive']}, hv {last['hv']:.4f}")
+    if args.export:
+        data = fs.layouts_json(args.gen, args.limit)
+        Path(args.export).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.export).write_text(json.dumps(data, indent=2))
+        print(f"✅ Saved {args.export} with {len(data['solutions'])} Pareto solutions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# src/layout_config.py
+# Knobs of the layout optimiser: one table of names, config keys and defaults, read
+# from a config dict (data/config.json) by layout_nsga_turbo.py and layout_engine.py.
+import json
+import numpy as np
+from pathlib import Path
+
+CONFIG_PATH = "data/config.json"
+
+# name: (config key, default, type); a callable default is computed from the config
+KNOBS = {
+    # speed/quality knobs
+    "GRAPH_STEP_PX":     ("graph_step_px", 6, int),           # 3 precise, 6 fast
+    "SITE_STRIDE_PX":    ("site_stride_px", 6, int),          # candidate sampling stride
+    "VIS_RAYS":          ("vis_rays", 24, int),               # precomputed once per site, so precise is free
+    "VIS_RANGE_M":       ("vis_range_m", 12.0, float),        # max LOS range
+    "POP":               ("pop_size", 48, int),               # 96 precise, 48 fast
+    "N_GEN":             ("n_generations", 160, int),         # 160 precise, 60 fast
+    "REOPT_GEN":         ("reopt_generations", lambda c: max(1, int(c.get("n_generations", 160)) // 4), int),  # LayoutEngine.re_optimize budget
+    "MIN_CLEAR_M":       ("min_clearance_m", 0.6, float),     # min distance between two objects (m)
+    "MIN_OBJ_TO_WALL_M": ("min_obj_to_wall_m", 3.0, float),   # min distance to walls (m)
+    "PLACEABLE_PATH":    ("placeable_png", None, None),       # optional path to placeable mask
+    "CACHE_DIR":         ("cache_dir", "cache", None),        # precomputed floor data (null = off)
+    "CHECKPOINT_EVERY":  ("checkpoint_every", 10, int),
+    "CHECKPOINT_PATH":   ("checkpoint_path", "outputs/checkpoint.pkl", None),  # full algorithm state (null = off)
+    "BATCHED_EVAL":      ("batched_eval", True, bool),        # whole population per _evaluate call
+    "N_WORKERS":         ("n_workers", 1, int),               # >1: batched evaluation over a process pool
+    "DELTA_EVAL":        ("delta_eval", False, None),         # true: update offspring from a cached near-identical layout | "check"
+    "DELTA_MAX_CHANGED": ("delta_max_changed", 2, int),       # objects moved at most, else full evaluation
+    "CONGESTION_MODEL":  ("congestion_model", "degree", None),  # degree | betweenness | entrance_flow
+    "BETWEENNESS_K":     ("betweenness_k", 400, int),         # pivots for the sampled betweenness model
+    "DISTANCE_MODEL":    ("distance_model", "graph", None),   # graph (coarse nav graph, straight-line clearance) | geodesic (pixel lattice)
+    "GEODESIC_RANGE_M":  ("geodesic_range_m", lambda c: c.get("min_clearance_m", 0.6), float),  # site pairs kept, must be >= min clearance
+    "CLEARANCE_REPAIR":  ("clearance_repair", True, bool),    # move too-close objects to the nearest free site
+    "OPERATORS":         ("operators", "locality", None),     # locality (set blend crossover + kNN mutation) | default (pymoo SBX/PM)
+    "MUTATION_K":        ("mutation_k", 8, int),              # neighbouring sites an object can move to
+    "STALL_WINDOW":      ("stall_window", 0, int),            # >0: stop when archive HV stalls over this many gens
+    "STALL_TOL":         ("stall_tol", 1e-3, float),          # relative HV gain below which the window counts as stalled
+    "HV_IDEAL":          ("hv_ideal", None, None),            # [f1, f2, f3] mapped to 0 for the hypervolume (default: best over the plan)
+    "HV_NADIR":          ("hv_nadir", None, None),            # [f1, f2, f3] mapped to 1 (default: worst over the plan)
+    "METRICS_PATH":      ("metrics_path", "outputs/metrics.csv", None),  # per-gen hypervolume / archive size
+    "TELEMETRY_PATH":    ("telemetry_path", "outputs/telemetry.jsonl", None),  # per-gen timings/counts (null = off)
+    "TELEMETRY_SAMPLE":  ("telemetry_sample", 1, int),        # time every k-th evaluation call (counts stay exact)
+    "ISLANDS":           ("islands", 1, int),                 # >1: island model, one population per process
+    "ISLAND_OPERATORS":  ("island_operators", None, None),    # e.g. ["locality", "default"], cycled over the islands
+    "MIGRATE_EVERY":     ("migrate_every", 10, int),          # gens between migrations
+    "MIGRANTS":          ("migrants", 4, int),                # elite layouts sent to the next island (ring)
+    "LOW_MEMORY":        ("low_memory", False, bool),         # bit-packed masks, strip EDT, int32/float32 floor arrays
+    "SURROGATE":         ("surrogate", False, bool),          # pre-screen over-generated offspring with a cheap fitted model
+    "SURROGATE_OVERSAMPLE": ("surrogate_oversample", 4, int),  # candidates mated per truly evaluated offspring
+    "SURROGATE_RETRAIN": ("surrogate_retrain", 5, int),       # gens between model refits
+    "SURROGATE_CELL_M":  ("surrogate_cell_m", 1.0, float),    # sites in the same cell share a weight
+    "FLOORS":            ("floors", None, None),              # [{name, walkable_png, placeable_png, min_objects, max_objects}]: stacked multi-floor plan
+    "STAIRS":            ("stairs", [], None),                # [{"a": [x, y, floor], "b": [x, y, floor], "length_m": L}] links between floors
+    "STAIR_LENGTH_M":    ("stair_length_m", 8.0, float),      # walking length of a link without length_m
+    "FRONT_STREAM":      ("front_stream", None, None),        # dir: compact append-only archive stream (front_stream.py), replaces layouts_partial.json
+    "MULTIRES":          ("multires", None, None),            # coarse-to-fine levels (layout_nsga_turbo MULTI-RESOLUTION)
+}
+
+def load_config(path=CONFIG_PATH):
+    return json.loads(Path(path).read_text())
+
+def read_knobs(cfg):
+    """Config dict -> {name: value} for every knob, plus the plan itself
+    (MPP, N_OBJ, ENTRANCES [E,2], ENT_FLOOR [E]: entrances are [x, y] or [x, y, floor])."""
+    knobs = {
+        "MPP": float(cfg["meters_per_pixel"]),
+        "N_OBJ": int(cfg["num_objects"]),
+        "ENTRANCES": np.array([e[:2] for e in cfg["entrances"]], dtype=float),
+        "ENT_FLOOR": np.array([int(e[2]) if len(e) > 2 else 0 for e in cfg["entrances"]]),
+    }
+    for name, (key, default, kind) in KNOBS.items():
+        value = cfg.get(key, default(cfg) if callable(default) else default)
+        knobs[name] = kind(value) if kind is not None and value is not None else value
+    return knobs
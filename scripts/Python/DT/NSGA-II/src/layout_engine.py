@@ -0,0 +1,215 @@
+# src/layout_engine.py
+# In-process optimiser: floor data built lazily from a config dict and kept between calls.
+#
+#   from layout_engine import LayoutEngine
+#   eng = LayoutEngine(json.loads(Path("data/config.json").read_text()))
+#   front = eng.optimize()                          # same dict as outputs/layouts.json
+#   F, G = eng.evaluate(layouts)                    # [P,N,2] meters or [P,N] site indices
+#   front = eng.re_optimize({1: [9.0, 7.5]})        # entrance 1 moved: only the entrance stages rerun
+#
+# Single plan, graph distances; floors / multires / islands / geodesic stay in layout_nsga_turbo.py.
+import numpy as np
+from functools import cached_property
+from pathlib import Path
+from scipy.spatial import cKDTree
+from scipy.ndimage import distance_transform_edt
+from pymoo.core.problem import Problem
+from pymoo.algorithms.moo.nsga2 import NSGA2
+
+from floorplan import load_mask, sample_sites, site_visibility, build_nav_graph, entrance_distances, congestion_field
+from layout_eval import evaluate_layouts, objective_bounds
+from layout_operators import WarmStartSampling, nsga2_operators
+from layout_config import read_knobs
+from checkpoint import solutions_json
+from pareto_archive import ParetoArchive, stall_termination
+from timing import timed
+
+ENTRANCE_MEMORY = 4   # entrance sets whose distances / congestion are kept (switching back is free)
+
+class _EngineProblem(Problem):
+    """Batched layout problem over an engine's floor dict (layout_eval.evaluate_layouts)."""
+    def __init__(self, floor, n_obj, min_clear_m):
+        super().__init__(n_var=n_obj, n_obj=3, n_constr=1, xl=0, xu=len(floor["sites"])-1, type_var=int)
+        self.floor = floor
+        self.sites = floor["sites"]
+        self.min_clear2 = min_clear_m**2
+
+    def _evaluate(self, X, out, *args, **kwargs):
+        out["F"], out["G"] = evaluate_layouts(X, self.floor, self.min_clear2)
+
+class LayoutEngine:
+    """Layout optimisation as an object: config dict -> optimize / evaluate / re_optimize.
+
+    Precomputations are cached properties, built on first use and kept: plan-level
+    ones (mask, EDT, sites, nav graph, visibility) for the engine's lifetime,
+    entrance-level ones (Dijkstra from the entrances, entrance_flow congestion) per
+    entrance set. Moving an entrance therefore only reruns the Dijkstra, and
+    re_optimize warm-starts from the last front. Same knobs and defaults as
+    layout_nsga_turbo.py (layout_config.KNOBS, as lower-case attributes: self.pop,
+    self.min_clear_m, ...), and the same front for the same config and seed.
+    Relative paths in cfg are resolved against base_dir; stage timings go to self.stages.
+    """
+    def __init__(self, cfg, base_dir="."):
+        if cfg.get("floors") or cfg.get("multires") or cfg.get("distance_model", "graph") != "graph":
+            raise ValueError("LayoutEngine handles single-plan graph-distance configs; "
+                             "use layout_nsga_turbo.py for floors / multires / geodesic")
+        self.cfg = dict(cfg)
+        self.base_dir = Path(base_dir)
+        for name, value in read_knobs(cfg).items():
+            setattr(self, name.lower(), value)   # mpp, n_obj, entrances, graph_step_px, pop, ...
+
+        self.stages = {}
+        self.archive = None
+        self._ent = {}
+
+    def _path(self, p):
+        return self.base_dir / p
+
+    # -------------------- PLAN-LEVEL (BUILT ONCE) --------------------
+    @cached_property
+    def mask(self):
+        """Walkable mask (white=1) of walkable_png."""
+        with timed(self.stages, "mask_load"):
+            return load_mask(self._path(self.cfg["walkable_png"]))
+
+    @cached_property
+    def placeable(self):
+        """Optional placeable mask (white=allowed), or None."""
+        if not self.placeable_path:
+            return None
+        with timed(self.stages, "mask_load"):
+            m = load_mask(self._path(self.placeable_path))
+        assert m.shape == self.mask.shape, "placeable.png must have same size as floor.png"
+        return m
+
+    @cached_property
+    def dist_m(self):
+        """Distance of each pixel to the nearest obstacle (m)."""
+        mask = self.mask
+        with timed(self.stages, "edt"):
+            return distance_transform_edt(mask) * self.mpp
+
+    @cached_property
+    def sites(self):
+        """[S,2] candidate positions (m): stride grid, walkable, far enough from walls, placeable."""
+        mask, dist_m, placeable = self.mask, self.dist_m, self.placeable
+        with timed(self.stages, "site_sampling"):
+            return sample_sites(mask, dist_m, self.mpp, self.site_stride_px, self.min_obj_to_wall_m, placeable)
+
+    @cached_property
+    def nav(self):
+        """(node_px [M,2], CSR graph, KD-tree over the nodes in m, nearest node of each site)."""
+        mask, sites = self.mask, self.sites
+        with timed(self.stages, "graph_build"):
+            node_px, graph = build_nav_graph(mask, self.graph_step_px, self.mpp)
+            node_tree = cKDTree(node_px * self.mpp)
+            _, site_node = node_tree.query(sites, k=1)
+        return node_px, graph, node_tree, site_node
+
+    @cached_property
+    def site_vis(self):
+        """[S] visibility of each site (rays marched once)."""
+        mask, sites = self.mask, self.sites
+        with timed(self.stages, "site_visibility"):
+            return site_visibility(mask, sites, self.mpp, max_range_m=self.vis_range_m, rays=self.vis_rays)
+
+    @cached_property
+    def site_tree(self):
+        """KD-tree over the sites (snapping coordinates, repair, crossover)."""
+        return cKDTree(self.sites)
+
+    @cached_property
+    def static_congestion(self):
+        """Congestion field of the models that do not depend on the entrances."""
+        graph = self.nav[1]
+        with timed(self.stages, "congestion_field"):
+            return congestion_field(graph, self.congestion_model, k=self.betweenness_k)
+
+    # -------------------- ENTRANCE-LEVEL (PER ENTRANCE SET) --------------------
+    def entrance_data(self):
+        """Entrance nodes, distances and congestion for the current entrances (memoised)."""
+        key = self.entrances.tobytes()
+        if key in self._ent:
+            return self._ent[key]
+        _, graph, node_tree, _ = self.nav
+        with timed(self.stages, "entrance_dijkstra"):
+            _, ent_node_idx = node_tree.query(self.entrances, k=1)
+            ent_dists, ent_preds = entrance_distances(graph, ent_node_idx, return_predecessors=True)
+        if self.congestion_model == "entrance_flow":
+            with timed(self.stages, "congestion_field"):
+                congestion = congestion_field(graph, "entrance_flow", preds=ent_preds, roots=ent_node_idx)
+        else:
+            congestion = self.static_congestion
+        self._ent[key] = {"ent_node_idx": ent_node_idx, "ent_dists": ent_dists, "congestion": congestion}
+        while len(self._ent) > ENTRANCE_MEMORY:
+            self._ent.pop(next(iter(self._ent)))
+        return self._ent[key]
+
+    @property
+    def floor(self):
+        """Floor dict for layout_eval (current entrances), built on first use."""
+        node_px, _, _, site_node = self.nav
+        return {"sites": self.sites, "node_px": node_px, "site_node": site_node,
+                "site_vis": self.site_vis, **self.entrance_data()}
+
+    def set_entrances(self, entrances):
+        """Replace the entrances: a full [[x, y], ...] list, or {index: [x, y]} for the moved ones."""
+        ent = self.entrances.copy()
+        if isinstance(entrances, dict):
+            for i, xy in entrances.items():
+                ent[int(i)] = xy[:2]
+        else:
+            ent = np.array([e[:2] for e in entrances], dtype=float)
+        self.entrances = ent
+
+    # -------------------- EVALUATE / OPTIMIZE --------------------
+    def snap(self, layouts):
+        """[P,N] site indices (ints) or [P,N,2] / [N,2] coordinates in m -> [P,N] nearest-site indices."""
+        a = np.asarray(layouts)
+        if np.issubdtype(a.dtype, np.integer):
+            return a.reshape(-1, self.n_obj)
+        _, idx = self.site_tree.query(a.reshape(-1, 2), k=1)
+        return idx.reshape(-1, self.n_obj)
+
+    def evaluate(self, layouts):
+        """Objectives and constraint of given layouts -> (F [P,3], G [P,1]), as in the optimiser."""
+        return evaluate_layouts(self.snap(layouts), self.floor, self.min_clear_m**2)
+
+    def _algorithm(self, sampling):
+        ops = nsga2_operators(self.floor, self.min_clear_m, self.operators, self.clearance_repair, self.mutation_k)
+        return NSGA2(pop_size=self.pop, sampling=sampling, **ops)
+
+    def optimize(self, n_gen=None, seed=42, seeds=None, verbose=False):
+        """Run NSGA-II for n_gen generations (default n_generations) -> layouts.json dict.
+
+        seeds: optional [K,N] site indices (or coordinates) for the initial population.
+        The archive of feasible non-dominated layouts is kept in self.archive.
+        """
+        floor = self.floor
+        problem = _EngineProblem(floor, self.n_obj, self.min_clear_m)
+        archive = ParetoArchive(self.n_obj, bounds=objective_bounds(floor, self.hv_ideal, self.hv_nadir))
+        termination = stall_termination(n_gen or self.n_gen, archive, self.stall_window, self.stall_tol)
+        algo = self._algorithm(WarmStartSampling(None if seeds is None else self.snap(seeds)))
+        algo.setup(problem, termination=termination, seed=seed, verbose=verbose,
+                   callback=lambda a: archive.observe(a, a.n_gen))
+        with timed(self.stages, "optimize"):
+            while algo.has_next():
+                algo.next()
+        self.archive = archive
+        return self.front()
+
+    def re_optimize(self, changed_entrances, n_gen=None, seed=42):
+        """Move entrances (see set_entrances) and re-plan from the last front.
+
+        Only the entrance stages are recomputed; the search starts from the previous
+        archive's layouts and runs n_gen generations (default reopt_generations).
+        """
+        seeds = self.archive.X if self.archive is not None else None
+        self.set_entrances(changed_entrances)
+        return self.optimize(n_gen or self.reopt_gen, seed, seeds)
+
+    def front(self):
+        """Last archive as a layouts.json dict (sorted by distance)."""
+        X = self.archive.X if self.archive is not None else np.empty((0, self.n_obj), dtype=int)
+        F = self.archive.F if self.archive is not None else np.empty((0, 3))
+        return {"meters_per_pixel": self.mpp, "solutions": solutions_json(self.floor, X, F)}
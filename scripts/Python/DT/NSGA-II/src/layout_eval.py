@@ -0,0 +1,234 @@
+# src/layout_eval.py
+# Batched objective/constraint kernel, shared by the turbo problem and its worker processes.
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from timing import untimed
+
+# floor arrays read by the kernel (what parallel workers need in shared memory);
+# site_ent/geo_* only exist with distance_model "geodesic", site_floor/floor_* with "floors"
+EVAL_KEYS = ("sites", "site_node", "ent_dists", "site_vis", "congestion", "site_ent", "geo_keys", "geo_d",
+             "site_floor", "floor_min", "floor_max")
+
+def entrance_site_dist(floor, idx):
+    """Entrance -> site walking distance for site indices idx -> [E, *idx.shape].
+
+    Geodesic table (pixel lattice) when the floor has one, else via the site's graph node.
+    """
+    if "site_ent" in floor:
+        return floor["site_ent"][:, idx]
+    return floor["ent_dists"][:, floor["site_node"][idx]]
+
+def objective_bounds(floor, ideal=None, nadir=None):
+    """Ideal and nadir point of the objectives over the plan -> (ideal [3], nadir [3]).
+
+    Per objective, the best / worst value any layout can reach (every object on the
+    best / worst site for it; unreachable sites ignored), so fronts normalized with
+    them stay within [0, 1]. ideal / nadir, when given (hv_ideal / hv_nadir in
+    config.json), replace the computed ones.
+    """
+    S = np.arange(len(floor["sites"]))
+    d = entrance_site_dist(floor, S).astype(float)   # [E,S]
+    d = np.where(d < 1e11, d, np.nan)                 # floorplan marks unreachable nodes 1e12
+    vis = floor["site_vis"].astype(float)
+    cong = floor["congestion"][floor["site_node"]].astype(float)
+    lo = np.array([np.nanmin(d, axis=1).mean(), -vis.max(), cong.min()])
+    hi = np.array([np.nanmax(d, axis=1).mean(), -vis.min(), cong.max()])
+    return (lo if ideal is None else np.asarray(ideal, dtype=float),
+            hi if nadir is None else np.asarray(nadir, dtype=float))
+
+def too_close(floor, a, b, min_clear2):
+    """Elementwise: sites a and b are closer than the clearance -> bool (broadcast shape).
+
+    Straight-line distance, or walking distance from the geodesic pair list
+    (geo_keys/geo_d, pairs within geodesic_range_m) when the floor has one. Walking
+    distance is never shorter, so only straight-line hits are looked up.
+    """
+    close = np.sum((floor["sites"][b] - floor["sites"][a])**2, axis=-1) < min_clear2
+    if "geo_keys" not in floor or not close.any():
+        return close
+    a, b = np.broadcast_arrays(a, b)
+    a, b = a[close], b[close]
+    keys = floor["geo_keys"]
+    q = np.minimum(a, b).astype(np.int64) * len(floor["sites"]) + np.maximum(a, b)
+    pos = np.minimum(np.searchsorted(keys, q), max(len(keys) - 1, 0))
+    hit = (keys[pos] == q) & (floor["geo_d"][pos].astype(float)**2 < min_clear2) if len(keys) else False
+    close[close] = (a == b) | hit
+    return close
+
+def quota_ok(floor, idx):
+    """Objects per floor within [floor_min, floor_max] -> bool over the leading dims of idx.
+
+    Always True on a single-floor plan (no site_floor).
+    """
+    if "site_floor" not in floor:
+        return np.ones(np.shape(idx)[:-1], dtype=bool)
+    on = floor["site_floor"][idx][..., None] == np.arange(len(floor["floor_min"]))   # [...,N,K]
+    counts = on.sum(axis=-2)
+    return ((counts >= floor["floor_min"]) & (counts <= floor["floor_max"])).all(axis=-1)
+
+def layout_feasible(floor, idx, min_clear2):
+    """[P,N] site indices -> bool [P]: pairwise clearance and per-floor quotas hold."""
+    i, j = np.triu_indices(idx.shape[1], k=1)
+    return ~too_close(floor, idx[:, i], idx[:, j], min_clear2).any(axis=1) & quota_ok(floor, idx)
+
+def evaluate_layouts(X, floor, min_clear2, section=untimed):
+    """[P,N] site indices -> (F [P,3], G [P,1]), same values as the elementwise LayoutProblem.
+
+    Every row is computed independently, so splitting X into chunks gives the same result.
+    section(name) wraps each step (telemetry.Telemetry.section to time them).
+    """
+    idx = np.asarray(X).astype(int)   # [P,N]
+
+    # constraint: pairwise clearance (+ per-floor quotas)
+    with section("clearance"):
+        feasible = layout_feasible(floor, idx, min_clear2)
+
+    # map to graph nodes
+    with section("node_map"):
+        placed_node_idx = floor["site_node"][idx]  # [P,N]
+
+    # f1: avg shortest path entrance->nearest object
+    with section("f1"):
+        f1 = entrance_site_dist(floor, idx).min(axis=2).mean(axis=0)
+
+    # f2: maximize visibility -> minimize negative visibility
+    with section("f2"):
+        f2 = -floor["site_vis"][idx].mean(axis=1)
+
+    # f3: congestion proxy (lower is better)
+    with section("f3"):
+        f3 = floor["congestion"][placed_node_idx].mean(axis=1)
+
+    F = np.column_stack([f1, f2, f3])
+    G = np.where(feasible, 0.0, 1.0)[:, None]
+    return F, G
+
+# -------------------- INCREMENTAL (DELTA) EVALUATION --------------------
+class DeltaEvaluator:
+    """evaluate_layouts with the intermediate state of the last `capacity` layouts kept.
+
+    Objectives and constraint only depend on the set of sites, so a layout sharing all
+    but k <= max_changed sites with a cached one is updated from it in O(k·N): entrance
+    distance of each object [E,N] (f1 = min over objects) and number of pairs closer than
+    the clearance; f2/f3 are plain O(N) gathers, so F is bit-identical to the kernel.
+    Other rows get the full computation.
+    Callable like parallel_eval.ParallelEvaluator: X -> (F, G).
+    check=True also runs evaluate_layouts on every batch and asserts both agree.
+    """
+    def __init__(self, floor, min_clear2, max_changed=2, capacity=256, check=False):
+        self.floor = floor
+        self.min_clear2 = min_clear2
+        self.max_changed = int(max_changed)
+        self.capacity = int(capacity)
+        self.check = check
+        self.S = None     # [C,N] sites, in the column order of ED
+        self.ED = None    # [C,E,N] entrance -> object graph distance
+        self.NV = None    # [C] pairs closer than the clearance
+        self.n = self.pos = 0
+        self.n_delta = self.n_full = 0
+
+    def pop_stats(self):
+        """(delta, full) row counts since the last call."""
+        stats = (self.n_delta, self.n_full)
+        self.n_delta = self.n_full = 0
+        return stats
+
+    def close(self):
+        pass
+
+    def __call__(self, X):
+        X = np.asarray(X).astype(int)
+        P, N = X.shape
+        fl = self.floor
+        if self.S is None:
+            ent = fl["site_ent"] if "site_ent" in fl else fl["ent_dists"]
+            C = max(self.capacity, P)
+            self.S = np.zeros((C, N), int)
+            self.ED = np.zeros((C, ent.shape[0], N), ent.dtype)
+            self.NV = np.zeros(C, int)
+
+        S, ED = X.copy(), np.empty((P,) + self.ED.shape[1:], self.ED.dtype)
+        NV = np.empty(P, int)
+        dup = (np.diff(np.sort(X, axis=1), axis=1) == 0).any(axis=1)
+        parent, k = self._match(X)
+        k[dup] = N + 1
+
+        rows = np.flatnonzero(k > self.max_changed)
+        if len(rows):
+            S[rows], ED[rows], NV[rows] = self._full(X[rows])
+        rows = np.flatnonzero(k == 0)
+        if len(rows):
+            p = parent[rows]
+            S[rows], ED[rows], NV[rows] = self.S[p], self.ED[p], self.NV[p]
+        for kk in range(1, self.max_changed + 1):
+            rows = np.flatnonzero(k == kk)
+            if len(rows):
+                S[rows], ED[rows], NV[rows] = self._delta(X[rows], parent[rows], kk)
+        self.n_full += int(np.count_nonzero(k > self.max_changed))
+        self.n_delta += int(np.count_nonzero(k <= self.max_changed))
+
+        keep = np.flatnonzero(~dup)[-len(self.S):]
+        slots = (self.pos + np.arange(len(keep))) % len(self.S)
+        self.S[slots], self.ED[slots], self.NV[slots] = S[keep], ED[keep], NV[keep]
+        self.pos = (self.pos + len(keep)) % len(self.S)
+        self.n = min(len(self.S), self.n + len(keep))
+
+        F = self._objectives(X, ED)
+        G = np.where((NV == 0) & quota_ok(fl, X), 0.0, 1.0)[:, None]
+        if self.check:
+            F_ref, G_ref = evaluate_layouts(X, fl, self.min_clear2)
+            assert (F == F_ref).all() and (G == G_ref).all(), \
+                "delta evaluation differs from evaluate_layouts"
+        return F, G
+
+    def _match(self, X):
+        """Cached layout sharing the most sites with each row -> (slot [P], changed sites k [P])."""
+        P, N = X.shape
+        if self.n == 0:
+            return np.zeros(P, int), np.full(P, N + 1)
+        n_sites = len(self.floor["sites"])
+        Yi = csr_matrix((np.ones(P * N), (np.repeat(np.arange(P), N), X.ravel())), shape=(P, n_sites))
+        Ci = csr_matrix((np.ones(self.n * N), (np.repeat(np.arange(self.n), N), self.S[:self.n].ravel())),
+                        shape=(self.n, n_sites))
+        shared = (Yi @ Ci.T).tocsr()    # [P,n] sites in common (sparse)
+        parent = np.asarray(shared.argmax(axis=1)).ravel()
+        return parent, N - shared.max(axis=1).toarray().ravel().astype(int)
+
+    def _pair_violations(self, S, pos):
+        """Pairs closer than the clearance that involve at least one of the objects at pos [B,k]."""
+        B, k = pos.shape
+        sub = np.take_along_axis(S, pos, axis=1)                   # [B,k]
+        v = too_close(self.floor, sub[:, :, None], S[:, None, :], self.min_clear2)   # [B,k,N]
+        v[np.arange(B)[:, None], np.arange(k)[None], pos] = False  # not with itself
+        within = np.take_along_axis(v, np.repeat(pos[:, None], k, axis=1), axis=2)   # pairs inside pos, twice
+        return v.sum(axis=(1, 2)) - within.sum(axis=(1, 2)) // 2
+
+    def _full(self, X):
+        fl = self.floor
+        N = X.shape[1]
+        ED = entrance_site_dist(fl, X).transpose(1, 0, 2)          # [B,E,N]
+        i, j = np.triu_indices(N, k=1)
+        NV = too_close(fl, X[:, i], X[:, j], self.min_clear2).sum(axis=1)
+        return X, ED, NV
+
+    def _delta(self, X, parent, k):
+        fl = self.floor
+        B, N = X.shape
+        Sp = self.S[parent]
+        same = X[:, :, None] == Sp[:, None, :]                     # [B,N,N]
+        added = X[~same.any(axis=2)].reshape(B, k)
+        pos = np.nonzero(~same.any(axis=1))[1].reshape(B, k)       # parent columns that go
+        b = np.arange(B)[:, None]
+        S = Sp.copy()
+        S[b, pos] = added
+        ED = self.ED[parent]
+        ED[b, :, pos] = entrance_site_dist(fl, added).transpose(1, 2, 0)
+        NV = self.NV[parent] - self._pair_violations(Sp, pos) + self._pair_violations(S, pos)
+        return S, ED, NV
+
+    def _objectives(self, X, ED):
+        # whole batch, same array shapes and reduction order as evaluate_layouts
+        fl = self.floor
+        return np.column_stack([ED.min(axis=2).T.mean(axis=0), -fl["site_vis"][X].mean(axis=1),
+                                fl["congestion"][fl["site_node"][X]].mean(axis=1)])
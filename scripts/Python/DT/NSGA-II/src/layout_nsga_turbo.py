@@ -1,261 +1,828 @@
 # src/layout_nsga_turbo.py
-import json, math, time
+import argparse, cProfile, io, json, os, pstats, time
 import numpy as np
 from pathlib import Path
-from PIL import Image
-import networkx as nx
+from scipy.sparse import csr_matrix
 from scipy.spatial import cKDTree
 from scipy.ndimage import distance_transform_edt
-from pymoo.core.sampling import Sampling
+from concurrent.futures import ProcessPoolExecutor
+from pymoo.core.population import Population
 
-from pymoo.core.problem import ElementwiseProblem
+from pymoo.core.problem import ElementwiseProblem, Problem
 from pymoo.algorithms.moo.nsga2 import NSGA2
 from pymoo.termination import get_termination
-from pymoo.optimize import minimize
+
+from floorplan import (load_mask, load_mask_packed, sample_sites, sample_sites_strips, site_visibility,
+                       build_nav_graph, stack_nav_graphs, entrance_distances, congestion_field,
+                       geodesic_fields, site_geodesic_pairs)
+from precompute_cache import load_or_build
+from layout_eval import (evaluate_layouts, objective_bounds, EVAL_KEYS, DeltaEvaluator, entrance_site_dist,
+                         too_close, quota_ok)
+from parallel_eval import ParallelEvaluator, share_arrays, attach_arrays, release_arrays
+from checkpoint import save_checkpoint, load_checkpoint, load_seed_layouts, solutions_json
+from front_stream import FrontStreamWriter
+from pareto_archive import ParetoArchive, stall_termination
+from timing import timed, untimed, peak_rss_mb
+from telemetry import Telemetry
+from surrogate import SurrogateNSGA2
+from layout_operators import FeasibleSampling, WarmStartSampling, nsga2_operators
+from layout_config import load_config, read_knobs
 
 # -------------------- CONFIG --------------------
-CFG = json.loads(Path("data/config.json").read_text())
-MPP = float(CFG["meters_per_pixel"])
-N_OBJ = int(CFG["num_objects"])
-ENTRANCES = np.array(CFG["entrances"], dtype=float)
-
-# speed/quality knobs (overridable via config.json)
-GRAPH_STEP_PX   = int(CFG.get("graph_step_px", 6))     # 3 precise, 6 fast
-SITE_STRIDE_PX  = int(CFG.get("site_stride_px", 6))    # candidate sampling stride
-VIS_RAYS        = int(CFG.get("vis_rays", 8))          # 24 precise, 8 fast
-VIS_RANGE_M     = float(CFG.get("vis_range_m", 12.0))  # max LOS range
-POP             = int(CFG.get("pop_size", 48))         # 96 precise, 48 fast
-N_GEN           = int(CFG.get("n_generations", 160))    # 160 precise, 60 fast
-CHECKPOINT_EVERY= int(CFG.get("checkpoint_every", 10))
-
-MIN_OBJ_TO_WALL_M = float(CFG.get("min_obj_to_wall_m", 3.0))   # NEW: min distance to walls (m)
-PLACEABLE_PATH = CFG.get("placeable_png", None)                 # NEW: optional path to placeable mask
-
-# -------------------- LOAD MASKS --------------------
-# floor: white=walkable, black=obstacle
-mask_np = (np.array(Image.open(CFG["walkable_png"]).convert("L")) > 127).astype(np.uint8)
-H, W = mask_np.shape
-
-# optional "placeable" mask: white=allowed to place, black=forbidden (e.g., stairs)
-placeable = None
-if PLACEABLE_PATH:
-    placeable = (np.array(Image.open(PLACEABLE_PATH).convert("L")) > 127).astype(np.uint8)
-    assert placeable.shape == mask_np.shape, "placeable.png must have same size as floor.png"
-
-# distance to nearest obstacle (m)
-# EDT expects 1 for foreground; our walkable is 1. Distance from walkable pixels to nearest 0 (obstacle).
-dist_px = distance_transform_edt(mask_np)
-dist_m  = dist_px * MPP
-
-# -------------------- CANDIDATE SITES --------------------
-def sample_sites(mask, stride_px=6, min_wall_m=0.0, placeable_mask=None):
-    ys = np.arange(0, mask.shape[0], stride_px)
-    xs = np.arange(0, mask.shape[1], stride_px)
-    xx, yy = np.meshgrid(xs, ys)
-    walk_ok = (mask[yy, xx] == 1)
-    wall_ok = (dist_m[yy, xx] >= min_wall_m)
-    if placeable_mask is not None:
-        place_ok = (placeable_mask[yy, xx] == 1)
-        keep = walk_ok & wall_ok & place_ok
+# The knobs are module globals (MPP, N_OBJ, POP, ... see layout_config.KNOBS for the
+# config keys and defaults), set by configure() when the script starts: importing
+# this module reads no file.
+CFG = None
+
+def configure(cfg):
+    """Set the module knobs from a config dict (data/config.json)."""
+    global CFG, FLOOR_PARAMS
+    CFG = cfg
+    globals().update(read_knobs(cfg))
+    FLOOR_PARAMS = floor_params()
+
+# -------------------- FLOOR DATA (CACHED) --------------------
+def resolution(level=None):
+    """Resolution knobs, from the config defaults overridden by a multires level."""
+    lv = {"graph_step_px": GRAPH_STEP_PX, "site_stride_px": SITE_STRIDE_PX, "vis_rays": VIS_RAYS}
+    lv.update({k: v for k, v in (level or {}).items() if k in lv})
+    return lv
+
+def build_plan_data(plan_path, placeable_path=None, stages=None, level=None, near=None):
+    """Entrance-independent part of the floor data for one plan -> (arrays, mask, graph).
+
+    arrays (cacheable): rasters, sites, nav graph, nearest node and visibility of each site;
+    mask / graph are the loaded plan and CSR graph, for the entrance stages.
+    """
+    lv = resolution(level)
+    load = load_mask_packed if LOW_MEMORY else load_mask
+    # floor: white=walkable, black=obstacle
+    with timed(stages, "mask_load"):
+        mask_np = load(plan_path)
+
+        # optional "placeable" mask: white=allowed to place, black=forbidden (e.g., stairs)
+        placeable = None
+        if placeable_path:
+            placeable = load(placeable_path)
+            assert placeable.shape == mask_np.shape, "placeable.png must have same size as floor.png"
+
+    dist_m = None
+    if not LOW_MEMORY:
+        # distance to nearest obstacle (m)
+        # EDT expects 1 for foreground; our walkable is 1. Distance from walkable pixels to nearest 0 (obstacle).
+        with timed(stages, "edt"):
+            dist_m = distance_transform_edt(mask_np) * MPP
+
+    with timed(stages, "site_sampling"):
+        if LOW_MEMORY:
+            # the EDT is done strip by strip inside the sampling, never for the whole plan
+            sites = sample_sites_strips(mask_np, MPP, stride_px=lv["site_stride_px"],
+                                        min_wall_m=MIN_OBJ_TO_WALL_M, placeable_mask=placeable)
+        else:
+            sites = sample_sites(mask_np, dist_m, MPP, stride_px=lv["site_stride_px"],
+                                 min_wall_m=MIN_OBJ_TO_WALL_M,
+                                 placeable_mask=placeable)
+        if near is not None:
+            pts, radius = near
+            d, _ = cKDTree(pts).query(sites, k=1, distance_upper_bound=radius)
+            sites = sites[np.isfinite(d)]
+
+    # coarse nav graph as a sparse CSR lattice
+    with timed(stages, "graph_build"):
+        node_px, graph = build_nav_graph(mask_np, lv["graph_step_px"], MPP, compact=LOW_MEMORY)
+        _, site_node = cKDTree(node_px * MPP).query(sites, k=1)   # sites never move: nearest node once
+
+    # visibility of a site does not depend on the rest of the layout: march the rays once
+    with timed(stages, "site_visibility"):
+        site_vis = site_visibility(mask_np, sites, MPP, max_range_m=VIS_RANGE_M, rays=lv["vis_rays"])
+
+    if LOW_MEMORY:
+        # nothing downstream reads the full-plan rasters; keep the mask packed, tables in 32 bits
+        site_node, site_vis = site_node.astype(np.int32), site_vis.astype(np.float32)
+        rasters = {"mask_bits": mask_np.bits, "mask_shape": np.array(mask_np.shape)}
     else:
-        keep = walk_ok & wall_ok
-    pts = np.stack([xx[keep]*MPP, yy[keep]*MPP], axis=1)
-    return pts
-
-SITES = sample_sites(mask_np, stride_px=SITE_STRIDE_PX,
-                     min_wall_m=MIN_OBJ_TO_WALL_M,
-                     placeable_mask=placeable)
-print(f"[init] SITES kept: {len(SITES)} (>= {MIN_OBJ_TO_WALL_M} m from walls; placeable mask={'on' if placeable is not None else 'off'})")
-
-# -------------------- NAV GRAPH (COARSE) --------------------
-def build_graph(mask, step_px=6):
-    G = nx.Graph()
-    H, W = mask.shape
-    for y in range(0, H, step_px):
-        for x in range(0, W, step_px):
-            if mask[y, x] == 1:
-                u = (x, y)
-                G.add_node(u, pos=(x*MPP, y*MPP))
-                for dx, dy in ((step_px,0),(0,step_px),(step_px,step_px),(step_px,-step_px)):
-                    nx_, ny_ = x+dx, y+dy
-                    if 0 <= nx_ < W and 0 <= ny_ < H and mask[ny_, nx_] == 1:
-                        G.add_edge(u, (nx_, ny_), weight=math.hypot(dx, dy)*MPP)
-    return G
-
-G = build_graph(mask_np, step_px=GRAPH_STEP_PX)
-NODE_LIST = list(G.nodes())
-NODE_POS  = np.array([G.nodes[n]["pos"] for n in NODE_LIST], dtype=float)  # [M,2] meters
-NODE_TREE = cKDTree(NODE_POS)
-print(f"[init] Graph nodes: {len(NODE_LIST)}")
-
-def nearest_node_idx(p_xy):
-    _, idx = NODE_TREE.query(p_xy, k=1)
-    return int(idx)
-
-# -------------------- PRECOMPUTE DIJKSTRA (ENTRANCES -> ALL) --------------------
-ENT_NODE_IDX = [nearest_node_idx(e) for e in ENTRANCES]
-ENT_NODE_KEYS = [NODE_LIST[i] for i in ENT_NODE_IDX]
-
-ENT_DISTS = []
-for en_key in ENT_NODE_KEYS:
-    d = nx.single_source_dijkstra_path_length(G, en_key, weight="weight")
-    arr = np.full(len(NODE_LIST), 1e12, dtype=float)
-    for i, n in enumerate(NODE_LIST):
-        if n in d: arr[i] = d[n]
-    ENT_DISTS.append(arr)
-ENT_DISTS = np.stack(ENT_DISTS, axis=0)  # [E, M]
-print(f"[init] Precomputed Dijkstra from {len(ENT_NODE_IDX)} entrances.")
-
-# -------------------- VISIBILITY (FAST) --------------------
-def visibility_score(points_xy, max_range_m=VIS_RANGE_M, rays=VIS_RAYS):
-    if len(points_xy) == 0: return 0.0
-    acc = 0.0
-    step = MPP*2
-    angles = np.linspace(0, 2*math.pi, rays, endpoint=False)
-    for (px, py) in points_xy:
-        v = 0.0
-        for ang in angles:
-            r = 0.0
-            while r <= max_range_m:
-                xi = int((px + math.cos(ang)*r)/MPP)
-                yi = int((py + math.sin(ang)*r)/MPP)
-                if xi < 0 or yi < 0 or xi >= W or yi >= H or mask_np[yi, xi] == 0:
-                    break
-                r += step
-            v += r
-        acc += (v / rays)
-    return acc / len(points_xy)
+        rasters = {"mask": mask_np, "dist_m": dist_m}
+
+    arrays = {
+        **rasters,
+        "sites": sites,
+        "node_px": node_px, "graph_data": graph.data,
+        "graph_indices": graph.indices, "graph_indptr": graph.indptr,
+        "site_node": site_node, "site_vis": site_vis,
+    }
+    return arrays, mask_np, graph
+
+def build_floor_data(stages=None, level=None, near=None):
+    """Everything derived from the plan + knobs, as plain arrays so it can be cached.
+
+    stages: optional dict filled with per-stage timings (timing.timed), e.g. by benchmark.py.
+    level: resolution overrides (see resolution()); near: optional (points [K,2] m, radius m),
+    keeps only the sites within radius of a point (refinement levels), so the visibility
+    table is only computed there.
+    """
+    plan, mask_np, graph = build_plan_data(CFG["walkable_png"], PLACEABLE_PATH, stages, level, near)
+    sites = plan["sites"]
+
+    # entrances -> all nodes, one multi-source Dijkstra call (trees kept for the flow model)
+    with timed(stages, "entrance_dijkstra"):
+        _, ent_node_idx = cKDTree(plan["node_px"] * MPP).query(ENTRANCES, k=1)
+        ent_dists, ent_preds = entrance_distances(graph, ent_node_idx, return_predecessors=True)
+
+    # per-node crowding field for f3, computed once for the whole run
+    with timed(stages, "congestion_field"):
+        congestion = congestion_field(graph, CONGESTION_MODEL, preds=ent_preds, roots=ent_node_idx,
+                                      k=BETWEENNESS_K)
+
+    geodesic = {}
+    if DISTANCE_MODEL == "geodesic":
+        # walking distances on the full-resolution pixel lattice: entrance fields + close site pairs
+        sites_px = np.rint(sites / MPP).astype(np.int64)
+        with timed(stages, "geodesic_fields"):
+            ent_field = geodesic_fields(mask_np, ENTRANCES / MPP, MPP, compact=LOW_MEMORY)
+            geodesic["ent_field"] = ent_field
+            geodesic["site_ent"] = np.ascontiguousarray(ent_field[:, sites_px[:, 1], sites_px[:, 0]])
+        with timed(stages, "site_geodesic"):
+            geodesic["geo_keys"], geodesic["geo_d"] = site_geodesic_pairs(mask_np, sites_px, MPP, GEODESIC_RANGE_M)
+
+    if LOW_MEMORY:
+        ent_dists, congestion = ent_dists.astype(np.float32), congestion.astype(np.float32)
+
+    return {
+        **geodesic, **plan,
+        "ent_node_idx": ent_node_idx, "ent_dists": ent_dists, "congestion": congestion,
+    }
+
+# cache key = plan/placeable bytes + every knob that changes the arrays above
+def floor_params(level=None):
+    return {"meters_per_pixel": MPP, **resolution(level), "min_obj_to_wall_m": MIN_OBJ_TO_WALL_M,
+            "entrances": ENTRANCES.tolist(), "vis_range_m": VIS_RANGE_M,
+            "congestion_model": CONGESTION_MODEL, "betweenness_k": BETWEENNESS_K,
+            **({"distance_model": DISTANCE_MODEL, "geodesic_range_m": GEODESIC_RANGE_M}
+               if DISTANCE_MODEL == "geodesic" else {}),
+            **({"low_memory": True} if LOW_MEMORY else {})}
+
+# -------------------- MULTI-FLOOR (STACKED) --------------------
+# Floors sit side by side on one virtual plane (floor k shifted right by 2·k·width px,
+# width = the widest plan), so one floor's sites are at least a plan width away from
+# the next one's: straight-line clearance never mixes two floors, and the operators
+# keep objects on their floor (site_floor); only the stair links connect them in the
+# nav graph.
+def plan_params():
+    return {"meters_per_pixel": MPP, **resolution(), "min_obj_to_wall_m": MIN_OBJ_TO_WALL_M,
+            "vis_range_m": VIS_RANGE_M, **({"low_memory": True} if LOW_MEMORY else {})}
+
+def floors_files():
+    return [f for fl in FLOORS for f in (fl["walkable_png"], fl.get("placeable_png"))]
+
+def floors_params():
+    return {**floor_params(), "entrances": CFG["entrances"], "floors": FLOORS, "stairs": STAIRS,
+            "stair_length_m": STAIR_LENGTH_M}
+
+def build_floors_data(stages=None):
+    """build_floor_data for a stacked multi-floor plan.
+
+    Each plan's own arrays are cached on their own ("plan" entries), so changing
+    entrances, stairs or quotas only redoes the stacked part: one Dijkstra sweep
+    from all entrances over the union graph, and the congestion field.
+    """
+    plans, graphs = [], []
+    for fl in FLOORS:
+        arrays = load_or_build("plan", lambda: build_plan_data(fl["walkable_png"], fl.get("placeable_png"), stages)[0],
+                               files=[fl["walkable_png"], fl.get("placeable_png")], params=plan_params(),
+                               cache_dir=CACHE_DIR)
+        M = len(arrays["node_px"])
+        plans.append(arrays)
+        graphs.append(csr_matrix((arrays["graph_data"], arrays["graph_indices"], arrays["graph_indptr"]), shape=(M, M)))
+        if len(arrays["sites"]) == 0:
+            raise SystemExit(f"floor {fl.get('name', len(plans) - 1)!r}: no candidate site")
+
+    with timed(stages, "floor_stacking"):
+        width = max((p["mask"].shape if "mask" in p else p["mask_shape"])[1] for p in plans)
+        origin_px = np.array([[2 * width * k, 0] for k in range(len(plans))], dtype=np.int64)
+        origin = origin_px * MPP
+        trees = [cKDTree(p["node_px"] * MPP) for p in plans]
+        links = []
+        for st in STAIRS:
+            a = (int(st["a"][2]), *st["a"][:2])
+            b = (int(st["b"][2]), *st["b"][:2])
+            ends = [trees[k].query((x, y))[1] for k, x, y in (a, b)]
+            links.append((ends[0], ends[1], float(st.get("length_m", STAIR_LENGTH_M)), a[0], b[0]))
+        sizes = np.array([len(p["node_px"]) for p in plans])
+        node0 = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        graph, _ = stack_nav_graphs(graphs, [(node0[fa] + na, node0[fb] + nb, w) for na, nb, w, fa, fb in links])
+        site_floor = np.concatenate([np.full(len(p["sites"]), k) for k, p in enumerate(plans)])
+        ent_node_idx = np.array([node0[k] + trees[k].query(xy)[1] for xy, k in zip(ENTRANCES, ENT_FLOOR)])
+
+    # all entrances, all floors: one multi-source Dijkstra call
+    with timed(stages, "entrance_dijkstra"):
+        ent_dists, ent_preds = entrance_distances(graph, ent_node_idx, return_predecessors=True)
+    with timed(stages, "congestion_field"):
+        congestion = congestion_field(graph, CONGESTION_MODEL, preds=ent_preds, roots=ent_node_idx,
+                                      k=BETWEENNESS_K)
+    if LOW_MEMORY:
+        ent_dists, congestion = ent_dists.astype(np.float32), congestion.astype(np.float32)
+
+    lo = np.array([int(fl.get("min_objects", 0)) for fl in FLOORS])
+    hi = np.array([int(fl.get("max_objects", N_OBJ)) for fl in FLOORS])
+    return {
+        "sites": np.concatenate([p["sites"] + o for p, o in zip(plans, origin)]),
+        "site_floor": site_floor, "floor_origin": origin, "floor_min": lo, "floor_max": hi,
+        "node_px": np.concatenate([p["node_px"] + o for p, o in zip(plans, origin_px)]),
+        "graph_data": graph.data, "graph_indices": graph.indices, "graph_indptr": graph.indptr,
+        "site_node": np.concatenate([p["site_node"] + n0 for p, n0 in zip(plans, node0)]),
+        "site_vis": np.concatenate([p["site_vis"] for p in plans]),
+        "ent_node_idx": ent_node_idx, "ent_dists": ent_dists, "congestion": congestion,
+    }
+
+def load_floor_data(stages=None, level=None, near=None):
+    """Floor arrays (cached unless restricted to a neighbourhood) + the derived objects the problem needs."""
+    if FLOORS and (level is not None or near is not None or DISTANCE_MODEL == "geodesic"):
+        raise SystemExit("floors: multires levels and distance_model 'geodesic' only work on a single plan")
+    with timed(stages, "floor_data"):
+        if FLOORS:
+            floor = dict(load_or_build("floors", lambda: build_floors_data(stages), files=floors_files(),
+                                       params=floors_params(), cache_dir=CACHE_DIR))
+        else:
+            floor = dict(load_or_build("floor", lambda: build_floor_data(stages, level, near),
+                                       files=[CFG["walkable_png"], PLACEABLE_PATH],
+                                       params=floor_params(level),
+                                       cache_dir=CACHE_DIR if near is None else None))
+    print(f"[init] SITES kept: {len(floor['sites'])} (>= {MIN_OBJ_TO_WALL_M} m from walls; placeable mask={'on' if PLACEABLE_PATH else 'off'}"
+          + (f"; within {near[1]} m of {len(near[0])} seed objects)" if near is not None else ")"))
+
+    # coarse nav graph (sparse CSR, edge lengths in m)
+    M = len(floor["node_px"])
+    floor["graph"] = csr_matrix((floor["graph_data"], floor["graph_indices"], floor["graph_indptr"]), shape=(M, M))
+    floor["node_pos"] = floor["node_px"] * MPP   # [M,2] meters
+    print(f"[init] Graph nodes: {M}")
+    print(f"[init] Precomputed Dijkstra from {len(floor['ent_node_idx'])} entrances.")
+    if FLOORS:
+        lo, hi = floor["floor_min"], floor["floor_max"]
+        if lo.sum() > N_OBJ or hi.sum() < N_OBJ:
+            raise SystemExit(f"floors: quotas min {lo.tolist()} / max {hi.tolist()} cannot place {N_OBJ} objects")
+        for k, fl in enumerate(FLOORS):
+            print(f"[init] Floor {k} {fl.get('name', '')!r}: {np.count_nonzero(floor['site_floor'] == k)} sites, "
+                  f"{lo[k]}..{hi[k]} objects")
+        print(f"[init] {len(STAIRS)} stair link(s); entrance distances cross floors in the same sweep")
+    print(f"[init] Site visibility table: {resolution(level)['vis_rays']} rays, {VIS_RANGE_M} m")
+    print(f"[init] Congestion field: {CONGESTION_MODEL}")
+    rss = peak_rss_mb()
+    if rss is not None:
+        print(f"[init] Peak RSS so far: {rss:.0f} MB" + (" (low_memory)" if LOW_MEMORY else ""))
+    if "geo_keys" in floor:
+        min_clear = MIN_CLEAR_M
+        if min_clear > GEODESIC_RANGE_M:   # pairs beyond the range are not stored
+            raise SystemExit(f"geodesic_range_m ({GEODESIC_RANGE_M}) must be >= min_clearance_m ({min_clear})")
+        print(f"[init] Geodesic distances: pixel-lattice entrance fields, {len(floor['geo_keys'])} site pairs "
+              f"within {GEODESIC_RANGE_M} m")
+    return floor
 
 # -------------------- CONGESTION PROXY (FAST) --------------------
-DEG_CENT = nx.degree_centrality(G)            # dict node->val
-DEG_ARRAY = np.array([DEG_CENT[n] for n in NODE_LIST], dtype=float)
-
-def congestion_proxy_from_indices(node_indices):
+# precomputed per-node field (floor["congestion"], see floorplan.congestion_field)
+def congestion_proxy_from_indices(field, node_indices):
     if len(node_indices) == 0: return 0.0
-    return float(DEG_ARRAY[np.array(node_indices, dtype=int)].mean())
-
-class FeasibleSampling(Sampling):
-    def _do(self, problem, n_samples, **kwargs):
-        # problem has: problem.n_var = N_OBJ, and we can see global SITES + min_clear
-        rng = np.random.default_rng(42)
-        sols = []
-        tries = 0
-        while len(sols) < n_samples and tries < n_samples * 50:
-            # greedy pick: start from a random site, then keep adding far-enough sites
-            idxs = rng.permutation(len(SITES)).tolist()
-            chosen = []
-            for i in idxs:
-                p = SITES[i]
-                if all(np.sum((p - SITES[j])**2) >= problem.min_clear2 for j in chosen):
-                    chosen.append(i)
-                    if len(chosen) == N_OBJ:
-                        break
-            if len(chosen) == N_OBJ:
-                sols.append(np.array(chosen, dtype=int))
-            tries += 1
-
-        # if not enough feasible, fill the rest randomly (NSGA-II gérera via contrainte)
-        while len(sols) < n_samples:
-            sols.append(np.random.randint(0, len(SITES), size=problem.n_var, dtype=int))
-
-        return np.array(sols, dtype=int)
-
+    return float(field[np.array(node_indices, dtype=int)].mean())
 
 # -------------------- NSGA-II PROBLEM --------------------
 class LayoutProblem(ElementwiseProblem):
-    def __init__(self, sites_xy, min_clear_m):
-        super().__init__(n_var=N_OBJ, n_obj=3, n_constr=1, xl=0, xu=len(sites_xy)-1, type_var=int)
-        self.sites = sites_xy
+    def __init__(self, floor, min_clear_m, telemetry=None):
+        super().__init__(n_var=N_OBJ, n_obj=3, n_constr=1, xl=0, xu=len(floor["sites"])-1, type_var=int)
+        self.floor = floor
+        self.sites = floor["sites"]
         self.min_clear2 = (min_clear_m**2)
+        self.telemetry = telemetry
 
     def _evaluate(self, x, out, *args, **kwargs):
+        tel = self.telemetry
+        section = untimed
+        if tel is not None:
+            tel.begin_eval()
+            section = tel.section
         idx = np.array(x, dtype=int)
-        sel = self.sites[idx]  # [N,2] meters
 
         # constraint: pairwise clearance
-        feasible = 1.0
-        for i in range(len(sel)):
-            d2 = np.sum((sel[i+1:] - sel[i])**2, axis=1)
-            if d2.size and np.min(d2) < self.min_clear2:
-                feasible = 0.0; break
+        with section("clearance"):
+            feasible = 1.0
+            for i in range(len(idx)):
+                if too_close(self.floor, idx[i], idx[i+1:], self.min_clear2).any():
+                    feasible = 0.0; break
+            if not quota_ok(self.floor, idx):
+                feasible = 0.0
 
         # map to graph nodes
-        placed_node_idx = [nearest_node_idx(p) for p in sel]
+        with section("node_map"):
+            placed_node_idx = self.floor["site_node"][idx]
 
         # f1: avg shortest path entrance->nearest object
-        dmins = []
-        for e in range(ENT_DISTS.shape[0]):
-            d_e = ENT_DISTS[e, np.array(placed_node_idx, dtype=int)]
-            dmins.append(np.min(d_e))
-        f1 = float(np.mean(dmins))
+        with section("f1"):
+            ent_dists = entrance_site_dist(self.floor, idx)   # [E,N]
+            dmins = []
+            for e in range(ent_dists.shape[0]):
+                dmins.append(np.min(ent_dists[e]))
+            f1 = float(np.mean(dmins))
 
         # f2: maximize visibility -> minimize negative visibility
-        f2 = -visibility_score(sel)
+        with section("f2"):
+            f2 = -float(self.floor["site_vis"][idx].mean())
 
         # f3: congestion proxy (lower is better)
-        f3 = congestion_proxy_from_indices(placed_node_idx)
+        with section("f3"):
+            f3 = congestion_proxy_from_indices(self.floor["congestion"], placed_node_idx)
 
+        if tel is not None:
+            tel.count("feasible", feasible == 1.0)
         out["F"] = [f1, f2, f3]
         out["G"] = [0.0 if feasible == 1.0 else 1.0]
 
-min_clear = float(CFG.get("min_clearance_m", 0.6))
-problem = LayoutProblem(SITES, min_clear)
-
-algo = NSGA2(pop_size=POP, eliminate_duplicates=True, sampling=FeasibleSampling())
-termination = get_termination("n_gen", N_GEN)
+    # checkpoints pickle the problem with the algorithm: floor data is re-attached on resume
+    def __getstate__(self):
+        return {**self.__dict__, "floor": None, "telemetry": None}
+
+    def bind(self, floor, evaluator=None, telemetry=None):
+        self.floor = floor
+        self.telemetry = telemetry
+
+class BatchedLayoutProblem(Problem):
+    """Same objectives/constraint as LayoutProblem, computed for the whole population at once
+    (layout_eval.evaluate_layouts), optionally spread over a ParallelEvaluator's workers."""
+    def __init__(self, floor, min_clear_m, evaluator=None, telemetry=None):
+        super().__init__(n_var=N_OBJ, n_obj=3, n_constr=1, xl=0, xu=len(floor["sites"])-1, type_var=int)
+        self.floor = floor
+        self.sites = floor["sites"]
+        self.min_clear2 = (min_clear_m**2)
+        self.evaluator = evaluator
+        self.telemetry = telemetry
+
+    def _evaluate(self, X, out, *args, **kwargs):
+        tel = self.telemetry
+        if tel is not None:
+            tel.begin_eval(len(X))
+        if self.evaluator is not None:
+            # per-objective sections run inside the workers: only the whole call is timed here
+            with (tel.section("evaluate") if tel is not None else untimed("evaluate")):
+                out["F"], out["G"] = self.evaluator(X)
+        else:
+            out["F"], out["G"] = evaluate_layouts(X, self.floor, self.min_clear2,
+                                                  section=tel.section if tel is not None else untimed)
+        if tel is not None:
+            tel.count("feasible", np.count_nonzero(out["G"][:, 0] <= 0))
+
+    # checkpoints pickle the problem with the algorithm: floor data and worker pool are re-attached on resume
+    def __getstate__(self):
+        return {**self.__dict__, "floor": None, "evaluator": None, "telemetry": None}
+
+    def bind(self, floor, evaluator=None, telemetry=None):
+        self.floor = floor
+        self.evaluator = evaluator
+        self.telemetry = telemetry
+
+# -------------------- OUTPUT --------------------
+def write_metrics(path, history):
+    if not path:
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    lines = ["generation,hypervolume,archive_size,added"]
+    lines += [f"{g},{hv:.6f},{n},{a}" for g, hv, n, a in history]
+    Path(path).write_text("\n".join(lines) + "\n")
 
-# checkpoint callback
+# per-generation callback: archive update, metrics, partial export
 def on_gen(algorithm):
     gen = getattr(algorithm, "n_gen", None)
+    if gen is not None:
+        gen += algorithm.data.get("gen_offset", 0)   # multires: generations count across levels
+    evaluator = getattr(algorithm.problem, "evaluator", None)
+    if isinstance(evaluator, DeltaEvaluator):
+        n_delta, n_full = evaluator.pop_stats()
+        print(f"Δ gen {gen}: {n_delta}/{n_delta + n_full} layouts updated incrementally", flush=True)
+    elif evaluator is not None:
+        wall, busy = evaluator.pop_stats()
+        if wall > 0:
+            print(f"⚡ gen {gen}: eval {wall:.3f}s on {evaluator.n_workers} workers "
+                  f"(worker time {busy:.3f}s, speedup ×{busy / wall:.2f})", flush=True)
+    sur = algorithm.data.get("surrogate")
+    if sur is not None and sur["err"] is not None:
+        print(f"🔮 gen {gen}: {sur['evaluated']}/{sur['candidates']} offspring kept by the surrogate, "
+              f"error f1 {sur['err'][0]:.3f} f2 {sur['err'][1]:.3f} f3 {sur['err'][2]:.3f}"
+              + (" (refit)" if sur["refit"] else ""), flush=True)
+    archive = algorithm.data.get("archive")
+    if archive is not None and gen is not None:
+        archive.observe(algorithm, gen)
+        write_metrics(METRICS_PATH, archive.history)
+        if STREAM is not None:
+            STREAM.append(gen, archive)
+    tel = getattr(algorithm.problem, "telemetry", None)
+    if tel is not None and gen is not None:
+        feas = (algorithm.pop.get("CV") <= 0).ravel()
+        tel.generation(gen, n_eval=int(algorithm.evaluator.n_eval), pop_feasible_ratio=float(feas.mean()),
+                       **({"hv": archive.history[-1][1], "archive": len(archive)} if archive is not None else {}),
+                       **({"surrogate": sur} if sur is not None else {}))
     if gen is None or gen == 0 or gen % CHECKPOINT_EVERY != 0:
         return
-    pop = algorithm.pop
-    Fp, Xp = pop.get("F"), pop.get("X")
-    CVp = pop.get("CV")
-    feas = (CVp <= 0).flatten() if CVp is not None else np.ones(len(pop), bool)
-
-    sols = []
-    for f, x in zip(Fp[feas], Xp[feas]):
-        layout_xy = SITES[np.array(x, int)].tolist()
-        sols.append({"layout": layout_xy,
-                     "scores": {"distance": float(f[0]),
-                                "neg_visibility": float(f[1]),
-                                "congestion_proxy": float(f[2])}})
-    Path("outputs").mkdir(exist_ok=True)
-    Path("outputs/layouts_partial.json").write_text(json.dumps({
+    if STREAM is None:
+        Path("outputs").mkdir(exist_ok=True)
+        Path("outputs/layouts_partial.json").write_text(json.dumps({
+            "meters_per_pixel": MPP,
+            "generation": int(gen),
+            "solutions": solutions_json(algorithm.problem.floor, archive.X, archive.F)[:50]
+        }, indent=2))
+    print(f"💾 checkpoint @ gen {gen} (archive={len(archive)}, hv={archive.history[-1][1]:.4f})", flush=True)
+
+def build_algorithm(floor, min_clear, sampling=None, operators=None):
+    """NSGA2 with the configured repair / variation operators for floor["sites"]."""
+    sites = floor["sites"]
+    ops = nsga2_operators(floor, min_clear, operators or OPERATORS, CLEARANCE_REPAIR, MUTATION_K)
+    if SURROGATE:
+        print(f"[init] Surrogate pre-screening: {SURROGATE_OVERSAMPLE}× offspring mated, "
+              f"model refit every {SURROGATE_RETRAIN} gens ({SURROGATE_CELL_M} m cells)")
+        return SurrogateNSGA2(sites, SURROGATE_OVERSAMPLE, SURROGATE_RETRAIN, SURROGATE_CELL_M,
+                              pop_size=POP, sampling=sampling or FeasibleSampling(), **ops)
+    return NSGA2(pop_size=POP, sampling=sampling or FeasibleSampling(), **ops)
+
+def main():
+    configure(load_config())
+    ap = argparse.ArgumentParser(description="NSGA-II layout optimisation (config: data/config.json)")
+    ap.add_argument("--resume", nargs="?", const=CHECKPOINT_PATH, default=None, metavar="CHECKPOINT",
+                    help=f"continue from a full-state checkpoint (default {CHECKPOINT_PATH}); "
+                         "n_generations in config.json is the new total")
+    ap.add_argument("--force", action="store_true",
+                    help="--resume even if the checkpoint was written with a different floor/config")
+    ap.add_argument("--warm-start", default=None, metavar="LAYOUTS_JSON",
+                    help="seed the initial population from a layouts.json / best_layout.json")
+    ap.add_argument("--profile", nargs="?", const="outputs/profile.txt", default=None, metavar="REPORT",
+                    help="run under cProfile and write a sorted report (default outputs/profile.txt)")
+    args = ap.parse_args()
+
+    if not args.profile:
+        run(args)
+    else:
+        prof = cProfile.Profile()
+        try:
+            prof.runcall(run, args)
+        finally:
+            write_profile(prof, args.profile)
+    rss = peak_rss_mb()
+    if rss is not None:
+        print(f"🧠 peak RSS: {rss:.0f} MB")
+
+def write_profile(prof, path):
+    """Text report (by cumulative, then own time) + the raw .prof next to it for snakeviz & co."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    prof.dump_stats(path.with_suffix(".prof"))
+    buf = io.StringIO()
+    stats = pstats.Stats(prof, stream=buf).strip_dirs()
+    buf.write("==== sorted by cumulative time ====\n")
+    stats.sort_stats("cumulative").print_stats(60)
+    buf.write("==== sorted by own time ====\n")
+    stats.sort_stats("tottime").print_stats(40)
+    path.write_text(buf.getvalue())
+    print(f"📊 Saved profile report {path} (+ {path.with_suffix('.prof').name})")
+
+def make_problem(floor, min_clear, tel=None):
+    """Problem over floor (batched / elementwise, optional worker pool) -> (problem, evaluator or None)."""
+    evaluator = None
+    if BATCHED_EVAL and N_WORKERS > 1:
+        evaluator = ParallelEvaluator({k: floor[k] for k in EVAL_KEYS if k in floor}, min_clear**2, N_WORKERS)
+        print(f"[init] Parallel evaluation on {N_WORKERS} worker processes (floor arrays in shared memory)")
+    elif BATCHED_EVAL and DELTA_EVAL:
+        evaluator = DeltaEvaluator(floor, min_clear**2, DELTA_MAX_CHANGED, capacity=4 * POP,
+                                   check=DELTA_EVAL == "check")
+        print(f"[init] Delta evaluation: layouts with <= {DELTA_MAX_CHANGED} moved objects"
+              + (" (checked against the full kernel)" if DELTA_EVAL == "check" else ""))
+    if BATCHED_EVAL:
+        return BatchedLayoutProblem(floor, min_clear, evaluator, tel), evaluator
+    return LayoutProblem(floor, min_clear, tel), evaluator
+
+def hv_bounds(floor):
+    """Fixed ideal/nadir of the archive hypervolume: the plan's objective bounds, or hv_ideal / hv_nadir."""
+    return objective_bounds(floor, HV_IDEAL, HV_NADIR)
+
+def make_termination(n_gen, archive, stall_start=0):
+    """Fixed generation budget, optionally cut short when the archive hypervolume stalls."""
+    if STALL_WINDOW > 0:
+        print(f"[init] Stall termination: hv gain < {STALL_TOL:g} over {STALL_WINDOW} gens")
+    return stall_termination(n_gen, archive, STALL_WINDOW, STALL_TOL, stall_start)
+
+def run_generations(algo, gen0=0, ckpt_meta=None):
+    """Same loop as pymoo's minimize, with a full-state checkpoint every CHECKPOINT_EVERY gens -> last gen."""
+    gen = gen0
+    while algo.has_next():
+        algo.next()
+        gen = algo.n_gen - 1   # pymoo moves the counter on after each generation
+        if ckpt_meta is not None and CHECKPOINT_PATH and gen % CHECKPOINT_EVERY == 0:
+            save_checkpoint(CHECKPOINT_PATH, algo, gen, meta=ckpt_meta)
+    return gen
+
+STREAM = None   # FrontStreamWriter of the current run (FRONT_STREAM), fed by on_gen
+
+def open_stream(floor, resume_gen=None):
+    global STREAM
+    if FRONT_STREAM:
+        names = [fl.get("name", str(k)) for k, fl in enumerate(FLOORS)] if FLOORS else None
+        STREAM = FrontStreamWriter(FRONT_STREAM, floor, N_OBJ, MPP, names, resume_gen=resume_gen)
+        print(f"[init] Front stream: {FRONT_STREAM}"
+              + (f" (continued after gen {resume_gen})" if resume_gen is not None else ""))
+
+def close_stream(archive):
+    global STREAM
+    if STREAM is not None:
+        STREAM.close(archive)
+        STREAM = None
+
+def write_layouts(floor, archive, path="outputs/layouts.json"):
+    # every feasible non-dominated layout seen during the run (external archive)
+    solutions = solutions_json(floor, archive.X, archive.F)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps({
         "meters_per_pixel": MPP,
-        "generation": int(gen),
-        "solutions": sols[:50]
+        **({"floors": [fl.get("name", str(k)) for k, fl in enumerate(FLOORS)]} if FLOORS else {}),
+        "solutions": solutions
     }, indent=2))
-    print(f"💾 checkpoint @ gen {gen} (feasible={feas.sum()})", flush=True)
-
-# run
-t0 = time.time()
-res = minimize(problem, algo, termination, seed=42, verbose=True, callback=on_gen)
-t1 = time.time()
-print(f"⏱ total time: {t1 - t0:.1f}s for {N_GEN} gens (≈ {(t1-t0)/max(1,N_GEN):.2f}s/gen)")
-
-# collect feasible Pareto
-X, F = [], []
-for x, f, g in zip(res.X, res.F, res.G):
-    if g[0] <= 0:
-        X.append(x); F.append(f)
-X, F = np.array(X), np.array(F)
-
-order = np.argsort(F[:,0]) if len(F) else []
-solutions = []
-for i in order[:50]:
-    layout_xy = SITES[X[i].astype(int)].tolist()
-    solutions.append({
-        "layout": layout_xy,
-        "scores": {"distance": float(F[i,0]),
-                   "neg_visibility": float(F[i,1]),
-                   "congestion_proxy": float(F[i,2])}
-    })
-
-Path("outputs").mkdir(exist_ok=True)
-Path("outputs/layouts.json").write_text(json.dumps({
-    "meters_per_pixel": MPP,
-    "solutions": solutions
-}, indent=2))
-print(f"✅ Saved outputs/layouts.json with {len(solutions)} Pareto solutions")
+    print(f"✅ Saved {path} with {len(solutions)} Pareto solutions")
+
+def run(args):
+    tel = Telemetry(TELEMETRY_PATH, TELEMETRY_SAMPLE, append=bool(args.resume)) if TELEMETRY_PATH else None
+    if MULTIRES or ISLANDS > 1:
+        if args.resume:
+            raise SystemExit("--resume is not supported with multires levels / islands (checkpoints are single-population)")
+        try:
+            return run_multires(args, tel) if MULTIRES else run_islands(args, tel)
+        finally:
+            if tel is not None:
+                tel.close()
+    stages = {}
+    floor = load_floor_data(stages)
+    if tel is not None:
+        tel.event("init", stages={k: round(v["s"], 6) for k, v in stages.items()},
+                  sites=int(len(floor["sites"])), nodes=int(len(floor["node_px"])))
+    min_clear = MIN_CLEAR_M
+    problem, evaluator = make_problem(floor, min_clear, tel)
+    SITES = floor["sites"]
+
+    sampling = FeasibleSampling()
+    if args.warm_start:
+        seeds = load_seed_layouts(args.warm_start, SITES, N_OBJ, floor.get("floor_origin"))
+        print(f"[init] Warm start: {len(seeds)} layouts from {args.warm_start}")
+        sampling = WarmStartSampling(seeds)
+
+    gen0 = 0
+    ckpt_meta = {"floor_params": FLOOR_PARAMS, "walkable_png": CFG["walkable_png"], "min_clear": min_clear}
+    if args.resume:
+        state = load_checkpoint(args.resume)
+        if state["meta"] != ckpt_meta:
+            changed = sorted(k for k in ckpt_meta.keys() | state["meta"].keys()
+                             if state["meta"].get(k) != ckpt_meta.get(k))
+            if not args.force:
+                raise SystemExit(f"❌ {args.resume} was written with a different floor/config ({', '.join(changed)}); "
+                                 "use --force to resume anyway")
+            print(f"⚠️ checkpoint was written with a different floor/config ({', '.join(changed)}); resuming anyway (--force)")
+        algo = state["algorithm"]
+        algo.problem.bind(floor, evaluator, tel)
+        archive = algo.data["archive"]
+        gen0 = state["generation"]
+        print(f"[init] Resumed {args.resume} at gen {state['generation']} -> {N_GEN}")
+    else:
+        print(f"[init] Operators: {OPERATORS}")
+        algo = build_algorithm(floor, min_clear, sampling)
+        archive = ParetoArchive(N_OBJ, bounds=hv_bounds(floor))
+        algo.data["archive"] = archive   # pickled with the algorithm in checkpoints
+
+    termination = make_termination(N_GEN, archive)
+    if args.resume:
+        algo.termination = termination   # new total from config.json
+    else:
+        algo.setup(problem, termination=termination, seed=42, verbose=True, callback=on_gen)
+    if gen0 >= N_GEN:
+        termination.terminate()   # already at the requested total: just re-export
+        termination.update(algo)
+
+    t0 = time.time()
+    gen = gen0
+    open_stream(floor, gen0 if args.resume else None)
+    if tel is not None:
+        tel.start_generations()
+    try:
+        gen = run_generations(algo, gen0, ckpt_meta)
+    finally:
+        close_stream(archive)
+        if evaluator is not None:
+            evaluator.close()
+        if tel is not None:
+            tel.close()
+    t1 = time.time()
+    n_run = gen - gen0
+    print(f"⏱ total time: {t1 - t0:.1f}s for {n_run} gens (≈ {(t1-t0)/max(1,n_run):.2f}s/gen)")
+    if gen < N_GEN:
+        print(f"⏹ hypervolume stalled: stopped at gen {gen} of {N_GEN}")
+    write_layouts(floor, archive)
+
+# -------------------- MULTI-RESOLUTION --------------------
+# "multires": list of levels, coarse first, e.g.
+#   [{"graph_step_px": 8, "site_stride_px": 12, "vis_rays": 8, "n_generations": 60},
+#    {"graph_step_px": 3, "site_stride_px": 3, "vis_rays": 24, "n_generations": 40, "radius_m": 2.0}]
+# Level 0 searches the whole plan; each next level rebuilds the floor data at its
+# resolution, but only keeps the sites within radius_m of the previous level's
+# layouts, and starts from those layouts snapped onto its grid. The archive carries
+# over too (snapped and re-evaluated), so the hv of every level is on the same front.
+# A level whose restricted site set is too small (e.g. the previous level found no
+# feasible layout) searches the whole plan instead.
+def spread_along_f1(X, F, n):
+    """Deduplicated layouts (as sets of sites) in f1 order, thinned to at most n evenly spaced ones."""
+    _, first = np.unique(np.sort(X, axis=1), axis=0, return_index=True)
+    X, F = X[first], F[first]
+    X = X[np.argsort(F[:, 0], kind="stable")]
+    if len(X) > n:
+        X = X[np.unique(np.linspace(0, len(X) - 1, n).round().astype(int))]
+    return X
+
+def level_seeds(sites, archive, algo, n):
+    """Layouts handed to the next level, as [K,N,2] positions: archive then feasible final
+    population, spread along f1, at most n."""
+    pop = algo.pop
+    feas = (pop.get("CV") <= 0).ravel()
+    X = np.concatenate([archive.X, pop.get("X")[feas].astype(int)])
+    F = np.concatenate([archive.F, pop.get("F")[feas]])
+    return sites[spread_along_f1(X, F, n)]
+
+def carry_archive(prev, prev_sites, floor, min_clear, archive):
+    """Previous level's archive snapped onto floor's sites, re-evaluated there and merged
+    into archive (the layouts still feasible) -> number kept."""
+    if len(prev) == 0:
+        return 0
+    _, idx = cKDTree(floor["sites"]).query(prev_sites[prev.X].reshape(-1, 2), k=1)
+    X = idx.reshape(len(prev), N_OBJ)
+    F, G = evaluate_layouts(X, floor, min_clear**2)
+    feas = G[:, 0] <= 0
+    return archive.update(X[feas], F[feas])
+
+def run_multires(args, tel):
+    min_clear = MIN_CLEAR_M
+    if FRONT_STREAM:
+        print("⚠️ front_stream is not written with multires levels (the sites change per level)")
+    report, seeds_xy, prev, prev_sites, offset = [], None, None, None, 0
+    t_all = time.time()
+    for li, level in enumerate(MULTIRES):
+        lv = resolution(level)
+        n_gen = int(level.get("n_generations", N_GEN))
+        print(f"🔎 level {li}: graph step {lv['graph_step_px']} px, site stride {lv['site_stride_px']} px, "
+              f"{lv['vis_rays']} rays, {n_gen} gens")
+        t0 = time.time()
+        stages = {}
+        if seeds_xy is not None and len(seeds_xy) == 0:
+            print(f"⚠️ level {li - 1} ended without a feasible layout: level {li} searches the whole plan")
+            seeds_xy = None
+        near = None if seeds_xy is None else (seeds_xy.reshape(-1, 2), float(level.get("radius_m", 2.0)))
+        floor = load_floor_data(stages, level, near)
+        if near is not None and len(floor["sites"]) < N_OBJ:
+            print(f"⚠️ {len(floor['sites'])} sites within {near[1]} m of the seeds: level {li} searches the whole plan")
+            seeds_xy = None
+            floor = load_floor_data(stages, level)
+        if len(floor["sites"]) == 0:
+            raise SystemExit(f"level {li}: no placeable site (check min_obj_to_wall_m / site_stride_px)")
+        problem, evaluator = make_problem(floor, min_clear, tel)
+        sites = floor["sites"]
+
+        if seeds_xy is not None:
+            _, idx = cKDTree(sites).query(seeds_xy.reshape(-1, 2), k=1)
+            sampling = WarmStartSampling(idx.reshape(len(seeds_xy), N_OBJ))
+        elif args.warm_start:
+            sampling = WarmStartSampling(load_seed_layouts(args.warm_start, sites, N_OBJ))
+        else:
+            sampling = FeasibleSampling()
+        algo = build_algorithm(floor, min_clear, sampling)
+        archive = ParetoArchive(N_OBJ, bounds=hv_bounds(floor) if prev is None else None)
+        if prev is not None:
+            # same normalization and one continuous history across levels
+            archive.lo, archive.span, archive.history = prev.lo, prev.span, list(prev.history)
+            kept = carry_archive(prev, prev_sites, floor, min_clear, archive)
+            print(f"[init] Archive: {kept}/{len(prev)} layouts of level {li - 1} still feasible on this level's sites")
+        algo.data.update(archive=archive, gen_offset=offset)
+        algo.setup(problem, termination=make_termination(n_gen, archive, len(archive.history)), seed=42 + li,
+                   verbose=True, callback=on_gen)
+        t1 = time.time()
+        if tel is not None:
+            tel.event("init", level=li, stages={k: round(v["s"], 6) for k, v in stages.items()},
+                      sites=int(len(sites)), nodes=int(len(floor["node_px"])))
+            tel.start_generations()
+        try:
+            gen = run_generations(algo)
+        finally:
+            if evaluator is not None:
+                evaluator.close()
+        t2 = time.time()
+
+        row = {"level": li, **lv, "sites": int(len(sites)), "nodes": int(len(floor["node_px"])),
+               "generations": int(gen), "precompute_s": round(t1 - t0, 3), "optimize_s": round(t2 - t1, 3),
+               "archive": len(archive), "hv": archive.history[-1][1] if archive.history else 0.0}
+        report.append(row)
+        if tel is not None:
+            tel.event("level", **row)
+        seeds_xy = level_seeds(sites, archive, algo, POP)
+        prev, prev_sites, offset = archive, sites, offset + gen
+
+    print("⏱ multires levels:")
+    for r in report:
+        print(f"   level {r['level']}: {r['sites']:>7} sites, {r['generations']:>4} gens, "
+              f"precompute {r['precompute_s']:.1f}s, optimize {r['optimize_s']:.1f}s, hv {r['hv']:.4f}")
+    print(f"⏱ total time: {time.time() - t_all:.1f}s")
+    Path("outputs").mkdir(exist_ok=True)
+    Path("outputs/multires_report.json").write_text(json.dumps({"levels": report}, indent=2))
+    write_layouts(floor, archive)
+
+# -------------------- ISLAND MODEL --------------------
+# "islands": n independent NSGA-II populations (seeds 42, 43, ..., operators cycled
+# from "island_operators"), each advanced MIGRATE_EVERY gens at a time in a process
+# pool. Between epochs every island sends MIGRANTS elite layouts from its archive to
+# the next one (ring); they are evaluated there and go through the island's survival.
+# The floor arrays are built once and shared with the island processes.
+_ISLAND = {}   # per island process: attached shared blocks + floor arrays
+
+def _init_island(spec, cfg):
+    configure(cfg)   # spawned processes import this module afresh
+    blocks, arrays = attach_arrays(spec)
+    _ISLAND.update(blocks=blocks, floor=arrays)
+
+def island_gen(algorithm):
+    # island callback: archive only (exports/metrics are written by the driver)
+    algorithm.data["archive"].observe(algorithm, algorithm.n_gen)
+
+def migrate_in(algo, X):
+    """Evaluate immigrant layouts not already in the population, merge them through survival -> accepted count."""
+    have = {bytes(k) for k in np.sort(algo.pop.get("X").astype(int), axis=1)}
+    X = np.array([x for x in X if bytes(np.sort(x)) not in have], dtype=int).reshape(-1, N_OBJ)
+    if len(X) == 0:
+        return 0
+    imm = Population.new(X=X)
+    algo.evaluator.eval(algo.problem, imm, algorithm=algo)
+    algo.pop = algo.survival.do(algo.problem, Population.merge(algo.pop, imm), n_survive=algo.pop_size,
+                                algorithm=algo, random_state=algo.random_state)
+    return len(X)
+
+def _island_epoch(algo, immigrants, n_gens):
+    """One epoch in an island process -> (algorithm, immigrants accepted, seconds)."""
+    t0 = time.perf_counter()
+    algo.problem.bind(_ISLAND["floor"])
+    accepted = migrate_in(algo, immigrants) if len(immigrants) else 0
+    for _ in range(n_gens):
+        algo.next()
+    return algo, accepted, time.perf_counter() - t0
+
+def run_islands(args, tel):
+    stages = {}
+    floor = load_floor_data(stages)
+    if tel is not None:
+        tel.event("init", stages={k: round(v["s"], 6) for k, v in stages.items()},
+                  sites=int(len(floor["sites"])), nodes=int(len(floor["node_px"])))
+    min_clear = MIN_CLEAR_M
+    sites = floor["sites"]
+    seeds = load_seed_layouts(args.warm_start, sites, N_OBJ, floor.get("floor_origin")) if args.warm_start else None
+    ops = ISLAND_OPERATORS or [OPERATORS]
+
+    algos = []
+    for i in range(ISLANDS):
+        problem = BatchedLayoutProblem(floor, min_clear) if BATCHED_EVAL else LayoutProblem(floor, min_clear)
+        sampling = WarmStartSampling(seeds) if seeds is not None else None
+        algo = build_algorithm(floor, min_clear, sampling, ops[i % len(ops)])
+        algo.data["archive"] = ParetoArchive(N_OBJ, bounds=hv_bounds(floor))
+        algo.setup(problem, termination=get_termination("n_gen", N_GEN), seed=42 + i, callback=island_gen)
+        algos.append(algo)
+    n_proc = min(ISLANDS, os.cpu_count() or 1)
+    print(f"[init] Island model: {ISLANDS} islands on {n_proc} processes, operators {ops}, "
+          f"{MIGRANTS} migrants every {MIGRATE_EVERY} gens (ring)")
+
+    merged = ParetoArchive(N_OBJ, bounds=hv_bounds(floor))
+    blocks, spec = share_arrays({k: floor[k] for k in EVAL_KEYS if k in floor})
+    immigrants = [np.empty((0, N_OBJ), int)] * ISLANDS
+    gen, t0 = 0, time.time()
+    open_stream(floor)
+    try:
+        with ProcessPoolExecutor(max_workers=n_proc, initializer=_init_island, initargs=(spec, CFG)) as pool:
+            while gen < N_GEN:
+                k = min(MIGRATE_EVERY, N_GEN - gen)
+                results = list(pool.map(_island_epoch, algos, immigrants, [k] * ISLANDS))
+                algos = [r[0] for r in results]
+                gen += k
+                archives = [a.data["archive"] for a in algos]
+                added = sum(merged.update(a.X, a.F) for a in archives)
+                merged.history.append((gen, merged.hypervolume(), len(merged), added))
+                write_metrics(METRICS_PATH, merged.history)
+                if STREAM is not None:
+                    STREAM.append(gen, merged)
+                elites = [spread_along_f1(a.X, a.F, MIGRANTS) for a in archives]
+                immigrants = [elites[i - 1] for i in range(ISLANDS)]   # ring: island i <- island i-1
+                print(f"🏝 gen {gen}: merged archive={len(merged)} hv={merged.history[-1][1]:.4f} | "
+                      + " ".join(f"[{i}] {len(a)}/{a.history[-1][1]:.3f}" for i, a in enumerate(archives)),
+                      flush=True)
+                if tel is not None:
+                    tel.event("islands", gen=gen, hv=merged.history[-1][1], archive=len(merged),
+                              islands=[{"hv": a.history[-1][1], "archive": len(a), "migrants_in": r[1],
+                                        "s": round(r[2], 6)} for a, r in zip(archives, results)])
+    finally:
+        close_stream(merged)
+        release_arrays(blocks, unlink=True)
+    t1 = time.time()
+    print(f"⏱ total time: {t1 - t0:.1f}s for {gen} gens × {ISLANDS} islands (≈ {(t1-t0)/max(1,gen):.2f}s/gen)")
+    write_layouts(floor, merged)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+# src/layout_operators.py
+# Layout-specific sampling / repair / variation operators working on indices into SITES.
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.optimize import linear_sum_assignment
+from pymoo.core.repair import Repair
+from pymoo.core.sampling import Sampling
+from pymoo.core.mutation import Mutation
+from pymoo.core.crossover import Crossover
+from pymoo.core.duplicate import DuplicateElimination
+
+from layout_eval import too_close
+
+# -------------------- SAMPLING (SPATIAL HASH) --------------------
+def sample_layouts(sites_xy, n_obj, min_clear_m, n_samples, rng, tries=200):
+    """n_samples layouts of n_obj distinct sites, pairwise >= min_clear_m apart -> (X [n,N], ok [n]).
+
+    Candidates come in random order and are checked against a grid hash with
+    cell = min_clear_m, so each check only looks at the 3x3 neighbouring cells
+    (O(1) per candidate instead of O(chosen)); a layout usually fills after a
+    handful of candidates. On a tight plan a greedy pass can get stuck, so each
+    layout gets up to `tries` passes (the old loop retried up to n_samples*50); the
+    ones still incomplete are padded with random sites and flagged ok=False
+    (the clearance repair or constraint handles them).
+    """
+    S = len(sites_xy)
+    if n_obj > S:
+        tries = 1   # cannot be completed, whatever the order
+    r2 = min_clear_m**2
+    cell = np.floor(sites_xy / max(min_clear_m, 1e-9)).astype(np.int64)
+    cells = [tuple(c) for c in cell.tolist()]
+    X = np.empty((n_samples, n_obj), dtype=int)
+    ok = np.zeros(n_samples, dtype=bool)
+    for k in range(n_samples):
+        best = []
+        for _ in range(max(tries, 1)):
+            grid, chosen = {}, []
+            for i in rng.permutation(S):
+                cx, cy = cells[i]
+                p = sites_xy[i]
+                clash = False
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        for j in grid.get((cx+dx, cy+dy), ()):
+                            if (p[0]-sites_xy[j, 0])**2 + (p[1]-sites_xy[j, 1])**2 < r2:
+                                clash = True; break
+                        if clash: break
+                    if clash: break
+                if clash:
+                    continue
+                grid.setdefault((cx, cy), []).append(i)
+                chosen.append(i)
+                if len(chosen) == n_obj:
+                    break
+            if len(chosen) > len(best):
+                best = chosen
+            if len(best) == n_obj:
+                break
+        ok[k] = len(best) == n_obj
+        if not ok[k]:
+            best += rng.integers(0, S, size=n_obj - len(best)).tolist()
+        X[k] = best
+    return X, ok
+
+def sample_layouts_bulk(sites_xy, n_obj, min_clear_m, n_samples, rng, rounds=10):
+    """Vectorised sample_layouts for large batches -> (X [n,N], ok [n]).
+
+    Draws every layout at random, then for a few rounds redraws each object that
+    clashes with (is too close to, or on the same site as) an earlier object of its
+    layout, all layouts at once. ok=False rows still violate the clearance.
+    """
+    S = len(sites_xy)
+    r2 = min_clear_m**2
+    X = rng.integers(0, S, size=(n_samples, n_obj))
+    ok = np.zeros(n_samples, dtype=bool)
+    bad = np.arange(n_samples)
+    earlier = np.tri(n_obj, k=-1, dtype=bool)                      # [j,i]: i < j
+    for r in range(rounds + 1):
+        P = sites_xy[X[bad]]                                        # [B,N,2]
+        d2 = np.sum((P[:, :, None] - P[:, None]) ** 2, axis=-1)     # [B,N,N]
+        clash = ((d2 < r2) & earlier).any(axis=2)                   # [B,N] too close to an earlier object
+        good = ~clash.any(axis=1)
+        ok[bad[good]] = True
+        bad, clash = bad[~good], clash[~good]
+        if len(bad) == 0 or r == rounds:
+            break
+        rows, cols = np.nonzero(clash)
+        X[bad[rows], cols] = rng.integers(0, S, size=len(rows))
+    return X, ok
+
+def quota_split(n_obj, lo, hi, rng):
+    """Random objects-per-floor counts with lo <= counts <= hi and sum n_obj -> [K]."""
+    counts = np.array(lo, dtype=int)
+    for _ in range(n_obj - counts.sum()):
+        room = np.flatnonzero(counts < hi)
+        counts[rng.choice(room)] += 1
+    return counts
+
+def floor_members(site_floor):
+    """[K] arrays of the site indices of each floor (site_floor: [S] floor of each site)."""
+    site_floor = np.asarray(site_floor, dtype=int)
+    return [np.flatnonzero(site_floor == k) for k in range(site_floor.max(initial=-1) + 1)]
+
+def sample_layouts_floors(sites_xy, site_floor, lo, hi, n_obj, min_clear_m, n_samples, rng):
+    """sample_layouts on a multi-floor plan: each layout gets a random quota_split of its
+    objects over the floors, then each floor's share is sampled on that floor's sites."""
+    members = [np.flatnonzero(site_floor == k) for k in range(len(lo))]
+    X = np.empty((n_samples, n_obj), dtype=int)
+    ok = np.ones(n_samples, dtype=bool)
+    for s in range(n_samples):
+        parts = []
+        for k, c in enumerate(quota_split(n_obj, lo, hi, rng)):
+            if c:
+                x, o = sample_layouts(sites_xy[members[k]], c, min_clear_m, 1, rng)
+                parts.append(members[k][x[0]])
+                ok[s] &= o[0]
+        X[s] = rng.permutation(np.concatenate(parts))
+    return X, ok
+
+class FeasibleSampling(Sampling):
+    """Initial population from sample_layouts (sample_layouts_floors on a multi-floor plan).
+
+    The problem provides n_var = N_OBJ, sites, min_clear2 and its floor dict.
+    """
+    def _do(self, problem, n_samples, **kwargs):
+        # seeded by the algorithm (setup(seed=...)), so runs are reproducible
+        rng = kwargs.get("random_state") or np.random.default_rng(42)
+        # spatial-hash greedy pick; rows it cannot complete are padded randomly
+        # (ClearanceRepair / la contrainte s'en chargent)
+        fl = problem.floor
+        if "site_floor" in fl:
+            X, _ = sample_layouts_floors(problem.sites, fl["site_floor"], fl["floor_min"], fl["floor_max"],
+                                         problem.n_var, np.sqrt(problem.min_clear2), n_samples, rng)
+        else:
+            X, _ = sample_layouts(problem.sites, problem.n_var, np.sqrt(problem.min_clear2), n_samples, rng)
+        return X
+
+class WarmStartSampling(Sampling):
+    """Initial population seeded with known layouts, topped up with FeasibleSampling."""
+    def __init__(self, seeds=None):
+        super().__init__()
+        self.seeds = np.empty((0, 0), dtype=int) if seeds is None else np.asarray(seeds, dtype=int)
+
+    def _do(self, problem, n_samples, **kwargs):
+        seeds = self.seeds[:n_samples]
+        if len(seeds) == n_samples:
+            return seeds
+        fill = FeasibleSampling()._do(problem, n_samples - len(seeds), **kwargs)
+        return np.concatenate([seeds.reshape(-1, problem.n_var), fill]).astype(int)
+
+# -------------------- CLEARANCE REPAIR --------------------
+def clearance_violations(floor, X, min_clear2):
+    """[P,N] site indices -> [P] bool, True where some pair is closer than the clearance
+    (layout_eval.too_close: walking distance on a geodesic floor)."""
+    i, j = np.triu_indices(X.shape[1], k=1)
+    return too_close(floor, X[:, i], X[:, j], min_clear2).any(axis=1)
+
+class ClearanceRepair(Repair):
+    """Moves clearance-violating objects to the nearest free site (KD-tree over SITES).
+
+    Objects are kept in order; one that is too close to (or on the same site as)
+    an already kept object is moved to the nearest site that clears all kept ones.
+    "Too close" is layout_eval.too_close, so on a geodesic floor (geo_keys / geo_d)
+    two objects on either side of a wall are not moved apart.
+    When that ordered pass gets stuck (no free site left near the early objects),
+    the whole layout is re-placed from scratch with sample_layouts, so the repair
+    only returns an infeasible layout when the sampler cannot find one either
+    (after such a failure the rest of the batch skips the re-placement).
+    On a multi-floor plan (site_floor) objects move and are re-placed on their own
+    floor, so the per-floor counts are kept.
+    Layouts that are already feasible are returned unchanged.
+    The floor arrays are taken from the problem when there is one and are not
+    pickled with the repair (checkpoints, island processes).
+    """
+    def __init__(self, floor, min_clear_m, k=16, tries=200):
+        super().__init__()
+        self.floor = floor
+        self.sites = np.asarray(floor["sites"], dtype=float)
+        self.min_clear_m = float(min_clear_m)
+        self.min_clear2 = min_clear_m**2
+        self.site_floor = np.asarray(floor.get("site_floor", np.zeros(len(self.sites))), dtype=int)
+        self.members = floor_members(self.site_floor)
+        self.trees = [cKDTree(self.sites[m]) if len(m) else None for m in self.members]
+        self.k = k
+        self.tries = tries
+
+    def __getstate__(self):
+        return {**self.__dict__, "floor": None}
+
+    def _do(self, problem, X, random_state=None, **kwargs):
+        if getattr(problem, "floor", None) is not None:
+            self.floor = problem.floor
+        return self.repair_batch(X, random_state)
+
+    def repair_batch(self, X, rng=None):
+        """[P,N] site indices -> repaired copy (rng: for the from-scratch re-placement)."""
+        X = np.array(X).astype(int)
+        bad = np.flatnonzero(clearance_violations(self.floor, X, self.min_clear2))
+        if len(bad) and rng is None:
+            rng = np.random.default_rng(42)
+        tries = self.tries   # 0 once the sampler failed: the plan is too tight, don't pay for it every layout
+        for r in bad:
+            X[r], stuck = self.ordered_pass(X[r])
+            if stuck and tries:
+                x = self.replace(X[r], rng, tries)
+                if x is None:
+                    tries = 0
+                else:
+                    X[r] = x
+        return X
+
+    def repair_layout(self, idx, rng=None):
+        return self.repair_batch([idx], rng)[0]
+
+    def ordered_pass(self, idx):
+        """Move each object that clashes with an earlier one to the nearest free site -> (idx, stuck)."""
+        idx = np.array(idx, dtype=int)
+        kept = []
+        stuck = False
+        for n, i in enumerate(idx):
+            if self._clears(i, kept):
+                kept.append(i)
+                continue
+            j = self._nearest_free(i, kept)
+            if j is not None:
+                idx[n] = j
+            else:
+                stuck = True
+            kept.append(idx[n])
+        return idx, stuck
+
+    def replace(self, idx, rng, tries):
+        """Same number of objects per floor, re-sampled from scratch -> idx, or None if the sampler fails."""
+        # straight-line spacing: never shorter than walking distance, so also clear on a geodesic floor
+        out = np.array(idx, dtype=int)
+        on = self.site_floor[out]
+        for k, members in enumerate(self.members):
+            pos = np.flatnonzero(on == k)
+            if len(pos) == 0:
+                continue
+            x, ok = sample_layouts(self.sites[members], len(pos), self.min_clear_m, 1, rng, tries)
+            if not ok[0]:
+                return None
+            out[pos] = members[x[0]]
+        return out
+
+    def _clears(self, i, kept):
+        if not kept:
+            return True
+        return not too_close(self.floor, np.array(kept), i, self.min_clear2).any()
+
+    def _nearest_free(self, i, kept):
+        """Nearest site of i's floor that clears every kept object, or None."""
+        members, tree = self.members[self.site_floor[i]], self.trees[self.site_floor[i]]
+        S = len(members)
+        k = min(self.k, S)
+        seen = 0
+        while seen < S:
+            _, cand = tree.query(self.sites[i], k=k)
+            cand = members[np.atleast_1d(cand)[seen:]]
+            if kept:
+                free = cand[~too_close(self.floor, cand[:, None], np.array(kept)[None], self.min_clear2).any(axis=1)]
+            else:
+                free = cand
+            if len(free):
+                return int(free[0])
+            seen, k = k, min(2*k, S)
+        return None
+
+# -------------------- VARIATION (LOCALITY-AWARE) --------------------
+# SITES is a row-major grid flattening: index +-1 can be across the building, so
+# the generic integer operators are replaced by ones that work on positions and
+# treat a layout as a set (the objects are interchangeable).
+def site_neighbours(sites_xy, k=8, site_floor=None):
+    """[S,k] indices of the k nearest other sites of each site (KD-tree, computed once).
+
+    With site_floor (multi-floor plan) the neighbours are taken on the site's own
+    floor, so a mutation never moves an object to another floor; a floor with k
+    sites or fewer repeats its neighbours.
+    """
+    k = min(k, len(sites_xy) - 1)
+    if site_floor is None:
+        _, nb = cKDTree(sites_xy).query(sites_xy, k=k+1)
+        return np.asarray(nb[:, 1:], dtype=int).reshape(len(sites_xy), k)
+    nb = np.empty((len(sites_xy), k), dtype=int)
+    for members in floor_members(site_floor):
+        kf = min(k, len(members) - 1)
+        if kf == 0:
+            nb[members] = members[:, None]
+            continue
+        _, q = cKDTree(sites_xy[members]).query(sites_xy[members], k=kf+1)
+        nb[members] = members[q[:, 1:]][:, np.arange(k) % kf]
+    return nb
+
+class NeighbourMutation(Mutation):
+    """Moves objects to one of the k nearest sites of their current site.
+
+    Each object moves with probability prob_var (default 1/N); at least one
+    object moves per mutated layout, so a mutation never returns its parent.
+    """
+    def __init__(self, neighbours, prob=1.0, prob_var=None):
+        super().__init__(prob=prob, prob_var=prob_var)
+        self.neighbours = np.asarray(neighbours, dtype=int)
+
+    def _do(self, problem, X, *args, random_state=None, **kwargs):
+        X = np.array(X).astype(int)
+        P, N = X.shape
+        move = random_state.random((P, N)) < self.get_prob_var(problem, size=(P, 1))
+        move[np.arange(P), random_state.integers(0, N, size=P)] |= ~move.any(axis=1)
+        pick = random_state.integers(0, self.neighbours.shape[1], size=int(move.sum()))
+        X[move] = self.neighbours[X[move], pick]
+        return X
+
+class SetCrossover(Crossover):
+    """Permutation-invariant crossover on layouts seen as sets of sites.
+
+    The objects of the two parents are paired by position (optimal assignment
+    on squared distances, so the listing order does not matter); each child
+    object is a random blend of its pair (BLX-alpha along the segment) snapped
+    to the nearest site. Objects both parents share stay where they are.
+
+    With site_floor (multi-floor plan) objects are only paired with objects on
+    the same floor and snapped to that floor's sites. When the parents split
+    their objects differently over the floors, the unpaired ones are copied
+    unchanged, so each child keeps the per-floor counts of its first parent
+    (and the floor_min / floor_max quotas).
+    """
+    def __init__(self, sites_xy, alpha=0.25, prob=0.9, site_floor=None):
+        super().__init__(2, 2, prob=prob)
+        self.sites = np.asarray(sites_xy, dtype=float)
+        self.site_floor = np.zeros(len(self.sites), dtype=int) if site_floor is None else np.asarray(site_floor, dtype=int)
+        self.members = floor_members(self.site_floor)
+        self.trees = [cKDTree(self.sites[m]) if len(m) else None for m in self.members]
+        self.alpha = alpha
+
+    def _do(self, problem, X, *args, random_state=None, **kwargs):
+        X = np.asarray(X).astype(int)          # [2, n_matings, N]
+        _, M, N = X.shape
+        A, B = X[0], np.empty_like(X[1])
+        paired = np.zeros((M, N), dtype=bool)
+        for m in range(M):
+            fa, fb = self.site_floor[A[m]], self.site_floor[X[1, m]]
+            rest_a, rest_b = [], []
+            for k in np.unique(np.concatenate([fa, fb])):
+                ia, ib = np.flatnonzero(fa == k), np.flatnonzero(fb == k)
+                pa, pb = self.sites[A[m, ia]], self.sites[X[1, m, ib]]
+                row, col = linear_sum_assignment(np.sum((pa[:, None] - pb[None])**2, axis=2))
+                B[m, ia[row]] = X[1, m, ib[col]]
+                paired[m, ia[row]] = True
+                rest_a += np.delete(ia, row).tolist()
+                rest_b += np.delete(ib, col).tolist()
+            B[m, rest_a] = X[1, m, rest_b]     # other floor: not blended
+        pa, pb = self.sites[A], self.sites[B]  # [M,N,2], matched pairs
+        u = random_state.uniform(-self.alpha, 1 + self.alpha, size=(M, N, 1))
+        q1, q2 = pa + u*(pb - pa), pb + u*(pa - pb)
+        c1, c2 = A.copy(), B.copy()
+        fl = self.site_floor[A]
+        for k, (members, tree) in enumerate(zip(self.members, self.trees)):
+            sel = paired & (fl == k)
+            if tree is None or not sel.any():
+                continue
+            c1[sel] = members[tree.query(q1[sel])[1]]
+            c2[sel] = members[tree.query(q2[sel])[1]]
+        return np.stack([c1, c2])
+
+class CanonicalDuplicateElimination(DuplicateElimination):
+    """Two layouts are duplicates when they use the same set of sites (sorted indices)."""
+    def _do(self, pop, other, is_duplicate):
+        seen = set()
+        if other is not None:
+            seen.update(map(bytes, np.sort(other.get("X").astype(int), axis=1)))
+        for i, key in enumerate(map(bytes, np.sort(pop.get("X").astype(int), axis=1))):
+            if key in seen:
+                is_duplicate[i] = True
+            else:
+                seen.add(key)
+        return is_duplicate
+
+# -------------------- NSGA-II WIRING --------------------
+def nsga2_operators(floor, min_clear_m, operators="locality", clearance_repair=True, mutation_k=8):
+    """Repair + variation keyword arguments of NSGA2 (or a subclass) for layouts over floor["sites"].
+
+    operators: "locality" (SetCrossover + NeighbourMutation + set duplicates) or
+    "default" (pymoo's SBX / PM on the raw indices). On a multi-floor plan
+    (floor["site_floor"]) the locality operators keep every object on its floor.
+    """
+    sites_xy, site_floor = floor["sites"], floor.get("site_floor")
+    ops = {"repair": ClearanceRepair(floor, min_clear_m) if clearance_repair else None}
+    if operators == "locality":
+        ops.update(crossover=SetCrossover(sites_xy, site_floor=site_floor),
+                   mutation=NeighbourMutation(site_neighbours(sites_xy, mutation_k, site_floor)),
+                   eliminate_duplicates=CanonicalDuplicateElimination())
+    else:
+        ops.update(eliminate_duplicates=True)
+    return ops
@@ -0,0 +1,105 @@
+# src/mcdm.py
+# Vectorised multi-criteria selection on a Pareto front F [n,k] (all objectives minimised).
+# Every rule is a handful of array ops, so a memmapped front of 100k+ rows is ranked in milliseconds.
+import numpy as np
+
+OBJECTIVES = ("distance", "neg_visibility", "congestion_proxy")
+
+def normalize(F):
+    """Min-max per objective -> [n,k] in [0,1], 0 = best (constant objectives -> 0)."""
+    F = np.asarray(F, dtype=float)
+    lo, hi = F.min(axis=0), F.max(axis=0)
+    return (F - lo) / np.clip(hi - lo, 1e-12, None)
+
+def _weights(w, k):
+    w = np.ones(k) if w is None else np.asarray(w, dtype=float)
+    return w / w.sum()
+
+def epsilon_mask(F, eps):
+    """Epsilon-constraint: {objective index or name: upper bound} -> [n] bool, rows within every bound."""
+    keep = np.ones(len(F), dtype=bool)
+    for j, bound in (eps or {}).items():
+        j = OBJECTIVES.index(j) if isinstance(j, str) else int(j)
+        keep &= np.asarray(F[:, j]) <= bound
+    return keep
+
+# scores: lower is better for every rule
+def ideal_distance(Fz, w=None):
+    """Euclidean distance to the ideal point (0,...,0), optionally weighted."""
+    return np.sqrt((_weights(w, Fz.shape[1]) * Fz**2).sum(axis=1)) if w is not None else np.linalg.norm(Fz, axis=1)
+
+def weighted_sum(Fz, w=None):
+    """sum_j w_j Fz_j (weights normalised to 1)."""
+    return Fz @ _weights(w, Fz.shape[1])
+
+def topsis(Fz, w=None):
+    """TOPSIS on the normalised front: 1 - closeness to the ideal (0) vs the anti-ideal (1)."""
+    V = Fz * _weights(w, Fz.shape[1])
+    worst = V.max(axis=0)
+    d_best = np.linalg.norm(V, axis=1)
+    d_worst = np.linalg.norm(V - worst, axis=1)
+    return 1.0 - d_worst / np.clip(d_best + d_worst, 1e-12, None)
+
+def knee(Fz, w=None):
+    """Knee = point bulging farthest towards the ideal from the hyperplane through the
+    anchors (the best point in each objective).
+
+    Falls back to the plane sum(Fz) = 1 when the anchors are degenerate. Returns the
+    signed distance to the plane, negated, so the knee has the lowest score.
+    w is ignored (the knee is a property of the front's shape).
+    """
+    k = Fz.shape[1]
+    E = Fz[np.argmin(Fz, axis=0)]   # [k,k] anchors
+    try:
+        n = np.linalg.solve(E, np.ones(k))
+        if not np.all(np.isfinite(n)) or np.any(n <= 0):
+            raise np.linalg.LinAlgError
+    except np.linalg.LinAlgError:
+        n = np.ones(k)
+    return -(1.0 - Fz @ n) / np.linalg.norm(n)
+
+METHODS = {"ideal": ideal_distance, "weighted": weighted_sum, "topsis": topsis, "knee": knee}
+
+def rank(F, method="ideal", w=None, eps=None):
+    """Scores of every row (np.inf outside the epsilon bounds) -> [n]; argmin is the pick.
+
+    Normalisation uses the rows within the bounds, so the bounds zoom in on that part of the front.
+    """
+    F = np.asarray(F, dtype=float)
+    keep = epsilon_mask(F, eps)
+    score = np.full(len(F), np.inf)
+    if keep.any():
+        score[keep] = METHODS[method](normalize(F[keep]), w)
+    return score
+
+# -------------------- DIVERSE TOP-K --------------------
+def layout_distance(P, Q):
+    """Symmetric mean nearest-object distance between layout P [N,2] and layouts Q [M,N,2] -> [M].
+
+    Objects are interchangeable, so each object is matched to the nearest one of the other layout.
+    """
+    d = np.linalg.norm(Q[:, :, None, :] - P[None, None, :, :], axis=-1)   # [M,N,N]
+    return 0.5 * (d.min(axis=2).mean(axis=1) + d.min(axis=1).mean(axis=1))
+
+def diverse_top_k(score, positions, k, pool=None):
+    """k picks that are good and spread out -> row indices, best first.
+
+    The pool is the `pool` best-scored rows (default 10·k); the first pick is the best
+    score, each next one the pool layout farthest (layout_distance) from all picks so
+    far, ties going to the better score. positions: [n,N,2] array (or memmap) of object
+    coordinates; only the pool rows are read.
+    """
+    finite = np.flatnonzero(np.isfinite(score))
+    pool = min(len(finite), pool or 10 * k)
+    if pool == 0:
+        return np.empty(0, dtype=int)
+    cand = finite[np.argsort(score[finite], kind="stable")[:pool]]
+    Q = np.asarray(positions[np.sort(cand)], dtype=float)[np.argsort(np.argsort(cand))]
+    picks = [0]
+    dmin = layout_distance(Q[0], Q)
+    for _ in range(min(k, pool) - 1):
+        dmin[picks] = -1.0
+        j = int(np.argmax(dmin))   # first max = better score
+        picks.append(j)
+        dmin = np.minimum(dmin, layout_distance(Q[j], Q))
+    return cand[picks]
@@ -0,0 +1,85 @@
+# src/parallel_eval.py
+# Process-pool evaluation of layout populations. The floor arrays are copied into
+# multiprocessing.shared_memory once and attached by each worker at start-up,
+# so a task only carries its chunk of site indices.
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from layout_eval import evaluate_layouts
+
+# -------------------- SHARED ARRAYS --------------------
+def share_arrays(arrays):
+    """Copy arrays into new shared-memory blocks -> (blocks, spec); spec is small and picklable."""
+    blocks, spec = [], {}
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, a.nbytes))
+        np.ndarray(a.shape, a.dtype, buffer=shm.buf)[...] = a
+        blocks.append(shm)
+        spec[name] = (shm.name, a.shape, a.dtype.str)
+    return blocks, spec
+
+def attach_arrays(spec):
+    """Read-only numpy views over blocks created by share_arrays -> (blocks, arrays)."""
+    blocks, arrays = [], {}
+    for name, (shm_name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        a = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf)
+        a.flags.writeable = False
+        blocks.append(shm)
+        arrays[name] = a
+    return blocks, arrays
+
+def release_arrays(blocks, unlink=False):
+    for shm in blocks:
+        shm.close()
+        if unlink:
+            shm.unlink()
+
+# -------------------- WORKER SIDE --------------------
+_WORKER = {}  # per process: attached blocks/arrays and the clearance threshold
+
+def _init_worker(spec, min_clear2):
+    blocks, arrays = attach_arrays(spec)
+    _WORKER.update(blocks=blocks, arrays=arrays, min_clear2=min_clear2)
+
+def _eval_chunk(X):
+    t0 = time.perf_counter()
+    F, G = evaluate_layouts(X, _WORKER["arrays"], _WORKER["min_clear2"])
+    return F, G, time.perf_counter() - t0
+
+# -------------------- PARENT SIDE --------------------
+class ParallelEvaluator:
+    """evaluate_layouts over a process pool; results are identical to the serial kernel.
+
+    Rows are split into contiguous chunks and concatenated back in order, and the
+    kernel is row-independent, so F/G do not depend on the worker count.
+    """
+    def __init__(self, arrays, min_clear2, n_workers):
+        self.n_workers = int(n_workers)
+        self._blocks, spec = share_arrays(arrays)
+        self.pool = ProcessPoolExecutor(max_workers=self.n_workers,
+                                        initializer=_init_worker, initargs=(spec, min_clear2))
+        self.wall = 0.0   # elapsed time of the parallel calls
+        self.busy = 0.0   # summed kernel time inside the workers
+
+    def __call__(self, X):
+        t0 = time.perf_counter()
+        chunks = [c for c in np.array_split(np.asarray(X), self.n_workers) if len(c)]
+        parts = list(self.pool.map(_eval_chunk, chunks))
+        self.wall += time.perf_counter() - t0
+        self.busy += sum(p[2] for p in parts)
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def pop_stats(self):
+        """(wall, busy) accumulated since the last call; speedup ~ busy / wall."""
+        stats = (self.wall, self.busy)
+        self.wall = self.busy = 0.0
+        return stats
+
+    def close(self):
+        self.pool.shutdown()
+        release_arrays(self._blocks, unlink=True)
+        self._blocks = []
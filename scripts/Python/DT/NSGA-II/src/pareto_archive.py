@@ -0,0 +1,115 @@
+# src/pareto_archive.py
+# External archive of the feasible non-dominated layouts seen during a run,
+# with normalized hypervolume per generation and a stall-based termination.
+import numpy as np
+from pymoo.core.termination import Termination, TerminateIfAny
+from pymoo.termination import get_termination
+from pymoo.indicators.hv import HV
+
+def dominated_by(A, B):
+    """[len(A), len(B)] bool: A[i] is dominated by B[j] (minimization)."""
+    le = (B[None] <= A[:, None]).all(axis=2)
+    lt = (B[None] < A[:, None]).any(axis=2)
+    return le & lt
+
+class ParetoArchive:
+    """Non-dominated (X, F) pairs, updated incrementally with each generation's feasible layouts.
+
+    Layouts are compared as sets of sites (sorted indices), so reordered copies
+    of an archived layout are not added again. Hypervolume is computed on F
+    normalized by a fixed ideal/nadir (bounds, e.g. layout_eval.objective_bounds
+    of the plan; without them, those of the first front) and clipped at 0, with
+    reference point ref in every objective: values are comparable across
+    generations and never exceed ref**n_obj.
+    """
+    def __init__(self, n_var, n_obj=3, ref=1.1, bounds=None):
+        self.X = np.empty((0, n_var), dtype=int)
+        self.F = np.empty((0, n_obj))
+        self.keys = set()
+        self.ref = ref
+        self.lo = self.span = None
+        if bounds is not None:
+            self.set_bounds(*bounds)
+        self.history = []   # (generation, hypervolume, archive size, added)
+
+    def set_bounds(self, ideal, nadir):
+        """Fix the normalization: objective j maps ideal[j] -> 0 and nadir[j] -> 1."""
+        self.lo = np.asarray(ideal, dtype=float)
+        span = np.asarray(nadir, dtype=float) - self.lo
+        self.span = np.where(span > 0, span, np.maximum(np.abs(self.lo), 1.0))
+
+    def __len__(self):
+        return len(self.F)
+
+    def update(self, X, F):
+        """Merge candidates into the archive -> number of candidates kept."""
+        X = np.asarray(X).astype(int).reshape(-1, self.X.shape[1])
+        F = np.asarray(F, dtype=float).reshape(-1, self.F.shape[1])
+        # drop layouts already archived (or repeated among the candidates)
+        keys = [bytes(k) for k in np.sort(X, axis=1)]
+        fresh, seen = [], set()
+        for i, k in enumerate(keys):
+            if k not in self.keys and k not in seen:
+                seen.add(k); fresh.append(i)
+        X, F, keys = X[fresh], F[fresh], [keys[i] for i in fresh]
+        if len(F) == 0:
+            return 0
+        # candidates dominated by the archive or by another candidate are out
+        keep = ~dominated_by(F, self.F).any(axis=1) & ~dominated_by(F, F).any(axis=1)
+        X, F, keys = X[keep], F[keep], [k for k, m in zip(keys, keep) if m]
+        if len(F) == 0:
+            return 0
+        # archive members dominated by a new candidate are out
+        stay = ~dominated_by(self.F, F).any(axis=1)
+        self.keys = {k for k, m in zip(self._keys(), stay) if m} | set(keys)
+        self.X = np.concatenate([self.X[stay], X])
+        self.F = np.concatenate([self.F[stay], F])
+        return len(F)
+
+    def _keys(self):
+        return [bytes(k) for k in np.sort(self.X, axis=1)]
+
+    def hypervolume(self):
+        if len(self.F) == 0:
+            return 0.0
+        if self.lo is None:
+            self.set_bounds(self.F.min(axis=0), self.F.max(axis=0))
+        Fn = np.clip((self.F - self.lo) / self.span, 0.0, None)
+        return float(HV(ref_point=np.full(Fn.shape[1], self.ref))(Fn))
+
+    def observe(self, algorithm, generation):
+        """Add the feasible part of algorithm.pop, record (gen, hv, size, added)."""
+        pop = algorithm.pop
+        feas = (pop.get("CV") <= 0).ravel()
+        added = self.update(pop.get("X")[feas], pop.get("F")[feas])
+        row = (int(generation), self.hypervolume(), len(self), added)
+        self.history.append(row)
+        return row
+
+class HypervolumeStall(Termination):
+    """Stops when the archive hypervolume improved by less than tol (relative) over the last window generations.
+
+    Reads the archive history, which is updated from the generation callback,
+    so the decision uses the archive as of the previous generation. History
+    entries before start (e.g. from an earlier multires level) are ignored.
+    """
+    def __init__(self, archive, window=20, tol=1e-3, start=0):
+        super().__init__()
+        self.archive = archive
+        self.start = int(start)
+        self.window = int(window)
+        self.tol = float(tol)
+
+    def _update(self, algorithm):
+        hv = [h[1] for h in self.archive.history[self.start:]]
+        if len(hv) <= self.window:
+            return 0.0
+        gain = hv[-1] - hv[-1 - self.window]
+        return 1.0 if gain <= self.tol * max(abs(hv[-1]), 1e-12) else 0.0
+
+def stall_termination(n_gen, archive, window=0, tol=1e-3, start=0):
+    """Fixed generation budget, cut short by HypervolumeStall when window > 0."""
+    termination = get_termination("n_gen", n_gen)
+    if window > 0:
+        termination = TerminateIfAny(termination, HypervolumeStall(archive, window, tol, start))
+    return termination
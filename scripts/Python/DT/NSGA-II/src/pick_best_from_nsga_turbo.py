@@ -1,45 +1,118 @@
 # src/pick_best_from_nsga_turbo.py
-import json
+# Choisit un layout sur le front Pareto (layouts.json ou front_stream) -> outputs/best_layout.json.
+#   python src/pick_best_from_nsga_turbo.py                              # plus proche de l'idéal (défaut)
+#   python src/pick_best_from_nsga_turbo.py --method weighted --weights 0.6 0.2 0.2
+#   python src/pick_best_from_nsga_turbo.py --method knee --eps distance=12 --top-k 8
+# Défauts lus dans data/config.json (pick_method, pick_weights, pick_eps, pick_top_k), les options priment.
+import argparse, json, time
 import numpy as np
 from pathlib import Path
 
-# Charger le front Pareto produit par layout_nsga_turbo.py
-p = Path("outputs/layouts.json")
-if not p.exists():
-    raise SystemExit("❌ outputs/layouts.json introuvable. Lance d'abord layout_nsga_turbo.py.")
-
-data = json.loads(p.read_text())
-solutions = data.get("solutions", [])
-if not solutions:
-    raise SystemExit("⚠️ Aucun layout trouvé. Vérifie que des solutions faisables ont été générées.")
-
-# Extraire les vecteurs de scores
-F = np.array([
-    [
-        s["scores"]["distance"],
-        s["scores"]["neg_visibility"],
-        s["scores"]["congestion_proxy"]
-    ]
-    for s in solutions
-], dtype=float)
-
-# Normaliser chaque objectif entre 0 et 1 (min = meilleur)
-Fmin, Fmax = F.min(0), F.max(0)
-Fz = (F - Fmin) / np.clip(Fmax - Fmin, 1e-12, None)
-
-# Calculer la distance à l'idéal (0,0,0)
-d = np.linalg.norm(Fz, axis=1)
-best_i = int(np.argmin(d))
-
-# Enregistrer la meilleure solution
-best = {
-    "layout": solutions[best_i]["layout"],
-    "scores": solutions[best_i]["scores"],
-    "meters_per_pixel": data.get("meters_per_pixel", None),
-    "index_in_pareto": best_i,
-    "num_solutions": len(solutions)
-}
-
-Path("outputs/best_layout.json").write_text(json.dumps(best, indent=2))
-print(f"✅ Meilleur layout sauvegardé -> outputs/best_layout.json (solution {best_i+1}/{len(solutions)})")
-print("Scores:", best["scores"])
+from mcdm import METHODS, OBJECTIVES, rank, diverse_top_k
+
+def load_front(source):
+    """Front trié par distance (ordre de layouts.json) -> (F [n,3], positions [n,N,2], entry(i), data).
+
+    source: outputs/layouts.json, or a front_stream directory (memmapped, the final archive).
+    """
+    source = Path(source)
+    if source.is_dir():
+        from front_stream import FrontStream
+        from checkpoint import solutions_json
+        fs = FrontStream(source)
+        X, F = fs.front()
+        order = np.argsort(F[:, 0], kind="stable")
+        X, F = X[order], F[order]
+        sites = fs.floor["sites"]
+        entry = lambda i: solutions_json(fs.floor, X[i:i+1], F[i:i+1])[0]
+        data = {"meters_per_pixel": fs.meta["meters_per_pixel"], **({"floors": fs.meta["floors"]} if "floors" in fs.meta else {})}
+        return F, sites[X], entry, data
+
+    data = json.loads(source.read_text())
+    solutions = data.get("solutions", [])
+    F = np.array([[s["scores"][k] for k in OBJECTIVES] for s in solutions], dtype=float).reshape(-1, 3)
+    pos = np.array([s["layout"] for s in solutions], dtype=float)
+    if solutions and "floors" in solutions[0]:
+        # étages côte à côte, assez loin pour que deux étages ne se mélangent pas
+        pos[..., 0] += 1e4 * np.array([s["floors"] for s in solutions])
+    return F, pos, lambda i: solutions[i], data
+
+def parse_eps(items):
+    """["distance=12", "congestion_proxy=0.01"] -> {name: bound}."""
+    eps = {}
+    for it in items or []:
+        name, _, val = it.partition("=")
+        if name not in OBJECTIVES or not val:
+            raise SystemExit(f"❌ --eps {it!r}: attendu <objectif>=<borne>, objectif parmi {OBJECTIVES}")
+        eps[name] = float(val)
+    return eps
+
+def main():
+    cfg_path = Path("data/config.json")
+    cfg = json.loads(cfg_path.read_text()) if cfg_path.exists() else {}
+    stream = cfg.get("front_stream")
+    default_src = stream if stream and Path(stream, "meta.json").exists() else "outputs/layouts.json"
+
+    ap = argparse.ArgumentParser(description="Pick layouts on the Pareto front (multi-criteria decision)")
+    ap.add_argument("--source", default=default_src, help=f"layouts.json or front_stream dir (default {default_src})")
+    ap.add_argument("--method", choices=sorted(METHODS), default=cfg.get("pick_method", "ideal"),
+                    help="ideal: nearest to the ideal point | weighted: weighted sum | topsis | knee")
+    ap.add_argument("--weights", type=float, nargs=3, default=cfg.get("pick_weights"), metavar=("W_DIST", "W_VIS", "W_CONG"),
+                    help="objective weights (default equal), e.g. 0.6 0.2 0.2")
+    ap.add_argument("--eps", nargs="*", default=None, metavar="OBJ=MAX",
+                    help="epsilon-constraint upper bounds, e.g. distance=12 congestion_proxy=0.01")
+    ap.add_argument("--top-k", type=int, default=int(cfg.get("pick_top_k", 0)),
+                    help="also write outputs/top_layouts.json with k good, spread-out layouts")
+    ap.add_argument("--pool", type=int, default=None, help="best-scored layouts the top-k is drawn from (default 10·k)")
+    args = ap.parse_args()
+    eps = parse_eps(args.eps) if args.eps is not None else cfg.get("pick_eps", {})
+
+    # Charger le front Pareto produit par layout_nsga_turbo.py
+    if not Path(args.source).exists():
+        raise SystemExit(f"❌ {args.source} introuvable. Lance d'abord layout_nsga_turbo.py.")
+    t0 = time.perf_counter()
+    F, positions, entry, data = load_front(args.source)
+    if len(F) == 0:
+        raise SystemExit("⚠️ Aucun layout trouvé. Vérifie que des solutions faisables ont été générées.")
+    t1 = time.perf_counter()
+
+    # Normaliser chaque objectif entre 0 et 1 (min = meilleur), puis score de la méthode choisie
+    score = rank(F, args.method, args.weights, eps)
+    if not np.isfinite(score).any():
+        raise SystemExit(f"⚠️ Aucun layout ne respecte les bornes {eps}.")
+    best_i = int(np.argmin(score))
+    top = diverse_top_k(score, positions, args.top_k, args.pool) if args.top_k > 0 else None
+    t2 = time.perf_counter()
+
+    # Enregistrer la meilleure solution
+    sol = entry(best_i)
+    best = {
+        "layout": sol["layout"],
+        "scores": sol["scores"],
+        "meters_per_pixel": data.get("meters_per_pixel", None),
+        "index_in_pareto": best_i,
+        "num_solutions": len(F)
+    }
+    if args.method != "ideal" or args.weights or eps:
+        best["selection"] = {"method": args.method, "weights": args.weights, "eps": eps}
+    # plan multi-étages : étage de chaque objet + noms des étages
+    if "floors" in sol:
+        best["floors"] = sol["floors"]
+        best["floor_names"] = data.get("floors")
+
+    Path("outputs").mkdir(exist_ok=True)
+    Path("outputs/best_layout.json").write_text(json.dumps(best, indent=2))
+    print(f"✅ Meilleur layout ({args.method}) sauvegardé -> outputs/best_layout.json (solution {best_i+1}/{len(F)})")
+    print("Scores:", best["scores"])
+    if top is not None:
+        Path("outputs/top_layouts.json").write_text(json.dumps({
+            "meters_per_pixel": data.get("meters_per_pixel", None),
+            **({"floors": data["floors"]} if "floors" in data else {}),
+            "selection": {"method": args.method, "weights": args.weights, "eps": eps, "k": args.top_k},
+            "solutions": [{**entry(int(i)), "index_in_pareto": int(i)} for i in top]
+        }, indent=2))
+        print(f"✅ Top-{len(top)} diversifié -> outputs/top_layouts.json")
+    print(f"⏱ load {t1 - t0:.3f}s, selection {t2 - t1:.3f}s ({len(F)} solutions)")
+
+if __name__ == "__main__":
+    main()
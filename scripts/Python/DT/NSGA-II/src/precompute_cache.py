@@ -0,0 +1,81 @@
+# src/precompute_cache.py
+# Content-addressed on-disk cache for floor-plan precomputations (.npz, memory-mapped on load).
+import hashlib, json, os, struct, time, zipfile
+import numpy as np
+from pathlib import Path
+
+# bump when the content or layout of the cached arrays changes
+CACHE_VERSION = 1
+
+def cache_key(tag, files=(), params=None):
+    """sha256 over the input files' bytes + the parameters that shape the artifacts."""
+    h = hashlib.sha256(f"{tag}:v{CACHE_VERSION}".encode())
+    for f in files:
+        if f is None:
+            h.update(b"<none>")
+        else:
+            h.update(Path(f).read_bytes())
+        h.update(b"\0")
+    h.update(json.dumps(params or {}, sort_keys=True).encode())
+    return h.hexdigest()[:20]
+
+def save_npz(path, arrays):
+    """Uncompressed .npz written atomically (tmp file + os.replace), so members can be mmapped."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".tmp{os.getpid()}")
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+def load_npz_mmap(path):
+    """Read-only memmaps over the members of an uncompressed .npz (np.load ignores mmap_mode for .npz)."""
+    out = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                out[name] = np.load(zf.open(info))
+                continue
+            # local file header: 30 bytes, then file name + extra field, then the .npy payload
+            f.seek(info.header_offset)
+            n_name, n_extra = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + n_name + n_extra)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject or int(np.prod(shape)) == 0:
+                f.seek(info.header_offset + 30 + n_name + n_extra)
+                out[name] = np.lib.format.read_array(f, allow_pickle=False)
+                continue
+            mm = np.memmap(path, dtype=dtype, mode="r", shape=shape,
+                           order="F" if fortran else "C", offset=f.tell())
+            # plain ndarray view over the mapping: no memmap subclass overhead in hot-path gathers
+            out[name] = np.asarray(mm)
+    return out
+
+def load_or_build(tag, build, files=(), params=None, cache_dir="cache"):
+    """Return build()'s dict of arrays, from cache_dir/<tag>-<key>.npz when the inputs are unchanged.
+
+    The key covers the input files and params, so any change yields a new entry
+    (stale entries are simply never hit again). cache_dir=None disables caching.
+    """
+    if not cache_dir:
+        return build()
+    key = cache_key(tag, files, params)
+    path = Path(cache_dir) / f"{tag}-{key}.npz"
+    t0 = time.time()
+    if path.exists():
+        try:
+            arrays = load_npz_mmap(path)
+            print(f"[cache] hit  {path} ({(time.time() - t0)*1000:.0f} ms)")
+            return arrays
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print(f"[cache] unreadable {path} ({e}), rebuilding")
+    print(f"[cache] miss {path}, building...")
+    arrays = build()
+    save_npz(path, arrays)
+    print(f"[cache] stored {path} ({time.time() - t0:.2f}s)")
+    return arrays
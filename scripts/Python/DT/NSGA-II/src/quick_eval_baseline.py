@@ -1,118 +1,124 @@
-import json, math, random
+import argparse, json, time
 import numpy as np
 from PIL import Image
-import networkx as nx
+from scipy.spatial import cKDTree
 from pathlib import Path
-from sklearn.neighbors import NearestNeighbors
-
-CFG = json.loads(Path("data/config.json").read_text())
-mpp = CFG["meters_per_pixel"]
-N = CFG["num_objects"]
-
-mask = (np.array(Image.open(CFG["walkable_png"]).convert('L'))>127).astype(np.uint8)
-H, W = mask.shape
-
-# --- Points candidats marchables ---
-sites = [(x, y) for y in range(0, H, 6) for x in range(0, W, 6) if mask[y, x] == 1]
-sites_xy = np.array([(x * mpp, y * mpp) for x, y in sites], float)
-
-# --- Graphe de navigation ---
-G = nx.Graph()
-for y in range(0, H, 3):
-    for x in range(0, W, 3):
-        if mask[y, x] == 1:
-            u = (x, y)
-            G.add_node(u, pos=(x * mpp, y * mpp))
-            for dx, dy in [(3, 0), (0, 3), (3, 3), (3, -3)]:
-                nx_, ny_ = x + dx, y + dy
-                if 0 <= nx_ < W and 0 <= ny_ < H and mask[ny_, nx_] == 1:
-                    G.add_edge(u, (nx_, ny_), weight=math.hypot(dx, dy) * mpp)
-
-def nearest_node(p):
-    best = None
-    bd = 1e9
-    for n, d in G.nodes(data=True):
-        x, y = d['pos']
-        s = (x - p[0]) ** 2 + (y - p[1]) ** 2
-        if s < bd:
-            bd = s
-            best = n
-    return best
-
-# --- Évaluation d’un layout ---
-def eval_layout(idx):
-    P = sites_xy[idx]
-    ent_nodes = [nearest_node(tuple(e)) for e in CFG["entrances"]]
-    obj_nodes = [nearest_node(tuple(p)) for p in P]
-
-    # f1: distance moyenne
-    dsum = 0; c = 0
-    for en in ent_nodes:
-        dists = nx.single_source_dijkstra_path_length(G, en, weight='weight')
-        dsum += min(dists.get(n, 1e9) for n in obj_nodes)
-        c += 1
-    f1 = dsum / max(1, c)
-
-    # f2: visibilité simplifiée (distance libre moyenne)
-    def vis_point(p):
-        rays = 16; acc = 0
-        for a in np.linspace(0, 2 * math.pi, rays, endpoint=False):
-            r = 0; step = mpp * 2
-            while True:
-                x = int((p[0] + math.cos(a) * r) / mpp)
-                y = int((p[1] + math.sin(a) * r) / mpp)
-                if x < 0 or y < 0 or x >= W or y >= H or mask[y, x] == 0: break
-                r += step
-                if r > 10: break
-            acc += r
-        return acc / rays
-
-    vis = np.mean([vis_point(p) for p in P])
-    f2 = -vis  # à minimiser
-
-    # f3: congestion proxy (densité locale)
-    if len(P) > 1:
-        nn = NearestNeighbors(n_neighbors=min(6, len(P))).fit(P)
-        dists, _ = nn.kneighbors(P)
-        f3 = 1.0 / np.clip(dists[:, 1:].mean(), 1e-6, None)
-    else:
-        f3 = 0.0
-
-    return f1, f2, f3
-
-# --- Génération aléatoire + sélection du meilleur ---
-def sample_layout():
+
+from floorplan import site_visibility, build_nav_graph, entrance_distances
+from layout_operators import sample_layouts_bulk
+
+def main():
+    ap = argparse.ArgumentParser(description="Random-search baseline (config: data/config.json)")
+    ap.add_argument("--layouts", type=int, default=200, help="random layouts scored (e.g. 1000000 for a reference)")
+    ap.add_argument("--chunk", type=int, default=8192, help="layouts generated + scored per vectorised batch")
+    ap.add_argument("--top-k", type=int, default=100, help="best layouts kept (memory stays bounded)")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    CFG = json.loads(Path("data/config.json").read_text())
+    mpp = CFG["meters_per_pixel"]
+    N = CFG["num_objects"]
+
+    mask = (np.array(Image.open(CFG["walkable_png"]).convert('L'))>127).astype(np.uint8)
+    H, W = mask.shape
+
+    # --- Points candidats marchables ---
+    sites = [(x, y) for y in range(0, H, 6) for x in range(0, W, 6) if mask[y, x] == 1]
+    sites_xy = np.array([(x * mpp, y * mpp) for x, y in sites], float)
+
+    # --- Visibilité par site (16 rayons, 10 m), calculée une seule fois ---
+    site_vis = site_visibility(mask, sites_xy, mpp, max_range_m=10, rays=16)
+
+    # --- Graphe de navigation (treillis creux CSR) ---
+    node_px, graph = build_nav_graph(mask, step_px=3, mpp=mpp)
+    node_tree = cKDTree(node_px * mpp)
+
+    # --- Distances depuis les entrées (un seul Dijkstra multi-source) + nœud de chaque site, une fois ---
+    _, ent_nodes = node_tree.query(np.asarray(CFG["entrances"], float), k=1)
+    ent_dists = entrance_distances(graph, ent_nodes, unreachable=1e9)  # [E, M]
+    _, site_node = node_tree.query(sites_xy, k=1)
+    K_NN = min(6, N) - 1   # voisins pour f3 (sans l'objet lui-même)
+
+    # --- Évaluation d’un lot de layouts [P,N] -> F [P,3] ---
+    def eval_layouts(X):
+        # f1: distance moyenne (entrée -> objet le plus proche)
+        f1 = ent_dists[:, site_node[X]].min(axis=2).mean(axis=0)
+
+        # f2: visibilité simplifiée (distance libre moyenne, table par site)
+        f2 = -site_vis[X].mean(axis=1)  # à minimiser
+
+        # f3: congestion proxy (densité locale) = 1 / distance moyenne aux K_NN plus proches voisins
+        if N > 1:
+            P = sites_xy[X]
+            d = np.sqrt(np.sum((P[:, :, None] - P[:, None]) ** 2, axis=-1))   # [P,N,N]
+            knn = np.sort(d, axis=2)[:, :, 1:K_NN + 1]
+            f3 = 1.0 / np.clip(knn.mean(axis=(1, 2)), 1e-6, None)
+        else:
+            f3 = np.zeros(len(X))
+
+        return np.column_stack([f1, f2, f3])
+
+    w = np.array([0.6, 0.2, 0.2])  # poids: distance > visibilité > congestion
     min_clear = CFG.get("min_clearance_m", 0.6)
-    chosen = []
-    tries = 0
-    while len(chosen) < N and tries < 5000:
-        i = random.randrange(len(sites_xy))
-        if all(np.linalg.norm(sites_xy[i] - sites_xy[j]) >= min_clear for j in chosen):
-            chosen.append(i)
-        tries += 1
-    return np.array(chosen)
-
-cand = []
-for _ in range(200):  # 200 patterns testés
-    idx = sample_layout()
-    if len(idx) == N:
-        f1, f2, f3 = eval_layout(idx)
-        cand.append((idx, [f1, f2, f3]))
-
-# --- Normalisation + score global ---
-F = np.array([c[1] for c in cand], float)
-Fmin, Fmax = F.min(0), F.max(0)
-Fz = (F - Fmin) / np.clip(Fmax - Fmin, 1e-9, None)
-w = np.array([0.6, 0.2, 0.2])  # poids: distance > visibilité > congestion
-score = (Fz * w).sum(1)
-best = cand[int(np.argmin(score))]
-
-out = {
-  "layout": sites_xy[best[0]].tolist(),
-  "scores": {"distance": float(best[1][0]),
-             "neg_visibility": float(best[1][1]),
-             "congestion_proxy": float(best[1][2])},
-  "meters_per_pixel": mpp
-}
-Path("outputs/best_layout_baseline.json").write_text(json.dumps(out, indent=2))
-print("✅ Saved outputs/best_layout_baseline.json")
+
+    # --- Bornes de chaque objectif sur le plan (indépendantes des layouts tirés) ---
+    # Le score est normalisé avec ces bornes fixes et non avec le min/max des layouts vus:
+    # il ne change pas d'un lot à l'autre, donc le top-k gardé lot par lot est exactement
+    # celui de tous les layouts.
+    #   f1: entre la moyenne des min et celle des max (sites atteignables) de chaque entrée
+    #   f2: entre -max et -min de la visibilité par site
+    #   f3: distance moyenne aux voisins entre min_clear (layouts faisables) et la diagonale du plan
+    D = ent_dists[:, site_node]                                   # [E,S]
+    d_lo = D.min(axis=1)
+    d_hi = np.where(D < 1e9, D, d_lo[:, None]).max(axis=1)
+    diag = float(np.linalg.norm(sites_xy.max(0) - sites_xy.min(0)))
+    f3_bounds = (1.0 / max(diag, 1e-6), 1.0 / max(min_clear, 1e-6)) if N > 1 else (0.0, 0.0)
+    Fmin = np.array([d_lo.mean(), -site_vis.max(), f3_bounds[0]])
+    span = np.array([d_hi.mean(), -site_vis.min(), f3_bounds[1]]) - Fmin
+
+    def weighted_score(F):
+        return (((F - Fmin) / np.clip(span, 1e-9, None)) * w).sum(1)
+
+    # --- Recherche aléatoire par lots: tirage vectorisé (réparation par re-tirage), top-k borné ---
+    rng = np.random.default_rng(args.seed)
+    topX, topF = np.empty((0, N), int), np.empty((0, 3))
+    n_done = n_ok = 0
+    t0 = time.perf_counter()
+    while n_done < args.layouts:
+        n = min(args.chunk, args.layouts - n_done)
+        X, ok = sample_layouts_bulk(sites_xy, N, min_clear, n, rng)
+        X = X[ok]
+        n_done += n
+        n_ok += len(X)
+        if len(X) == 0:
+            continue
+        topX, topF = np.concatenate([topX, X]), np.concatenate([topF, eval_layouts(X)])
+        if len(topX) > args.top_k:
+            keep = np.argpartition(weighted_score(topF), args.top_k - 1)[:args.top_k]
+            topX, topF = topX[keep], topF[keep]
+    dt = time.perf_counter() - t0
+    if n_ok == 0:
+        raise SystemExit("❌ Aucun layout faisable trouvé (min_clearance_m trop grand ?)")
+    print(f"⚡ {n_done} layouts in {dt:.2f}s ({n_done / dt:,.0f}/s), {n_ok} feasible, top {len(topX)} kept")
+
+    # --- Classement final (même score) ---
+    order = np.argsort(weighted_score(topF), kind="stable")
+    topX, topF = topX[order], topF[order]
+
+    def entry(x, f):
+        return {"layout": sites_xy[x].tolist(),
+                "scores": {"distance": float(f[0]),
+                           "neg_visibility": float(f[1]),
+                           "congestion_proxy": float(f[2])}}
+
+    out = {**entry(topX[0], topF[0]), "meters_per_pixel": mpp}
+    Path("outputs/best_layout_baseline.json").write_text(json.dumps(out, indent=2))
+    print("✅ Saved outputs/best_layout_baseline.json")
+    Path("outputs/baseline_top.json").write_text(json.dumps({
+        "meters_per_pixel": mpp, "layouts_scored": n_done,
+        "solutions": [entry(x, f) for x, f in zip(topX, topF)]
+    }, indent=2))
+    print(f"✅ Saved outputs/baseline_top.json ({len(topX)} best by weighted score)")
+
+if __name__ == "__main__":
+    main()
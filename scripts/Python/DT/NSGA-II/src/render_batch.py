@@ -0,0 +1,257 @@
+# src/render_batch.py
+# Batch rendering of many layouts: contact sheets of a Pareto set, and the front's evolution as frames + GIF.
+#   python src/render_batch.py                                   # every solution of outputs/layouts.json
+#   python src/render_batch.py --source outputs/top_layouts.json --full
+#   python src/render_batch.py --source outputs/front --generations --every 5
+# The plan is decoded once, downscaled once per tier (preview for sheets/frames, full size
+# with --full) and handed to the worker processes, which only draw points and encode.
+import argparse, json, math, os, shutil, subprocess, time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from PIL import Image, ImageDraw
+
+from render_layout_on_image import load_base, draw_points, get_font, COLOR_LABEL
+
+COLOR_PICK = (255, 64, 0, 255)     # layout retenu (plus proche de l'idéal) sur les images du front
+COLOR_FRONT = (0, 200, 0, 110)     # autres layouts du front, translucides
+FLOOR_GAP_PX = 8                   # entre deux étages côte à côte
+CAPTION_PX = 16                    # bandeau de légende sous chaque vignette
+
+# -------------------- PLAN (DECODED ONCE) --------------------
+def plan_paths(cfg):
+    """Walkable PNG of each floor (one on a single plan)."""
+    if cfg.get("floors"):
+        return [fl["walkable_png"] for fl in cfg["floors"]]
+    return [cfg.get("walkable_png", "data/Full-Plan - SB.png")]
+
+def walkable_bbox(im, margin=0.03):
+    """Box around the walkable (white) pixels, plus a margin -> (x0, y0, x1, y1)."""
+    box = im.convert("L").point(lambda v: 255 if v > 127 else 0).getbbox() or (0, 0, im.width, im.height)
+    m = round(margin * max(im.size))
+    return max(0, box[0] - m), max(0, box[1] - m), min(im.width, box[2] + m), min(im.height, box[3] + m)
+
+def fit_scale(paths, width_px, crop=True):
+    """Scale at which the floors side by side are width_px wide."""
+    imgs = [load_base(str(p)) for p in paths]
+    w = sum((b[2] - b[0]) for b in (walkable_bbox(im) if crop else (0, 0, im.width, im.height) for im in imgs))
+    return max(1e-3, (width_px - FLOOR_GAP_PX * (len(imgs) - 1)) / max(1, w))
+
+def build_base(paths, scale, crop=True):
+    """Floors side by side at `scale` -> (RGB array, (x, y) offset of each floor, size of each floor).
+
+    crop: keep only the walkable part of each plan (the offsets shift the points accordingly).
+    """
+    imgs = [load_base(str(p)) for p in paths]
+    boxes = [walkable_bbox(im) if crop else (0, 0, im.width, im.height) for im in imgs]
+    sizes = [(max(1, round(im.width * scale)), max(1, round(im.height * scale))) for im in imgs]
+    tiles = [im.crop(b).convert("RGB") for im, b in zip(imgs, boxes)]
+    if scale != 1:
+        tiles = [t.resize((max(1, round(t.width * scale)), max(1, round(t.height * scale))), Image.BILINEAR)
+                 for t in tiles]
+    W = sum(t.width for t in tiles) + FLOOR_GAP_PX * (len(tiles) - 1)
+    canvas = Image.new("RGB", (W, max(t.height for t in tiles)), (64, 64, 64))
+    offsets, x = [], 0
+    for t, b in zip(tiles, boxes):
+        canvas.paste(t, (x, 0))
+        offsets.append((x - round(b[0] * scale), -round(b[1] * scale)))
+        x += t.width + FLOOR_GAP_PX
+    return np.asarray(canvas), offsets, sizes
+
+# -------------------- LAYOUTS --------------------
+def load_layouts(source):
+    """layouts.json / top_layouts.json / front_stream dir -> (positions [n,N,2] m, floors [n,N], F [n,3], mpp)."""
+    source = Path(source)
+    if source.is_dir():
+        from front_stream import FrontStream
+        fs = FrontStream(source)
+        X, F = fs.front()
+        order = np.argsort(F[:, 0], kind="stable")
+        pos, fl = stream_positions(fs.floor, X[order])
+        return pos, fl, F[order], fs.meta["meters_per_pixel"]
+    data = json.loads(source.read_text())
+    sols = data.get("solutions", [data] if "layout" in data else [])
+    pos = np.array([s["layout"] for s in sols], dtype=float).reshape(len(sols), -1, 2)
+    fl = np.array([s.get("floors", [0] * len(s["layout"])) for s in sols], dtype=int).reshape(pos.shape[:2])
+    F = np.array([[s["scores"][k] for k in ("distance", "neg_visibility", "congestion_proxy")] for s in sols],
+                 dtype=float).reshape(-1, 3)
+    return pos, fl, F, data.get("meters_per_pixel")
+
+def stream_positions(floor, X):
+    """Stream site indices -> in-floor positions (m) and floor of each object."""
+    X = np.asarray(X, dtype=int)
+    if "site_floor" in floor:
+        k = floor["site_floor"][X]
+        return floor["sites"][X] - floor["floor_origin"][k], k
+    return floor["sites"][X], np.zeros(X.shape, dtype=int)
+
+# -------------------- WORKERS --------------------
+_W = {}   # per worker process: tiers {name: (PIL base, offsets, sizes, scale)}, mpp
+
+def _init_worker(tiers, mpp):
+    _W["tiers"] = {name: (Image.fromarray(base), offsets, sizes, scale)
+                   for name, (base, offsets, sizes, scale) in tiers.items()}
+    _W["mpp"] = mpp
+
+def _draw(tier, layouts, colors, radius, labels=False):
+    """Copy of the tier's base with the layouts drawn on top (later layouts over earlier ones)."""
+    base, offsets, sizes, scale = _W["tiers"][tier]
+    img = base.copy()
+    draw = ImageDraw.Draw(img, "RGBA")
+    for (pos, fl), color in zip(layouts, colors):
+        for k, off in enumerate(offsets):
+            on = fl == k
+            if on.any():
+                draw_points(draw, pos[on], _W["mpp"], sizes[k], point_radius_px=radius, stroke_px=1 if radius < 6 else 2,
+                            with_labels=labels, font=get_font(18), scale=scale, offset=off, color=color)
+    return img
+
+def _caption(img, text, h=CAPTION_PX):
+    font = get_font(12)
+    tw = ImageDraw.Draw(img).textbbox((0, 0), text, font=font)[2] + 8
+    out = Image.new("RGB", (max(img.width, tw), img.height + h), (0, 0, 0))
+    out.paste(img, ((out.width - img.width) // 2, 0))
+    ImageDraw.Draw(out).text((4, img.height + 2), text, fill=COLOR_LABEL, font=font)
+    return out
+
+def score_text(i, f):
+    return f"#{i + 1}  d {f[0]:.2f}  v {-f[1]:.2f}  c {f[2]:.4f}"
+
+def _render_sheet(job):
+    """One contact sheet: job = (path, first index, positions, floors, F, cols)."""
+    path, i0, pos, fl, F, cols = job
+    radius = max(3, round(10 * _W["tiers"]["preview"][3]))
+    tiles = [_caption(_draw("preview", [(p, f)], [COLOR_PICK], radius), score_text(i0 + j, F[j]))
+             for j, (p, f) in enumerate(zip(pos, fl))]
+    tw, th = tiles[0].size
+    rows = math.ceil(len(tiles) / cols)
+    sheet = Image.new("RGB", (cols * tw + (cols + 1) * 4, rows * th + (rows + 1) * 4), (255, 255, 255))
+    for j, t in enumerate(tiles):
+        sheet.paste(t, (4 + (j % cols) * (tw + 4), 4 + (j // cols) * (th + 4)))
+    sheet.save(path, quality=90)
+    return len(tiles)
+
+def _render_full(job):
+    """Full-size image of each layout (labels 1..N, as render_layout_on_image)."""
+    out_dir, i0, pos, fl = job
+    for j, (p, f) in enumerate(zip(pos, fl)):
+        img = _draw("full", [(p, f)], [(0, 255, 0, 255)], 10, labels=True)
+        img.save(out_dir / f"layout_{i0 + j + 1:04d}.jpg", quality=90)
+    return len(pos)
+
+def _render_frame(job):
+    """Front at one generation: every layout translucent, the pick on top -> RGB array."""
+    gen, pos, fl, pick, info = job
+    radius = max(3, round(10 * _W["tiers"]["preview"][3]))
+    layouts = [(p, f) for j, (p, f) in enumerate(zip(pos, fl)) if j != pick] + [(pos[pick], fl[pick])]
+    colors = [COLOR_FRONT] * (len(layouts) - 1) + [COLOR_PICK]
+    img = _draw("preview", layouts, colors, radius)
+    return np.asarray(_caption(img, f"gen {gen}  ·  {info}"))
+
+# -------------------- DRIVER --------------------
+def chunks(n, size):
+    return [(a, min(n, a + size)) for a in range(0, n, size)]
+
+def ideal_pick(F):
+    """Index of the layout nearest the ideal point (normalised), as pick_best's default."""
+    from mcdm import rank
+    return int(np.argmin(rank(F)))
+
+def generation_fronts(source, every):
+    """(gen, positions, floors, F, hv) of the replayed front every `every` gens (+ the last one)."""
+    from front_stream import FrontStream
+    fs = FrontStream(source)
+    last = fs.index[-1]["gen"] if fs.index else None
+    hv = {r["gen"]: r["hv"] for r in fs.index}
+    out = []
+    for gen, X, F in fs.fronts():
+        if len(F) and (gen % every == 0 or gen == last):
+            pos, fl = stream_positions(fs.floor, X)
+            out.append((gen, pos, fl, F.copy(), hv[gen]))
+    return out, fs.meta["meters_per_pixel"]
+
+def main():
+    cfg_path = Path("data/config.json")
+    cfg = json.loads(cfg_path.read_text()) if cfg_path.exists() else {}
+    ap = argparse.ArgumentParser(description="Batch rendering: contact sheets of a Pareto set / front evolution frames")
+    ap.add_argument("--source", default=None,
+                    help="layouts.json, top_layouts.json or a front_stream dir (default outputs/layouts.json, "
+                         "or the config's front_stream with --generations)")
+    ap.add_argument("--out", default="outputs/render", help="output directory")
+    ap.add_argument("--generations", action="store_true", help="one frame per checkpoint generation (front_stream)")
+    ap.add_argument("--every", type=int, default=int(cfg.get("checkpoint_every", 10)), help="generations between frames")
+    ap.add_argument("--tile-px", type=int, default=240, help="preview tier: width of a tile / frame (px)")
+    ap.add_argument("--scale", type=float, default=None, help="preview tier as a plan scale instead of --tile-px")
+    ap.add_argument("--per-sheet", type=int, default=48, help="tiles per contact sheet")
+    ap.add_argument("--full", action="store_true", help="also write a full-size image of every layout")
+    ap.add_argument("--no-crop", dest="crop", action="store_false", help="keep the whole plan (default: walkable area)")
+    ap.add_argument("--fps", type=float, default=4.0, help="GIF / MP4 frame rate")
+    ap.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    args = ap.parse_args()
+
+    source = args.source or (cfg.get("front_stream") if args.generations else "outputs/layouts.json")
+    if not source or not Path(source).exists():
+        raise SystemExit(f"❌ {source} introuvable (--generations lit un front_stream, cf. config.json)")
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+
+    if args.generations:
+        if not Path(source).is_dir():
+            raise SystemExit("❌ --generations lit un front_stream (dossier), pas un layouts.json")
+        fronts, mpp = generation_fronts(source, max(1, args.every))
+        if not fronts:
+            raise SystemExit("⚠️ Aucun front dans le stream.")
+        mpp = mpp or cfg.get("meters_per_pixel")
+    else:
+        pos, fl, F, mpp = load_layouts(source)
+        mpp = mpp or cfg.get("meters_per_pixel")
+        if len(F) == 0:
+            raise SystemExit("⚠️ Aucun layout à dessiner.")
+
+    # tiers: plan decoded once here, resized once per tier, shipped to the workers
+    paths = plan_paths(cfg)
+    scale = args.scale or fit_scale(paths, args.tile_px, args.crop)
+    tiers = {"preview": (*build_base(paths, scale, args.crop), scale)}
+    if args.full and not args.generations:
+        tiers["full"] = (*build_base(paths, 1.0, args.crop), 1.0)
+    t1 = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(tiers, mpp)) as pool:
+        if args.generations:
+            frames_dir = out / "frames"
+            shutil.rmtree(frames_dir, ignore_errors=True)
+            frames_dir.mkdir()
+            jobs = [(g, p, f, ideal_pick(F), f"archive {len(F)}  hv {hv:.4f}") for g, p, f, F, hv in fronts]
+            frames = list(pool.map(_render_frame, jobs))
+            imgs = [Image.fromarray(a) for a in frames]
+            for n, im in enumerate(imgs):
+                im.save(frames_dir / f"frame_{n:04d}.png")
+            imgs[0].save(out / "front.gif", save_all=True, append_images=imgs[1:],
+                         duration=int(1000 / args.fps), loop=0)
+            print(f"✅ {len(imgs)} frames -> {frames_dir}, animation -> {out / 'front.gif'}")
+            if shutil.which("ffmpeg"):
+                subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-framerate", str(args.fps),
+                                "-i", str(frames_dir / "frame_%04d.png"), "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+                                "-pix_fmt", "yuv420p", str(out / "front.mp4")], check=True)
+                print(f"✅ MP4 -> {out / 'front.mp4'}")
+            n = len(imgs)
+        else:
+            per = max(1, args.per_sheet)
+            cols = math.ceil(math.sqrt(min(per, len(F)) * 4 / 3))   # sheets a bit wider than tall
+            jobs = [(out / f"sheet_{s:03d}.jpg", a, pos[a:b], fl[a:b], F[a:b], cols)
+                    for s, (a, b) in enumerate(chunks(len(F), per))]
+            futs = list(pool.map(_render_sheet, jobs))
+            print(f"✅ {len(F)} layouts -> {len(jobs)} contact sheet(s) in {out}")
+            if args.full:
+                full_dir = out / "full"
+                full_dir.mkdir(exist_ok=True)
+                step = math.ceil(len(F) / (4 * args.workers))
+                list(pool.map(_render_full, [(full_dir, a, pos[a:b], fl[a:b]) for a, b in chunks(len(F), step)]))
+                print(f"✅ {len(F)} full-size images -> {full_dir}")
+            n = sum(futs)
+    t2 = time.perf_counter()
+    print(f"⏱ plan {t1 - t0:.2f}s, rendering {t2 - t1:.2f}s ({n} images, {args.workers} workers)")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,27 @@
 import json
+from functools import lru_cache
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
 
+# style
+COLOR_POINT = (0, 255, 0, 255)     # vert
+COLOR_OUTLINE = (0, 0, 0, 255)     # contour noir
+COLOR_LABEL = (255, 255, 255, 255) # texte blanc
+BBOX_FILL = (0, 0, 0, 180)         # fond des étiquettes
+
+@lru_cache(maxsize=None)
+def get_font(size=18):
+    # font (fallback PIL), cherchée une seule fois par taille
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=8)
+def load_base(img_path):
+    """Plan décodé une seule fois (RGBA) ; ne pas modifier l'image renvoyée."""
+    return Image.open(img_path).convert("RGBA")
+
 def load_mpp(config_path: Path, layout_path: Path):
     mpp = None
     if layout_path.exists():
@@ -21,6 +41,34 @@ def load_mpp(config_path: Path, layout_path: Path):
 def meters_to_pixels(x_m, y_m, mpp):
     return int(round(x_m / mpp)), int(round(y_m / mpp))
 
+def draw_points(draw, layout, mpp, size, floors=None, floor=None, point_radius_px=10, stroke_px=2,
+                with_labels=True, font=None, scale=1.0, offset=(0, 0), color=COLOR_POINT):
+    """Dessine les objets d'un layout (mètres) sur draw ; scale/offset : plan réduit ou décalé (planches)."""
+    W, H = size
+    for i, (x_m, y_m) in enumerate(layout, start=1):
+        if floor is not None and floors is not None and floors[i-1] != floor:
+            continue
+        x_px, y_px = meters_to_pixels(x_m * scale, y_m * scale, mpp)
+
+        # skip si en dehors
+        if x_px < 0 or y_px < 0 or x_px >= W or y_px >= H:
+            continue
+        x_px, y_px = x_px + offset[0], y_px + offset[1]
+
+        # disque
+        r = point_radius_px
+        bbox = [x_px - r, y_px - r, x_px + r, y_px + r]
+        draw.ellipse(bbox, fill=color, outline=COLOR_OUTLINE, width=stroke_px)
+
+        # label optionnel
+        if with_labels:
+            label = f"{i}"
+            tw, th = draw.textbbox((0,0), label, font=font)[2:]
+            pad = 4
+            rect = [x_px + r + 6, y_px - th//2 - pad, x_px + r + 6 + tw + 2*pad, y_px + th//2 + pad]
+            draw.rectangle(rect, fill=BBOX_FILL)
+            draw.text((rect[0] + pad, rect[1] + pad), label, fill=COLOR_LABEL, font=font)
+
 def draw_layout_on_image(
     img_path: Path,
     layout_json: Path,
@@ -28,54 +76,24 @@ def draw_layout_on_image(
     config_path: Path = Path("data/config.json"),
     point_radius_px: int = 10,
     stroke_px: int = 2,
-    with_labels: bool = True
+    with_labels: bool = True,
+    floor: int = None
 ):
-    # charge image
-    img = Image.open(img_path).convert("RGBA")
+    # charge image (décodée une fois par chemin)
+    img = load_base(str(img_path))
     W, H = img.size
 
     # charge layout
     data = json.loads(layout_json.read_text())
     layout = data["layout"]
+    floors = data.get("floors")   # plan multi-étages : on ne dessine que les objets de cet étage
     mpp = load_mpp(config_path, layout_json)
 
     # calque de dessin (pour alpha propre)
     overlay = Image.new("RGBA", (W, H), (0,0,0,0))
     draw = ImageDraw.Draw(overlay)
 
-    # style
-    color_point = (0, 255, 0, 255)     # vert
-    color_outline = (0, 0, 0, 255)     # contour noir
-    color_label = (255, 255, 255, 255) # texte blanc
-    bbox_fill = (0, 0, 0, 180)         # fond des étiquettes
-
-    # font (fallback PIL)
-    try:
-        font = ImageFont.truetype("arial.ttf", 18)
-    except:
-        font = ImageFont.load_default()
-
-    # dessine chaque point
-    for i, (x_m, y_m) in enumerate(layout, start=1):
-        x_px, y_px = meters_to_pixels(x_m, y_m, mpp)
-
-        # skip si en dehors
-        if x_px < 0 or y_px < 0 or x_px >= W or y_px >= H:
-            continue
-
-        # disque
-        r = point_radius_px
-        bbox = [x_px - r, y_px - r, x_px + r, y_px + r]
-        draw.ellipse(bbox, fill=color_point, outline=color_outline, width=stroke_px)
-
-        # label optionnel
-        if with_labels:
-            label = f"{i}"
-            tw, th = draw.textbbox((0,0), label, font=font)[2:]
-            pad = 4
-            rect = [x_px + r + 6, y_px - th//2 - pad, x_px + r + 6 + tw + 2*pad, y_px + th//2 + pad]
-            draw.rectangle(rect, fill=bbox_fill)
-            draw.text((rect[0] + pad, rect[1] + pad), label, fill=color_label, font=font)
+    draw_points(draw, layout, mpp, (W, H), floors, floor, point_radius_px, stroke_px, with_labels, get_font(18))
 
     # compose et sauvegarde
     out = Image.alpha_composite(img, overlay).convert("RGB")
@@ -84,17 +102,30 @@ def draw_layout_on_image(
     print(f"✅ Image annotée sauvegardée → {out_path}")
 
 if __name__ == "__main__":
-    # chemins par défaut (tu peux changer au vol)
-    IMG = Path("data/Full-Plan - SB.png")
+    # chemins par défaut (tu peux changer au vol) ; le plan est celui de data/config.json
+    cfg_path = Path("data/config.json")
+    cfg = json.loads(cfg_path.read_text()) if cfg_path.exists() else {}
+    IMG = Path(cfg.get("walkable_png", "data/Full-Plan - SB.png"))
     BEST = Path("outputs/best_layout.json")     # le layout choisi
     OUT  = Path("outputs/floor_with_best.jpg")  # image sortie
 
-    draw_layout_on_image(
-        img_path=IMG,
-        layout_json=BEST,
-        out_path=OUT,
-        config_path=Path("data/config.json"),
-        point_radius_px=10,    # taille des points
-        stroke_px=2,           # contour
-        with_labels=True       # affiche 1..N
-    )
+    if cfg.get("floors"):
+        # plan multi-étages : une image par étage
+        for k, fl in enumerate(cfg["floors"]):
+            draw_layout_on_image(
+                img_path=Path(fl["walkable_png"]),
+                layout_json=BEST,
+                out_path=OUT.with_name(f"{OUT.stem}_{k}{OUT.suffix}"),
+                config_path=cfg_path,
+                floor=k
+            )
+    else:
+        draw_layout_on_image(
+            img_path=IMG,
+            layout_json=BEST,
+            out_path=OUT,
+            config_path=Path("data/config.json"),
+            point_radius_px=10,    # taille des points
+            stroke_px=2,           # contour
+            with_labels=True       # affiche 1..N
+        )
@@ -0,0 +1,104 @@
+# src/surrogate.py
+# Cheap surrogate of the objectives, and an NSGA2 that pre-screens over-generated offspring with it.
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import lsqr
+from pymoo.algorithms.moo.nsga2 import NSGA2
+from pymoo.core.population import Population
+
+from layout_eval import layout_feasible
+
+class CellSurrogate:
+    """Additive per-cell model: F_j(layout) ≈ b_j + mean over the objects of w_j[cell of the object].
+
+    Sites are binned on a cell_m grid, so neighbouring sites share what was learnt
+    about them; the weights are a damped least-squares fit on evaluated layouts.
+    f2/f3 are means of per-site values, so the form suits them; f1 (nearest object
+    to each entrance) only roughly, which is enough to rank candidates.
+    """
+    def __init__(self, sites, cell_m=1.0, damp=0.05):
+        _, cell = np.unique(np.floor(np.asarray(sites) / cell_m).astype(np.int64), axis=0, return_inverse=True)
+        self.cell = cell.ravel()
+        self.n_cells = int(self.cell.max()) + 1
+        self.damp = damp
+        self.b = self.W = None
+
+    def _design(self, X):
+        P, N = X.shape
+        return csr_matrix((np.full(P * N, 1.0 / N), (np.repeat(np.arange(P), N), self.cell[X].ravel())),
+                          shape=(P, self.n_cells))
+
+    def fit(self, X, F):
+        A = self._design(X)
+        self.b = F.mean(axis=0)
+        self.W = np.column_stack([lsqr(A, F[:, j] - self.b[j], damp=self.damp)[0] for j in range(F.shape[1])])
+        return self
+
+    def predict(self, X):
+        return self.b + self._design(X) @ self.W
+
+class SurrogateNSGA2(NSGA2):
+    """NSGA2 whose offspring are pre-screened before the true evaluation.
+
+    Mating makes oversample × n_offsprings candidates; the exact clearance/quota test
+    (cheap, geometric) and the surrogate's predicted F rank them with the algorithm's
+    own survival (rank & crowding), and only the best n_offsprings are evaluated.
+    Every evaluated layout joins the training set (the last `memory`); the model is
+    refit every retrain_every generations, and its error on the screened offspring
+    (mean |pred - true| / objective range) is kept in data["surrogate"].
+    Until the first fit, candidates are taken as mated.
+    """
+    def __init__(self, sites, oversample=4, retrain_every=5, cell_m=1.0, memory=5000, **kwargs):
+        super().__init__(**kwargs)
+        self.model = CellSurrogate(sites, cell_m)
+        self.oversample = max(1, int(oversample))
+        self.retrain_every = max(1, int(retrain_every))
+        self.memory = int(memory)
+        self.train_X = self.train_F = None
+        self._pred = None
+        self._n_cand = 0
+        self._step = 0
+
+    def _infill(self):
+        n = self.n_offsprings
+        off = self.mating.do(self.problem, self.pop, n * self.oversample, algorithm=self,
+                             random_state=self.random_state)
+        if len(off) == 0:
+            self.termination.force_termination = True
+            return
+        self._pred, self._n_cand = None, len(off)
+        if self.model.W is None or len(off) <= n:
+            return off[:n]
+        X = off.get("X").astype(int)
+        cv = (~layout_feasible(self.problem.floor, X, self.problem.min_clear2)).astype(float)[:, None]
+        off.set("F", self.model.predict(X), "CV", cv)
+        keep = self.survival.do(self.problem, off, n_survive=n, algorithm=self, random_state=self.random_state)
+        self._pred = keep.get("F").copy()
+        return Population.new(X=keep.get("X"))
+
+    def _initialize_advance(self, infills=None, **kwargs):
+        self._observe(infills)
+        super()._initialize_advance(infills=infills, **kwargs)
+
+    def _advance(self, infills=None, **kwargs):
+        if infills is not None:
+            self._observe(infills)
+        super()._advance(infills=infills, **kwargs)
+
+    def _observe(self, pop):
+        """Score the last screening, add the evaluated layouts to the training set, refit when due."""
+        X, F = pop.get("X").astype(int), pop.get("F")
+        rec = {"candidates": self._n_cand, "evaluated": len(X), "err": None, "refit": False}
+        if self._pred is not None and len(self._pred) == len(F):
+            span = np.clip(np.ptp(self.train_F, axis=0), 1e-12, None)
+            rec["err"] = (np.abs(self._pred - F).mean(axis=0) / span).round(4).tolist()
+        if self.train_X is None:
+            self.train_X, self.train_F = X, F
+        else:
+            self.train_X = np.concatenate([self.train_X, X])[-self.memory:]
+            self.train_F = np.concatenate([self.train_F, F])[-self.memory:]
+        if self._step % self.retrain_every == 0:
+            self.model.fit(self.train_X, self.train_F)
+            rec["refit"] = True
+        self._step += 1
+        self.data["surrogate"] = rec
@@ -0,0 +1,84 @@
+# src/telemetry.py
+# Hot-path section timers + counters, streamed as JSON Lines (one record per generation).
+import json, time
+from pathlib import Path
+
+from timing import untimed
+
+class _Section:
+    __slots__ = ("acc", "name", "t0")
+
+    def __init__(self, acc, name):
+        self.acc, self.name = acc, name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.acc[self.name] = self.acc.get(self.name, 0.0) + time.perf_counter() - self.t0
+
+class Telemetry:
+    """Cumulative time per section of the evaluation, evaluation/feasible counts, per-generation records.
+
+    Timing can be sampled: with sample_every=k only every k-th _evaluate call is
+    timed (counts are always exact), and records carry the sampled-call count so
+    per-call means stay unbiased. path=None keeps everything in memory.
+    """
+    def __init__(self, path=None, sample_every=1, append=False):
+        self.path = Path(path) if path else None
+        self.sample_every = max(1, int(sample_every))
+        self.calls = 0
+        self.sampled = 0
+        self.counts = {}      # this generation
+        self.sections = {}    # this generation (sampled calls only)
+        self.total = {}       # whole run
+        self.t_start = self.t_gen = time.perf_counter()
+        self._on = False
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._f = open(self.path, "a" if append else "w")
+
+    def start_generations(self):
+        """Start the first generation's clock (after the init stages)."""
+        self.t_gen = time.perf_counter()
+
+    def begin_eval(self, n=1):
+        """Called once per _evaluate call with its number of layouts; decides whether it is timed."""
+        self._on = self.calls % self.sample_every == 0
+        self.calls += 1
+        self.sampled += self._on
+        self.count("evals", n)
+
+    def section(self, name):
+        return _Section(self.sections, name) if self._on else untimed(name)
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + int(n)
+
+    def event(self, kind, **fields):
+        rec = {"event": kind, "t": round(time.perf_counter() - self.t_start, 6), **fields}
+        if self.path:
+            self._f.write(json.dumps(rec) + "\n")
+            self._f.flush()
+        return rec
+
+    def generation(self, gen, **fields):
+        """Close the current generation: wall-clock, counts, feasible ratio, section times."""
+        now = time.perf_counter()
+        evals = self.counts.get("evals", 0)
+        for k, v in self.sections.items():
+            self.total[k] = self.total.get(k, 0.0) + v
+        rec = self.event("generation", gen=int(gen), wall_s=round(now - self.t_gen, 6),
+                         evals=evals, sampled_calls=self.sampled,
+                         feasible_ratio=self.counts.get("feasible", 0) / evals if evals else None,
+                         sections_s={k: round(v, 6) for k, v in self.sections.items()},
+                         **fields)
+        self.t_gen = now
+        self.counts, self.sections, self.sampled = {}, {}, 0
+        return rec
+
+    def close(self):
+        if self.path:
+            self.event("summary", sections_total_s={k: round(v, 6) for k, v in self.total.items()})
+            self._f.close()
+            self.path = None
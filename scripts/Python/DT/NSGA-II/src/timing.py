@@ -0,0 +1,65 @@
+# src/timing.py
+# Named stage timers (wall-clock + tracemalloc peak when tracing is on).
+import sys, time, tracemalloc
+from contextlib import contextmanager, nullcontext
+
+@contextmanager
+def timed(stages, name):
+    """Add the block's duration to stages[name]["s"] (no-op when stages is None).
+
+    If tracemalloc is tracing, stages[name]["peak_mb"] is the peak traced memory
+    reached inside the block, above what was allocated when it started.
+    """
+    if stages is None:
+        yield
+        return
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        rec = stages.setdefault(name, {"s": 0.0})
+        rec["s"] += time.perf_counter() - t0
+        if tracing:
+            peak = (tracemalloc.get_traced_memory()[1] - base) / 2**20
+            rec["peak_mb"] = max(rec.get("peak_mb", 0.0), peak)
+
+_UNTIMED = nullcontext()
+
+def untimed(name):
+    """Stand-in for a section timer when timing is off."""
+    return _UNTIMED
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (MB), or None when it cannot be read."""
+    try:
+        import resource
+    except ImportError:   # Windows: no resource module, ask the process API instead
+        return _peak_rss_mb_windows()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10   # bytes on macOS, KiB on Linux
+
+def _peak_rss_mb_windows():
+    """PeakWorkingSetSize from GetProcessMemoryInfo (psapi), None off Windows or on failure."""
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize / 2**20
+    except (AttributeError, OSError):
+        return None
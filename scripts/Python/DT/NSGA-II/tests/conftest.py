@@ -0,0 +1,6 @@
+# tests/conftest.py
+# The scripts import each other as top-level modules from src/ (python src/<script>.py).
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
@@ -0,0 +1,37 @@
+# tests/test_batched_eval.py
+# The population-batched kernel (layout_eval.evaluate_layouts, BatchedLayoutProblem)
+# must score every layout exactly like the elementwise LayoutProblem.
+import numpy as np
+import pytest
+
+import layout_nsga_turbo as T
+from layout_eval import evaluate_layouts
+from layout_operators import sample_layouts
+from test_delta_eval import make_floor, MPP, MIN_CLEAR, N_OBJ
+
+@pytest.fixture(scope="module", params=["graph", "geodesic"])
+def floor(request):
+    T.configure({"meters_per_pixel": MPP, "num_objects": N_OBJ, "entrances": [[0.5, 0.5], [11.0, 7.0]]})
+    return make_floor(request.param)
+
+def test_batched_matches_elementwise(floor):
+    rng = np.random.default_rng(0)
+    S = len(floor["sites"])
+    spread, _ = sample_layouts(floor["sites"], N_OBJ, MIN_CLEAR, 24, rng)
+    X = np.concatenate([spread, rng.integers(0, S, size=(40, N_OBJ))])
+    X[-4:, 1] = X[-4:, 0]                                   # same site twice
+    ref = T.LayoutProblem(floor, MIN_CLEAR).evaluate(X, return_values_of=["F", "G"])
+    F, G = evaluate_layouts(X, floor, MIN_CLEAR**2)
+    np.testing.assert_array_equal(F, ref[0])
+    np.testing.assert_array_equal(G, ref[1])
+    assert 0 < np.count_nonzero(G[:, 0] == 0) < len(X)     # feasible and infeasible rows
+    out = T.BatchedLayoutProblem(floor, MIN_CLEAR).evaluate(X, return_values_of=["F", "G"])
+    np.testing.assert_array_equal(out[0], F)
+    np.testing.assert_array_equal(out[1], G)
+
+def test_chunks_are_independent(floor):
+    X = np.random.default_rng(1).integers(0, len(floor["sites"]), size=(30, N_OBJ))
+    F, G = evaluate_layouts(X, floor, MIN_CLEAR**2)
+    parts = [evaluate_layouts(x, floor, MIN_CLEAR**2) for x in np.array_split(X, 4)]
+    np.testing.assert_array_equal(np.concatenate([p[0] for p in parts]), F)
+    np.testing.assert_array_equal(np.concatenate([p[1] for p in parts]), G)
@@ -0,0 +1,96 @@
+# tests/test_delta_eval.py
+# DeltaEvaluator must give the same F / G as evaluate_layouts, batch after batch of
+# mutated offspring (graph and geodesic distance models, rows with duplicate sites).
+import numpy as np
+import pytest
+from scipy.ndimage import distance_transform_edt
+from scipy.spatial import cKDTree
+
+from floorplan import (sample_sites, build_nav_graph, entrance_distances, site_visibility, congestion_field,
+                       geodesic_fields, site_geodesic_pairs)
+from layout_eval import evaluate_layouts, DeltaEvaluator
+
+MPP = 0.1
+MIN_CLEAR = 1.0
+N_OBJ = 6
+POP = 32
+
+def make_mask():
+    """Small plan, 12 x 8 m: border walls and two partial walls, so walking and straight-line distances differ."""
+    mask = np.ones((80, 120), dtype=np.uint8)
+    mask[[0, -1], :] = 0
+    mask[:, [0, -1]] = 0
+    mask[:50, 40] = 0
+    mask[30:, 80] = 0
+    return mask
+
+def make_floor(distance_model):
+    """make_mask plan -> floor dict."""
+    mask = make_mask()
+    sites = sample_sites(mask, distance_transform_edt(mask) * MPP, MPP, stride_px=4, min_wall_m=0.2)
+    node_px, graph = build_nav_graph(mask, 3, MPP)
+    tree = cKDTree(node_px * MPP)
+    entrances = np.array([[0.5, 0.5], [11.0, 7.0]])
+    _, site_node = tree.query(sites, k=1)
+    _, ent_node_idx = tree.query(entrances, k=1)
+    floor = {"sites": sites, "site_node": site_node,
+             "ent_dists": entrance_distances(graph, ent_node_idx),
+             "site_vis": site_visibility(mask, sites, MPP, rays=8),
+             "congestion": congestion_field(graph, "degree")}
+    if distance_model == "geodesic":
+        sites_px = np.rint(sites / MPP).astype(np.int64)
+        field = geodesic_fields(mask, entrances / MPP, MPP)
+        floor["site_ent"] = np.ascontiguousarray(field[:, sites_px[:, 1], sites_px[:, 0]])
+        floor["geo_keys"], floor["geo_d"] = site_geodesic_pairs(mask, sites_px, MPP, 1.5 * MIN_CLEAR)
+    return floor
+
+def mutate(X, S, rng):
+    """Offspring-like batch: 1-3 objects moved per row, some onto a site the row already has."""
+    X = X.copy()
+    for r in range(len(X)):
+        cols = rng.choice(N_OBJ, size=rng.integers(1, 4), replace=False)
+        X[r, cols] = rng.integers(0, S, size=len(cols))
+        if rng.random() < 0.2:
+            X[r, cols[0]] = X[r, (cols[0] + 1) % N_OBJ]   # duplicate site in the row
+    return X
+
+@pytest.fixture(scope="module", params=["graph", "geodesic"])
+def floor(request):
+    return make_floor(request.param)
+
+@pytest.mark.parametrize("max_changed", [1, 2, 3])
+def test_delta_matches_kernel_over_generations(floor, max_changed):
+    rng = np.random.default_rng(0)
+    S = len(floor["sites"])
+    de = DeltaEvaluator(floor, MIN_CLEAR**2, max_changed, capacity=4 * POP)
+    X = rng.integers(0, S, size=(POP, N_OBJ))
+    n_delta, n_feasible = 0, 0
+    for _ in range(12):
+        F, G = de(X)
+        F_ref, G_ref = evaluate_layouts(X, floor, MIN_CLEAR**2)
+        np.testing.assert_array_equal(F, F_ref)
+        np.testing.assert_array_equal(G, G_ref)
+        n_delta += de.pop_stats()[0]
+        n_feasible += np.count_nonzero(G_ref[:, 0] == 0)
+        # next batch: mutated children, unchanged and reordered parents, a few fresh rows
+        X = np.concatenate([mutate(X, S, rng), X[: POP // 4], rng.permuted(X[: POP // 4], axis=1),
+                            rng.integers(0, S, size=(4, N_OBJ))])[rng.permutation(POP + POP // 2 + 4)][:POP]
+    assert n_delta > 0                     # the incremental path was exercised
+    assert 0 < n_feasible < 12 * POP       # on feasible and infeasible layouts
+
+def test_duplicate_sites(floor):
+    rng = np.random.default_rng(1)
+    S = len(floor["sites"])
+    de = DeltaEvaluator(floor, MIN_CLEAR**2, capacity=2 * POP)
+    X = rng.integers(0, S, size=(POP, N_OBJ))
+    de(X)
+    D = X.copy()
+    D[:, 1] = D[:, 0]                        # same site twice, one move away from a cached parent
+    D[::2, 2:4] = D[::2, 4:5]                # three times
+    same = np.repeat(X[:1], 3, axis=0)       # rows repeated within the batch
+    for batch in (D, np.concatenate([D, same, D[:3]])):
+        F, G = de(batch)
+        F_ref, G_ref = evaluate_layouts(batch, floor, MIN_CLEAR**2)
+        np.testing.assert_array_equal(F, F_ref)
+        np.testing.assert_array_equal(G, G_ref)
+        assert (G[: len(D), 0] > 0).all()     # a shared site always violates the clearance
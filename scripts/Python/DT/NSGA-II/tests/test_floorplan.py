@@ -0,0 +1,79 @@
+# tests/test_floorplan.py
+# Precomputed floor data against the code it replaced in the original
+# layout_nsga_turbo.py: the scalar visibility_score ray march and the networkx
+# nav graph / Dijkstra / degree centrality.
+import math
+import numpy as np
+import pytest
+
+from floorplan import site_visibility, build_nav_graph, entrance_distances, degree_centrality
+from test_delta_eval import make_mask, make_floor, MPP
+
+def ray_march(mask, points_xy, mpp, max_range_m, rays):
+    """The original visibility_score loop, per point (no mean over the layout)."""
+    H, W = mask.shape
+    step = mpp*2
+    angles = np.linspace(0, 2*math.pi, rays, endpoint=False)
+    out = []
+    for (px, py) in points_xy:
+        v = 0.0
+        for ang in angles:
+            r = 0.0
+            while r <= max_range_m:
+                xi = int((px + math.cos(ang)*r)/mpp)
+                yi = int((py + math.sin(ang)*r)/mpp)
+                if xi < 0 or yi < 0 or xi >= W or yi >= H or mask[yi, xi] == 0:
+                    break
+                r += step
+            v += r
+        out.append(v / rays)
+    return np.array(out)
+
+def test_visibility_table_matches_ray_march():
+    mask, sites = make_mask(), make_floor("graph")["sites"]
+    pts = np.concatenate([sites, [[0.05, 0.05], [11.95, 7.95], [4.0, 2.0]]])   # + border and wall pixels
+    for max_range_m, rays in ((12.0, 8), (3.0, 24)):
+        np.testing.assert_array_equal(site_visibility(mask, pts, MPP, max_range_m, rays, chunk=100),
+                                      ray_march(mask, pts, MPP, max_range_m, rays))
+
+def nx_graph(nx, mask, step_px, mpp):
+    """The original networkx build_graph."""
+    G = nx.Graph()
+    H, W = mask.shape
+    for y in range(0, H, step_px):
+        for x in range(0, W, step_px):
+            if mask[y, x] == 1:
+                u = (x, y)
+                G.add_node(u, pos=(x*mpp, y*mpp))
+                for dx, dy in ((step_px,0),(0,step_px),(step_px,step_px),(step_px,-step_px)):
+                    nx_, ny_ = x+dx, y+dy
+                    if 0 <= nx_ < W and 0 <= ny_ < H and mask[ny_, nx_] == 1:
+                        G.add_edge(u, (nx_, ny_), weight=math.hypot(dx, dy)*mpp)
+    return G
+
+@pytest.mark.parametrize("step_px", [3, 6])
+def test_nav_graph_matches_networkx(step_px):
+    nx = pytest.importorskip("networkx")
+    mask = make_mask()
+    G = nx_graph(nx, mask, step_px, MPP)
+    node_px, graph = build_nav_graph(mask, step_px, MPP)
+    ids = {tuple(p): i for i, p in enumerate(node_px.tolist())}
+    assert set(ids) == set(G.nodes)
+    coo = graph.tocoo()
+    edges = {(int(u), int(v)): w for u, v, w in zip(coo.row, coo.col, coo.data)}
+    assert len(edges) == 2 * G.number_of_edges()
+    for a, b, w in G.edges(data="weight"):
+        assert edges[ids[a], ids[b]] == edges[ids[b], ids[a]] == w
+    _, compact = build_nav_graph(mask, step_px, MPP, compact=True)
+    np.testing.assert_allclose(compact.toarray(), graph.toarray(), rtol=1e-6)   # float32 lengths
+
+    sources = [0, len(node_px) - 1]
+    d = entrance_distances(graph, sources)
+    for row, s in zip(d, sources):
+        ref = nx.single_source_dijkstra_path_length(G, tuple(node_px[s]), weight="weight")
+        expect = np.full(len(node_px), 1e12)
+        for node, dist in ref.items():
+            expect[ids[node]] = dist
+        np.testing.assert_allclose(row, expect, rtol=1e-12)
+    cent = nx.degree_centrality(G)
+    np.testing.assert_allclose(degree_centrality(graph), [cent[tuple(p)] for p in node_px.tolist()], rtol=1e-12)
@@ -0,0 +1,72 @@
+# tests/test_front_stream.py
+# A stream resumed from a checkpoint's generation drops what was written after it,
+# and the reader gives back the archive of every generation.
+import copy
+import numpy as np
+
+from front_stream import FrontStreamWriter, FrontStream
+from pareto_archive import ParetoArchive
+
+N_OBJ = 4
+
+def generation(archive, gen, rng):
+    """One generation's feasible candidates merged into the archive (as ParetoArchive.observe does)."""
+    X = np.stack([rng.choice(40, size=N_OBJ, replace=False) for _ in range(16)])
+    added = archive.update(X, rng.random((16, 3)))
+    archive.history.append((gen, archive.hypervolume(), len(archive), added))
+
+def as_sets(X, F):
+    return sorted((tuple(np.sort(x)), tuple(f)) for x, f in zip(np.asarray(X).tolist(), np.asarray(F).tolist()))
+
+def test_resume_truncates_and_replays(tmp_path):
+    floor = {"sites": np.random.default_rng(0).random((40, 2)) * 10}
+    rng = np.random.default_rng(1)
+    archive = ParetoArchive(N_OBJ)
+    writer = FrontStreamWriter(tmp_path, floor, N_OBJ, 0.05)
+    fronts = {}
+    for gen in range(1, 7):
+        generation(archive, gen, rng)
+        writer.append(gen, archive)
+        fronts[gen] = as_sets(archive.X, archive.F)
+        if gen == 3:
+            checkpoint = copy.deepcopy(archive)      # the run is resumed from here
+    writer.close(archive)
+    rows_at_3 = sum(r["count"] for r in FrontStream(tmp_path).index if r["gen"] <= 3)
+
+    # resume at gen 3: gens 4-6 are dropped and written again by the resumed run
+    archive = checkpoint
+    writer = FrontStreamWriter(tmp_path, floor, N_OBJ, 0.05, resume_gen=3)
+    assert writer.rows == rows_at_3
+    assert not (tmp_path / "front.npy").exists()
+    for gen in range(4, 9):
+        generation(archive, gen, rng)
+        writer.append(gen, archive)
+        fronts[gen] = as_sets(archive.X, archive.F)
+    writer.close(archive)
+
+    fs = FrontStream(tmp_path)
+    assert [r["gen"] for r in fs.index] == list(range(1, 9))
+    assert fs.rows == len(fs.X) == len(fs.F) == fs.index[-1]["start"] + fs.index[-1]["count"]
+    assert len({tuple(np.sort(x)) for x in np.asarray(fs.X).tolist()}) == fs.rows   # each layout streamed once
+    assert as_sets(*fs.front()) == fronts[8]                                          # front.npy
+    for gen, X, F in fs.fronts():
+        assert as_sets(X, F) == fronts[gen]                                           # replay
+    assert as_sets(*fs.front(5)) == fronts[5]
+
+def test_reader_ignores_a_partial_write(tmp_path):
+    floor = {"sites": np.random.default_rng(2).random((40, 2)) * 10}
+    rng = np.random.default_rng(3)
+    archive = ParetoArchive(N_OBJ)
+    writer = FrontStreamWriter(tmp_path, floor, N_OBJ, 0.05)
+    for gen in range(1, 4):
+        generation(archive, gen, rng)
+        writer.append(gen, archive)
+    writer.close()                                  # killed: no front.npy
+    rows = FrontStream(tmp_path).rows
+    with open(tmp_path / "X.i32", "ab") as f:       # rows of a 4th generation, not indexed yet
+        f.write(np.zeros((3, N_OBJ), dtype="<i4").tobytes())
+    with open(tmp_path / "gens.jsonl", "a") as f:
+        f.write('{"gen": 4, "start": ')
+    fs = FrontStream(tmp_path)
+    assert len(fs) == 3 and fs.rows == rows
+    assert as_sets(*fs.front()) == as_sets(archive.X, archive.F)
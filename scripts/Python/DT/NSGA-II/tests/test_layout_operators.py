@@ -0,0 +1,101 @@
+# tests/test_layout_operators.py
+# Layout operators: the clearance repair uses the floor's distance model, and on a
+# two-floor plan the variation operators keep objects on their floor, so the
+# floor_min / floor_max quotas of the parents hold for the children.
+import numpy as np
+
+from layout_eval import layout_feasible, quota_ok
+from layout_operators import (SetCrossover, NeighbourMutation, ClearanceRepair, site_neighbours,
+                              sample_layouts, sample_layouts_bulk, sample_layouts_floors)
+from test_delta_eval import make_floor
+
+N_OBJ = 8
+MIN_CLEAR = 1.0
+
+def two_floors(width=20.0, step=0.5):
+    """Two identical floors side by side (floor 1 shifted by 2*width, as in the turbo) -> (sites, site_floor)."""
+    xx, yy = np.meshgrid(np.arange(0, width, step), np.arange(0, 10.0, step))
+    one = np.stack([xx.ravel(), yy.ravel()], axis=1)
+    sites = np.concatenate([one, one + [2 * width, 0.0]])
+    return sites, np.repeat([0, 1], len(one))
+
+def per_floor(X, site_floor):
+    return np.stack([(site_floor[X] == k).sum(axis=-1) for k in (0, 1)], axis=-1)
+
+def test_crossover_keeps_per_floor_counts():
+    sites, site_floor = two_floors()
+    rng = np.random.default_rng(0)
+    lo, hi = np.array([1, 1]), np.array([7, 7])
+    A, _ = sample_layouts_floors(sites, site_floor, lo, hi, N_OBJ, MIN_CLEAR, 200, rng)
+    B, _ = sample_layouts_floors(sites, site_floor, lo, hi, N_OBJ, MIN_CLEAR, 200, rng)
+    assert (per_floor(A, site_floor) != per_floor(B, site_floor)).any()   # parents split differently
+    c1, c2 = SetCrossover(sites, site_floor=site_floor)._do(None, np.stack([A, B]), random_state=rng)
+    assert (per_floor(c1, site_floor) == per_floor(A, site_floor)).all()
+    assert (per_floor(c2, site_floor) == per_floor(B, site_floor)).all()
+
+def test_mutation_stays_on_floor():
+    sites, site_floor = two_floors(width=0.5)   # one column of 20 sites per floor, 1 m apart
+    nb = site_neighbours(sites, 8, site_floor)
+    assert (site_floor[nb] == site_floor[:, None]).all()
+    X = np.random.default_rng(3).integers(0, len(sites), size=(100, N_OBJ))
+    Y = NeighbourMutation(nb, prob_var=0.5)._do(None, X, random_state=np.random.default_rng(4))
+    assert (site_floor[Y] == site_floor[X]).all()
+
+def test_samplers_flag_feasible_rows():
+    floor = make_floor("graph")
+    rng = np.random.default_rng(10)
+    for sample in (sample_layouts, sample_layouts_bulk):
+        X, ok = sample(floor["sites"], N_OBJ, MIN_CLEAR, 64, rng)
+        assert X.shape == (64, N_OBJ) and ok.all()      # plenty of room on this plan
+        assert layout_feasible(floor, X, MIN_CLEAR**2).all()
+    X, ok = sample_layouts(floor["sites"], N_OBJ, 6.0, 8, rng, tries=5)   # 6 objects 6 m apart: does not fit
+    assert not ok.any() and X.shape == (8, N_OBJ)
+    assert (layout_feasible(floor, X, 36.0) == ok).all()
+
+def test_repair_uses_walking_distance():
+    floor = make_floor("geodesic")
+    sites = floor["sites"]
+    a, b = (int(np.flatnonzero(np.isclose(sites[:, 0], x) & np.isclose(sites[:, 1], 1.2))[0]) for x in (3.6, 4.4))
+    repair = ClearanceRepair(floor, MIN_CLEAR)
+    # 0.8 m apart on either side of the wall at x = 4 m: far enough on foot, left alone
+    assert (repair.repair_batch([[a, b]]) == [a, b]).all()
+    X = np.random.default_rng(5).integers(0, len(sites), size=(64, N_OBJ))
+    Y = repair.repair_batch(X, np.random.default_rng(6))
+    assert layout_feasible(floor, Y, MIN_CLEAR**2).all()
+    keep = layout_feasible(floor, X, MIN_CLEAR**2)
+    assert (Y[keep] == X[keep]).all()
+
+def test_repair_keeps_objects_on_their_floor():
+    sites, site_floor = two_floors(width=1.0)   # narrow floors, 1 m apart: the nearest free site is often across
+    floor = {"sites": sites, "site_floor": site_floor, "floor_min": np.array([2, 2]), "floor_max": np.array([6, 6])}
+    rng = np.random.default_rng(7)
+    X = np.stack([rng.choice(np.flatnonzero(site_floor == k), size=(100, N_OBJ // 2)) for k in (0, 1)], axis=1)
+    X = X.reshape(100, N_OBJ)   # 4 random objects per floor, most of them too close
+    Y = ClearanceRepair(floor, MIN_CLEAR).repair_batch(X, rng)
+    assert (site_floor[Y] == site_floor[X]).all()
+    assert layout_feasible(floor, Y, MIN_CLEAR**2).all()
+
+def test_repair_fallback_is_per_batch():
+    sites = np.stack([np.arange(30) * 0.5, np.zeros(30)], axis=1)   # 15 m line: 5 objects at most
+    repair = ClearanceRepair({"sites": sites}, 3.0)
+    X = np.random.default_rng(8).integers(0, 30, size=(16, N_OBJ))
+    repair.repair_batch(X)
+    assert repair.tries == 200   # a plan too tight for this batch does not disable later re-placements
+    ok = repair.repair_batch(X[:, :4], np.random.default_rng(9))
+    assert layout_feasible({"sites": sites}, ok, 9.0).all()
+
+def test_generations_keep_the_quotas():
+    sites, site_floor = two_floors()
+    floor = {"sites": sites, "site_floor": site_floor, "floor_min": np.array([2, 3]), "floor_max": np.array([5, 6])}
+    rng = np.random.default_rng(11)
+    X, ok = sample_layouts_floors(sites, site_floor, floor["floor_min"], floor["floor_max"], N_OBJ, MIN_CLEAR, 40, rng)
+    assert ok.all() and layout_feasible(floor, X, MIN_CLEAR**2).all()
+    crossover = SetCrossover(sites, site_floor=site_floor)
+    mutation = NeighbourMutation(site_neighbours(sites, 8, site_floor), prob_var=1 / N_OBJ)
+    repair = ClearanceRepair(floor, MIN_CLEAR)
+    for _ in range(10):   # mating, mutation and repair as in one NSGA-II generation
+        parents = X[rng.integers(0, len(X), size=(2, len(X) // 2))]
+        children = np.concatenate(crossover._do(None, parents, random_state=rng))
+        X = repair.repair_batch(mutation._do(None, children, random_state=rng), rng)
+        assert quota_ok(floor, X).all()
+        assert layout_feasible(floor, X, MIN_CLEAR**2).all()
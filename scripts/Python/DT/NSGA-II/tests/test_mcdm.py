@@ -0,0 +1,66 @@
+# tests/test_mcdm.py
+# Rankings of mcdm.rank on small fronts whose answer is known, against the
+# original pick_best (nearest to the ideal) and loop references.
+import numpy as np
+
+from mcdm import rank, normalize, diverse_top_k, layout_distance
+
+def front(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    F = rng.random((n, 3)) * [20.0, 5.0, 0.05] - [0.0, 6.0, 0.0]   # distance, neg_visibility, congestion
+    return F
+
+def test_ideal_is_the_original_pick():
+    F = front()
+    Fz = (F - F.min(0)) / np.clip(F.max(0) - F.min(0), 1e-12, None)
+    assert np.argmin(rank(F)) == np.argmin(np.linalg.norm(Fz, axis=1))
+    np.testing.assert_allclose(rank(F), np.linalg.norm(Fz, axis=1))
+
+def test_weighted_and_topsis():
+    F = front(seed=1)
+    assert np.argmin(rank(F, "weighted", [1, 0, 0])) == np.argmin(F[:, 0])
+    assert np.argmin(rank(F, "weighted", [0, 0, 5])) == np.argmin(F[:, 2])
+    # TOPSIS by the textbook loop: weighted normalised matrix, distances to best (0) and worst rows
+    w = np.array([0.5, 0.3, 0.2])
+    V = normalize(F) * w
+    ref = []
+    for v in V:
+        d_best = np.sqrt(sum(x**2 for x in v))
+        d_worst = np.sqrt(sum((x - m)**2 for x, m in zip(v, V.max(axis=0))))
+        ref.append(1 - d_worst / (d_best + d_worst))
+    np.testing.assert_allclose(rank(F, "topsis", w), ref)
+
+def test_knee():
+    # anchors on the axes, a flat row on their plane and one bulging towards the ideal
+    F = np.array([[1.0, 0, 0], [0, 1.0, 0], [0, 0, 1.0], [0.4, 0.3, 0.3], [0.2, 0.2, 0.2], [0.3, 0.3, 0.2]])
+    score = rank(F, "knee")
+    assert np.argmin(score) == 4
+    np.testing.assert_allclose(score[:4], 0.0, atol=1e-12)         # on the anchor plane
+    F2 = np.array([[0.0, 0.0, 1.0], [0.0, 0.0, 1.0], [1.0, 1.0, 0.0], [0.2, 0.2, 0.5]])   # degenerate anchors
+    assert np.isfinite(rank(F2, "knee")).all()
+
+def test_epsilon_bounds_zoom_in():
+    F = front(seed=2)
+    eps = {"distance": 8.0, 2: 0.03}
+    score = rank(F, "ideal", eps=eps)
+    inside = (F[:, 0] <= 8.0) & (F[:, 2] <= 0.03)
+    assert np.isinf(score[~inside]).all() and np.isfinite(score[inside]).all()
+    np.testing.assert_allclose(score[inside], rank(F[inside]))     # normalised over the kept rows only
+    assert np.isinf(rank(F, eps={"distance": -1.0})).all()
+
+def test_diverse_top_k_greedy():
+    rng = np.random.default_rng(3)
+    score = rng.random(60)
+    score[[5, 17]] = np.inf
+    pos = rng.random((60, 4, 2)) * 10
+    top = diverse_top_k(score, pos, 5, pool=20)
+    # reference: same greedy max-min on the 20 best rows, loop version
+    cand = list(np.argsort(score, kind="stable")[:20])
+    picks = [cand[0]]
+    while len(picks) < 5:
+        dmin = [min(layout_distance(pos[p], pos[[c]])[0] for p in picks) if c not in picks else -1.0 for c in cand]
+        picks.append(cand[int(np.argmax(dmin))])
+    assert top.tolist() == picks
+    assert top[0] == np.argmin(score) and not set(top) & {5, 17}
+    assert layout_distance(pos[0], pos[[0]])[0] == 0.0
+    assert len(diverse_top_k(np.full(4, np.inf), pos[:4], 3)) == 0
@@ -0,0 +1,39 @@
+# tests/test_parallel_eval.py
+# ParallelEvaluator over shared-memory floor arrays gives the serial kernel's F / G,
+# whatever the number of workers.
+import numpy as np
+import pytest
+
+from layout_eval import evaluate_layouts
+from parallel_eval import ParallelEvaluator, share_arrays, attach_arrays, release_arrays
+from test_delta_eval import make_floor, MIN_CLEAR, N_OBJ
+
+@pytest.fixture(scope="module")
+def floor():
+    return make_floor("geodesic")
+
+@pytest.mark.parametrize("n_workers", [1, 3])
+def test_parallel_matches_serial(floor, n_workers):
+    X = np.random.default_rng(0).integers(0, len(floor["sites"]), size=(50, N_OBJ))
+    F_ref, G_ref = evaluate_layouts(X, floor, MIN_CLEAR**2)
+    ev = ParallelEvaluator(floor, MIN_CLEAR**2, n_workers)
+    try:
+        for batch in (X, X[:2]):                      # fewer rows than workers too
+            F, G = ev(batch)
+            np.testing.assert_array_equal(F, F_ref[: len(batch)])
+            np.testing.assert_array_equal(G, G_ref[: len(batch)])
+        wall, busy = ev.pop_stats()
+        assert wall > 0 and busy > 0
+    finally:
+        ev.close()
+
+def test_shared_arrays_round_trip(floor):
+    blocks, spec = share_arrays(floor)
+    try:
+        views, arrays = attach_arrays(spec)
+        for name, a in floor.items():
+            np.testing.assert_array_equal(arrays[name], a)
+            assert arrays[name].dtype == a.dtype and not arrays[name].flags.writeable
+        release_arrays(views)
+    finally:
+        release_arrays(blocks, unlink=True)
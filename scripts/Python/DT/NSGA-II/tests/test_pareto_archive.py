@@ -0,0 +1,52 @@
+# tests/test_pareto_archive.py
+# ParetoArchive keeps exactly the non-dominated layouts seen so far (as sets of
+# sites), and its hypervolume uses fixed bounds; HypervolumeStall reads its history.
+import numpy as np
+
+from pareto_archive import ParetoArchive, HypervolumeStall, dominated_by
+
+def brute_front(F):
+    """Indices of the rows of F no other row dominates."""
+    return [i for i in range(len(F)) if not any((F[j] <= F[i]).all() and (F[j] < F[i]).any() for j in range(len(F)))]
+
+def test_update_keeps_the_non_dominated_set():
+    rng = np.random.default_rng(0)
+    archive = ParetoArchive(4)
+    X_all, F_all = [], []
+    for _ in range(15):
+        X = rng.permuted(np.tile(np.arange(30), (12, 1)), axis=1)[:, :4]    # distinct sites per row
+        F = rng.integers(0, 6, size=(12, 3)).astype(float)                  # many ties and dominations
+        archive.update(X, F)
+        X_all.append(X); F_all.append(F)
+    X_all, F_all = np.concatenate(X_all), np.concatenate(F_all)
+    # expected: the candidates no other candidate dominates (equal F vectors do not
+    # dominate each other, so ties are all kept), whatever the update order
+    front = brute_front(F_all)
+    keys = {bytes(np.sort(x)) for x in X_all[front]}
+    assert {bytes(np.sort(x)) for x in archive.X} == keys
+    assert not dominated_by(archive.F, archive.F).any()
+    assert len(archive.keys) == len(archive)
+
+def test_duplicates_are_sets_of_sites():
+    archive = ParetoArchive(3)
+    assert archive.update([[1, 2, 3]], [[1.0, 1.0, 1.0]]) == 1
+    assert archive.update([[3, 1, 2], [2, 3, 1]], [[0.5, 0.5, 0.5], [0.4, 0.4, 0.4]]) == 0   # same set, even if better
+    assert archive.update([[4, 5, 6], [6, 5, 4]], [[2.0, 0.0, 1.0], [2.0, 0.0, 1.0]]) == 1   # repeated among candidates
+    assert archive.update([[7, 8, 9]], [[0.0, 0.0, 0.0]]) == 1                                 # dominates both
+    assert len(archive) == 1 and archive.keys == {bytes(np.array([7, 8, 9]))}
+
+def test_hypervolume_fixed_bounds():
+    archive = ParetoArchive(2, n_obj=2, bounds=([0.0, 0.0], [1.0, 1.0]))
+    archive.update([[0, 1]], [[0.5, 0.5]])
+    assert np.isclose(archive.hypervolume(), 0.6**2)
+    archive.update([[2, 3]], [[-1.0, 0.2]])             # beyond the ideal: clipped at 0
+    assert np.isclose(archive.hypervolume(), 1.1 * 0.9)
+    assert archive.hypervolume() <= 1.1**2
+
+def test_stall_window():
+    archive = ParetoArchive(2)
+    stall = HypervolumeStall(archive, window=3, tol=1e-3, start=2)
+    for gen, hv in enumerate([0.1, 0.2, 0.5, 0.6, 0.7, 0.7002, 0.7003, 0.7004]):
+        archive.history.append((gen, hv, 1, 0))
+        done = stall._update(None) == 1.0
+        assert done == (gen == 7)                        # first 2 entries ignored, then 3-gen window
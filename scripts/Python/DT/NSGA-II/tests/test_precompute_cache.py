@@ -0,0 +1,51 @@
+# tests/test_precompute_cache.py
+# load_or_build: hit on unchanged inputs, miss (new entry) when a file or a
+# parameter changes, same arrays back from the memory-mapped .npz.
+import numpy as np
+
+from precompute_cache import load_or_build, cache_key
+
+def test_hit_miss_and_invalidation(tmp_path):
+    plan = tmp_path / "floor.png"
+    plan.write_bytes(b"plan v1")
+    cache = tmp_path / "cache"
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {"sites": np.arange(12.0).reshape(6, 2), "site_node": np.arange(6, dtype=np.int32),
+                "empty": np.empty((0, 2))}
+
+    params = {"meters_per_pixel": 0.1, "site_stride_px": 6}
+    first = load_or_build("plan", build, files=[plan, None], params=params, cache_dir=cache)
+    again = load_or_build("plan", build, files=[plan, None], params=dict(reversed(params.items())), cache_dir=cache)
+    assert len(calls) == 1                                # hit: key ignores the params' order
+    for name, a in first.items():
+        np.testing.assert_array_equal(again[name], a)
+        assert again[name].dtype == a.dtype and again[name].shape == a.shape
+    assert not again["sites"].flags.writeable             # read-only mapping of the entry
+
+    load_or_build("plan", build, files=[plan, None], params={**params, "site_stride_px": 3}, cache_dir=cache)
+    assert len(calls) == 2                                # parameter changed
+    plan.write_bytes(b"plan v2")
+    load_or_build("plan", build, files=[plan, None], params=params, cache_dir=cache)
+    assert len(calls) == 3                                # file content changed
+    assert len(list(cache.glob("plan-*.npz"))) == 3
+    load_or_build("plan", build, files=[plan, None], params=params, cache_dir=None)
+    assert len(calls) == 4                                # caching off
+
+def test_key_inputs(tmp_path):
+    f = tmp_path / "a.png"
+    f.write_bytes(b"x")
+    key = cache_key("plan", [f], {"a": 1})
+    assert cache_key("floor", [f], {"a": 1}) != key       # tag
+    assert cache_key("plan", [f, None], {"a": 1}) != key  # optional placeable mask
+    assert cache_key("plan", [f], {"a": 2}) != key
+
+def test_unreadable_entry_is_rebuilt(tmp_path, capsys):
+    build = lambda: {"a": np.ones(3)}
+    load_or_build("plan", build, cache_dir=tmp_path)
+    entry, = tmp_path.glob("plan-*.npz")
+    entry.write_bytes(b"truncated")
+    np.testing.assert_array_equal(load_or_build("plan", build, cache_dir=tmp_path)["a"], np.ones(3))
+    assert "unreadable" in capsys.readouterr().out